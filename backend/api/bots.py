@@ -0,0 +1,107 @@
+'''Classifier for crawler, monitor and scripted traffic at visit ingest'''
+
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+REASON_EMPTY_USER_AGENT = 'empty_user_agent'
+REASON_USER_AGENT = 'user_agent'
+REASON_BURST = 'burst'
+
+BURST_WINDOW_SECONDS = 10
+BURST_MAX_REQUESTS = 30
+BURST_MAX_TRACKED_IPS = 10000
+
+# Заглушка get_client_ip для запросов без IP: за ней стоят разные посетители, всплеск по ней не считается
+UNKNOWN_IP = 'unknown'
+
+# Подстроки user-agent (в нижнем регистре), по которым узнаются боты, мониторинг и HTTP-библиотеки
+BOT_SIGNATURES = (
+    'bot', 'crawl', 'spider', 'slurp', 'scrape', 'archiver', '+http',
+    'facebookexternalhit', 'facebookcatalog', 'meta-externalagent', 'embedly', 'preview', 'whatsapp', 'vkshare',
+    'feedfetcher', 'mediapartners-google', 'google-inspectiontool', 'google-read-aloud',
+    'yandexmetrika', 'yandeximages', 'yandexdirect', 'yandexaccessibility',
+    'uptime', 'monitor', 'pingdom', 'statuscake', 'site24x7', 'lighthouse', 'pagespeed', 'gtmetrix',
+    'headless', 'phantomjs', 'selenium', 'puppeteer', 'playwright',
+    'curl/', 'wget/', 'java/', 'python-requests', 'python-urllib', 'aiohttp', 'httpx', 'go-http-client',
+    'okhttp', 'apache-httpclient', 'axios/', 'node-fetch', 'undici', 'libwww-perl', 'scrapy', 'postmanruntime', 'insomnia'
+)
+
+# Телефоны CUBOT содержат 'bot' в названии модели
+NOT_BOT_FRAGMENTS = ('cubot',)
+
+def signature_pattern(signatures) -> re.Pattern:
+    '''
+    Собирает подстроки в регулярное выражение-префиксное дерево: (?:a(?:iohttp|xios/)|bot|...)
+    Returns: скомпилированный шаблон; на каждой позиции строки проверяется один символ, а не все подстроки
+    '''
+    tree = {}
+    for signature in signatures:
+        node = tree
+        for char in signature:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        # Для поиска достаточно более короткой подстроки, продолжения не нужны
+        if '' in node:
+            return ''
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return re.compile(build(tree))
+
+BOT_USER_AGENT_PATTERN = signature_pattern(BOT_SIGNATURES)
+
+_burst_windows: Dict[str, Tuple[float, int]] = {}
+
+@lru_cache(maxsize=2048)
+def is_bot_user_agent(user_agent: str) -> bool:
+    '''
+    Проверяет user-agent по сигнатурам ботов; повторные строки берутся из кэша
+    Args: user_agent - значение заголовка User-Agent
+    Returns: True для краулеров, мониторинга и HTTP-библиотек
+    '''
+    user_agent = user_agent.lower()
+    for fragment in NOT_BOT_FRAGMENTS:
+        user_agent = user_agent.replace(fragment, '')
+    return BOT_USER_AGENT_PATTERN.search(user_agent) is not None
+
+def register_request(client_ip: str, now: Optional[float] = None) -> bool:
+    '''
+    Учитывает запрос в окне BURST_WINDOW_SECONDS для IP (в памяти теплого инстанса)
+    Returns: True, если IP превысил BURST_MAX_REQUESTS запросов за окно; для неизвестного IP всегда False
+    '''
+    if not client_ip or client_ip == UNKNOWN_IP:
+        return False
+    now = time.monotonic() if now is None else now
+    window_start, requests = _burst_windows.get(client_ip, (now, 0))
+    if now - window_start >= BURST_WINDOW_SECONDS:
+        window_start, requests = now, 0
+    requests += 1
+    _burst_windows[client_ip] = (window_start, requests)
+
+    if len(_burst_windows) > BURST_MAX_TRACKED_IPS:
+        for ip, (started, _) in list(_burst_windows.items()):
+            if now - started >= BURST_WINDOW_SECONDS:
+                del _burst_windows[ip]
+        if len(_burst_windows) > BURST_MAX_TRACKED_IPS:
+            _burst_windows.clear()
+
+    return requests > BURST_MAX_REQUESTS
+
+def classify_visit(user_agent: str, client_ip: str, now: Optional[float] = None) -> Optional[str]:
+    '''
+    Классифицирует запрос на запись визита
+    Args: user_agent - заголовок User-Agent; client_ip - IP клиента; now - время (time.monotonic) для тестов
+    Returns: причина (REASON_*) для бота или None для обычного посетителя
+    '''
+    burst = register_request(client_ip, now)
+    if not user_agent or not user_agent.strip():
+        return REASON_EMPTY_USER_AGENT
+    if is_bot_user_agent(user_agent):
+        return REASON_USER_AGENT
+    if burst:
+        return REASON_BURST
+    return None
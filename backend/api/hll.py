@@ -0,0 +1,147 @@
+'''
+HyperLogLog sketches for composable unique-visitor counts
+Expected error at PRECISION=12: relative standard error 1.04 / sqrt(4096) = 1.6% and no systematic bias
+from 10 to 10^6 distinct values (benchmarks/hll_accuracy.py checks both)
+'''
+
+import hashlib
+import math
+import struct
+from functools import lru_cache
+
+PRECISION = 12
+
+FORMAT_DENSE = 1
+FORMAT_SPARSE = 2
+
+def new_sketch(precision=PRECISION):
+    '''
+    Создает пустой скетч (регистры HyperLogLog)
+    Args: precision - число бит индекса, скетч хранит 2^precision регистров
+    Returns: bytearray регистров
+    '''
+    if precision < 4 or precision > 16:
+        raise ValueError('HLL precision must be between 4 and 16')
+    return bytearray(1 << precision)
+
+def sketch_precision(registers):
+    return len(registers).bit_length() - 1
+
+def add(registers, value):
+    '''
+    Добавляет значение (например, IP посетителя) в скетч
+    Args: registers - скетч из new_sketch; value - строка
+    '''
+    precision = sketch_precision(registers)
+    hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+    index = hashed >> (64 - precision)
+    remainder_bits = 64 - precision
+    rank = remainder_bits - (hashed & ((1 << remainder_bits) - 1)).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+@lru_cache(maxsize=None)
+def _lane_masks(length):
+    return int.from_bytes(b'\x80' * length, 'big'), int.from_bytes(b'\xff' * length, 'big')
+
+def merge(target, other):
+    '''
+    Объединяет скетч other в target (регистровый максимум)
+    Args: target, other - скетчи одинаковой точности
+    Returns: target
+    '''
+    if len(target) != len(other):
+        raise ValueError('Cannot merge HLL sketches of different precision')
+    
+    # Побайтовый максимум через одно большое целое: ранги < 128, поэтому (a | 0x80) - b
+    # не занимает из соседнего байта, а старший бит байта показывает a >= b
+    high_bits, all_bits = _lane_masks(len(target))
+    left = int.from_bytes(target, 'big')
+    right = int.from_bytes(other, 'big')
+    left_wins = (((left | high_bits) - right) & high_bits) >> 7
+    left_wins *= 0xff
+    merged = (left & left_wins) | (right & (all_bits ^ left_wins))
+    target[:] = merged.to_bytes(len(target), 'big')
+    return target
+
+def _sigma(x):
+    if x == 1.0:
+        return math.inf
+    y = 1.0
+    z = x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+def _tau(x):
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y = 1.0
+    z = 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == previous:
+            return z / 3.0
+
+def estimate(registers):
+    '''
+    Оценивает число уникальных значений в скетче
+    Улучшенная оценка Эртла (Ertl, "New cardinality estimation algorithms for HyperLogLog sketches", 2017)
+    по гистограмме регистров: в отличие от пары линейный счет / сырая оценка, она не смещается
+    в области переключения (около 2.5 * 2^precision), поэтому таблицы поправок HLL++ не нужны
+    Returns: int, стандартная ошибка около 1.04 / sqrt(2^precision) во всем диапазоне
+    '''
+    register_count = len(registers)
+    max_rank = 64 - sketch_precision(registers) + 1
+    histogram = [registers.count(rank) for rank in range(max_rank + 1)]
+
+    z = register_count * _tau(1.0 - histogram[max_rank] / register_count)
+    for rank in range(max_rank - 1, 0, -1):
+        z = (z + histogram[rank]) * 0.5
+    z += register_count * _sigma(histogram[0] / register_count)
+    return int(round(register_count * register_count / (2 * math.log(2)) / z))
+
+def serialize(registers):
+    '''
+    Сериализует скетч в bytes; для малых кардинальностей выбирает разреженный формат
+    Returns: bytes - заголовок (формат, точность) + регистры или пары (индекс, ранг)
+    '''
+    precision = sketch_precision(registers)
+    filled = [(index, rank) for index, rank in enumerate(registers) if rank]
+    header = struct.pack('>BB', FORMAT_SPARSE, precision)
+    if len(filled) * 3 < len(registers):
+        return header + b''.join(struct.pack('>HB', index, rank) for index, rank in filled)
+    return struct.pack('>BB', FORMAT_DENSE, precision) + bytes(registers)
+
+def deserialize(data):
+    '''
+    Восстанавливает скетч из serialize()
+    Args: data - bytes или memoryview (значение BYTEA из psycopg2)
+    Returns: bytearray регистров
+    '''
+    data = bytes(data)
+    if len(data) < 2:
+        raise ValueError('Truncated HLL sketch')
+    sketch_format, precision = struct.unpack_from('>BB', data)
+    registers = new_sketch(precision)
+
+    if sketch_format == FORMAT_DENSE:
+        if len(data) - 2 != len(registers):
+            raise ValueError('Corrupted dense HLL sketch')
+        registers[:] = data[2:]
+    elif sketch_format == FORMAT_SPARSE:
+        if (len(data) - 2) % 3:
+            raise ValueError('Corrupted sparse HLL sketch')
+        for index, rank in struct.iter_unpack('>HB', data[2:]):
+            registers[index] = rank
+    else:
+        raise ValueError(f'Unknown HLL sketch format: {sketch_format}')
+
+    return registers
@@ -5,12 +5,58 @@ Args: event - dict with httpMethod, body, queryStringParameters, pathParams
 Returns: HTTP response with auth token, visit confirmation, or analytics data
 '''
 
+import base64
+import csv
+import io
 import json
 import os
+import re
 import secrets
+import zlib
+import hashlib
+import time as clock
 import psycopg2
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from psycopg2.extras import execute_values
+from collections import Counter, OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import bots
+import hll
+import shared_auth
+
+MAX_BATCH_VISITS = 200
+MAX_VISIT_AGE = timedelta(hours=1)
+MAX_VISIT_CLOCK_SKEW = timedelta(minutes=5)
+ROLLUP_MAX_DAYS_PER_RUN = 31
+PARTITION_MONTHS_AHEAD = 3
+VISIT_RETENTION_MONTHS = int(os.environ.get('PAGE_VISITS_RETENTION_MONTHS', '13'))
+PARTITION_NAME_PATTERN = re.compile(r'^page_visits_y(\d{4})m(\d{2})$')
+
+ANALYTICS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '60'))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_MAX_ENTRIES', '64'))
+
+VISIT_EXPORT_PAGE_ROWS = int(os.environ.get('VISIT_EXPORT_PAGE_ROWS', '20000'))
+VISIT_EXPORT_CHUNK_ROWS = 2000
+VISIT_EXPORT_COLUMNS = ('id', 'page_url', 'user_ip', 'user_agent', 'referrer', 'session_id', 'visited_at')
+
+DIMENSION_CACHE_MAX_ENTRIES = 5000
+
+LOGIN_MAX_FAILED_ATTEMPTS = 5
+LOGIN_LOCKOUT = timedelta(hours=1)
+LOGIN_STATE_SYNC_SECONDS = int(os.environ.get('LOGIN_STATE_SYNC_SECONDS', '60'))
+LOGIN_TRACKED_IPS = 10000
+LOGIN_ATTEMPTS_RETENTION_DAYS = int(os.environ.get('LOGIN_ATTEMPTS_RETENTION_DAYS', '90'))
+LOGIN_PRUNE_BATCH_ROWS = 5000
+LOGIN_PRUNE_MAX_BATCHES = 20
+
+_partitions_ensured_through: Optional[date] = None
+_referrer_ids: Dict[str, int] = {}
+_user_agent_ids: Dict[str, int] = {}
+_login_failures: Dict[str, Tuple[float, List[datetime]]] = {}
+_analytics_cache: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+_analytics_cache_stats = {'hit': 0, 'partial': 0, 'miss': 0}
 
 def get_db_connection():
     database_url = os.environ.get('DATABASE_URL')
@@ -53,6 +99,730 @@ def error_response(message, status_code=500):
         'isBase64Encoded': False
     }
 
+def get_client_ip(event: Dict[str, Any]) -> str:
+    headers = event.get('headers', {})
+    request_context = event.get('requestContext', {})
+    
+    return (
+        headers.get('x-real-ip') or 
+        headers.get('X-Real-Ip') or
+        headers.get('x-original-forwarded-for', '').split(',')[0].strip() or
+        headers.get('X-Original-Forwarded-For', '').split(',')[0].strip() or
+        request_context.get('identity', {}).get('sourceIp', bots.UNKNOWN_IP)
+    )
+
+def referrer_domain(referrer: str) -> str:
+    try:
+        hostname = urlsplit(referrer).hostname or ''
+    except ValueError:
+        hostname = ''
+    return hostname[4:] if hostname.startswith('www.') else hostname
+
+def intern_values(cursor, conn, cache: Dict[str, int], values: List[str], insert_sql: str, insert_rows: List[Tuple], select_sql: str, select_keys: List[str]) -> Dict[str, int]:
+    '''
+    Resolves dimension strings to ids, inserting the unknown ones.
+    New dimension rows are committed right away so ids cached by this warm instance never point to rolled back rows.
+    '''
+    ids = {value: cache[value] for value in values if value in cache}
+    if not insert_rows:
+        return ids
+    
+    execute_values(cursor, insert_sql, insert_rows, page_size=len(insert_rows))
+    cursor.execute(select_sql, (select_keys,))
+    fetched = dict(cursor.fetchall())
+    conn.commit()
+    
+    if len(cache) + len(fetched) > DIMENSION_CACHE_MAX_ENTRIES:
+        cache.clear()
+    cache.update(fetched)
+    ids.update(fetched)
+    return ids
+
+def intern_referrers(cursor, conn, referrers: List[str]) -> Dict[str, int]:
+    missing = sorted({referrer for referrer in referrers if referrer not in _referrer_ids})
+    return intern_values(cursor, conn, _referrer_ids, referrers, """
+        INSERT INTO t_p89870318_access_bars_service.visit_referrers (referrer_url, referrer_domain)
+        VALUES %s
+        ON CONFLICT (referrer_url) DO NOTHING
+    """, [(referrer, referrer_domain(referrer)[:255]) for referrer in missing], """
+        SELECT referrer_url, id FROM t_p89870318_access_bars_service.visit_referrers 
+        WHERE referrer_url = ANY(%s)
+    """, missing)
+
+def intern_user_agents(cursor, conn, user_agents: List[str]) -> Dict[str, int]:
+    missing = sorted({user_agent for user_agent in user_agents if user_agent not in _user_agent_ids})
+    return intern_values(cursor, conn, _user_agent_ids, user_agents, """
+        INSERT INTO t_p89870318_access_bars_service.visit_user_agents (user_agent)
+        VALUES %s
+        ON CONFLICT ((md5(user_agent))) DO NOTHING
+    """, [(user_agent,) for user_agent in missing], """
+        SELECT user_agent, id FROM t_p89870318_access_bars_service.visit_user_agents 
+        WHERE md5(user_agent) = ANY(%s)
+    """, [hashlib.md5(user_agent.encode('utf-8')).hexdigest() for user_agent in missing])
+
+def insert_visits(cursor, conn, visits: List[Tuple]) -> None:
+    '''Inserts (page_url, user_ip, user_agent, referrer, session_id, visited_at) rows, storing referrer and user agent as dimension ids'''
+    visits = [
+        (page_url, user_ip, user_agent or '', (referrer or '')[:255], session_id, visited_at)
+        for page_url, user_ip, user_agent, referrer, session_id, visited_at in visits
+    ]
+    referrer_ids = intern_referrers(cursor, conn, [visit[3] for visit in visits])
+    user_agent_ids = intern_user_agents(cursor, conn, [visit[2] for visit in visits])
+    
+    execute_values(cursor, """
+        INSERT INTO t_p89870318_access_bars_service.page_visits 
+        (page_url, user_ip, user_agent_id, referrer_id, session_id, visited_at)
+        VALUES %s
+    """, [
+        (page_url, user_ip, user_agent_ids[user_agent], referrer_ids[referrer], session_id, visited_at)
+        for page_url, user_ip, user_agent, referrer, session_id, visited_at in visits
+    ], page_size=max(len(visits), 1))
+
+def parse_batch_visit(visit: Any, visitor_ip: str, user_agent: str, received_at: datetime) -> Optional[Tuple]:
+    if not isinstance(visit, dict):
+        return None
+    
+    page_url = visit.get('page')
+    if not isinstance(page_url, str) or not page_url or len(page_url) > 255:
+        return None
+    
+    referrer = visit.get('referrer') or ''
+    if not isinstance(referrer, str):
+        return None
+    referrer = referrer[:255]
+    
+    session_id = visit.get('session_id')
+    if session_id is not None and (not isinstance(session_id, str) or len(session_id) > 255):
+        return None
+    
+    visited_at = received_at
+    timestamp = visit.get('timestamp')
+    if timestamp is not None:
+        if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)):
+            return None
+        try:
+            visited_at = datetime.utcfromtimestamp(timestamp / 1000)
+        except (OverflowError, OSError, ValueError):
+            return None
+        if visited_at < received_at - MAX_VISIT_AGE or visited_at > received_at + MAX_VISIT_CLOCK_SKEW:
+            return None
+    
+    return (page_url, visitor_ip, user_agent, referrer, session_id, visited_at)
+
+def count_bot_visits(cursor, visit_date: date, reason: str, visits: int) -> None:
+    cursor.execute("""
+        INSERT INTO t_p89870318_access_bars_service.page_visits_bots_daily (visit_date, reason, visits)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (visit_date, reason) DO UPDATE 
+        SET visits = page_visits_bots_daily.visits + EXCLUDED.visits
+    """, (visit_date, reason, visits))
+
+def store_visits(cursor, conn, visits: List[Tuple], bot_reason: Optional[str]) -> None:
+    '''Inserts visits from regular clients; bot hits only increment the daily per-reason counter'''
+    if bot_reason:
+        # A batch may span midnight, so every visit is counted on its own day
+        for visit_date, day_visits in sorted(Counter(visit[5].date() for visit in visits).items()):
+            count_bot_visits(cursor, visit_date, bot_reason, day_visits)
+    else:
+        insert_visits(cursor, conn, visits)
+    conn.commit()
+
+def record_visit_batch(cursor, conn, event: Dict[str, Any], visits: List[Any]) -> Dict[str, Any]:
+    if len(visits) > MAX_BATCH_VISITS:
+        return error_response(f'Too many visits in batch (max {MAX_BATCH_VISITS})', 413)
+    
+    headers = event.get('headers', {})
+    user_agent = headers.get('user-agent', headers.get('User-Agent', ''))
+    visitor_ip = get_client_ip(event)
+    received_at = datetime.utcnow()
+    bot_reason = bots.classify_visit(user_agent, visitor_ip)
+    
+    rows = []
+    for visit in visits:
+        row = parse_batch_visit(visit, visitor_ip, user_agent, received_at)
+        if row:
+            rows.append(row)
+    
+    if rows:
+        store_visits(cursor, conn, rows, bot_reason)
+    
+    return success_response({
+        'success': True,
+        'message': 'Visits recorded',
+        'accepted': len(rows),
+        'rejected': len(visits) - len(rows),
+        'timestamp': received_at.isoformat()
+    })
+
+def add_months(month: date, months: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def list_visit_partitions(cursor) -> Dict[date, str]:
+    cursor.execute("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+        WHERE ns.nspname = 't_p89870318_access_bars_service' AND parent.relname = 'page_visits'
+    """)
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def ensure_visit_partitions(cursor, conn) -> None:
+    '''Creates monthly page_visits partitions up to PARTITION_MONTHS_AHEAD; checked once per warm instance per month'''
+    global _partitions_ensured_through
+    
+    current_month = datetime.utcnow().date().replace(day=1)
+    last_month = add_months(current_month, PARTITION_MONTHS_AHEAD)
+    if _partitions_ensured_through and _partitions_ensured_through >= last_month:
+        return
+    
+    existing = list_visit_partitions(cursor)
+    month = current_month
+    while month <= last_month:
+        if month not in existing:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.page_visits_y{month.year:04d}m{month.month:02d}
+                PARTITION OF t_p89870318_access_bars_service.page_visits
+                FOR VALUES FROM (%s) TO (%s)
+            """, (month, add_months(month, 1)))
+        month = add_months(month, 1)
+    conn.commit()
+    
+    _partitions_ensured_through = last_month
+
+def drop_expired_visit_partitions(cursor, conn, rolled_up_through: Optional[date]) -> List[str]:
+    '''Detaches and drops partitions older than the retention window once their days are rolled up'''
+    if not rolled_up_through or VISIT_RETENTION_MONTHS <= 0:
+        return []
+    
+    # The watermark row serializes instances: whoever holds it drops, the others skip instead of waiting
+    cursor.execute("""
+        SELECT 1 FROM t_p89870318_access_bars_service.analytics_rollup_state 
+        WHERE id = 1 FOR UPDATE SKIP LOCKED
+    """)
+    if cursor.fetchone() is None:
+        conn.commit()
+        return []
+    
+    cutoff = add_months(datetime.utcnow().date().replace(day=1), -VISIT_RETENTION_MONTHS)
+    dropped = []
+    for month, name in sorted(list_visit_partitions(cursor).items()):
+        month_end = add_months(month, 1)
+        if month_end > cutoff or month_end > rolled_up_through:
+            continue
+        cursor.execute(f"ALTER TABLE t_p89870318_access_bars_service.page_visits DETACH PARTITION t_p89870318_access_bars_service.{name}")
+        cursor.execute(f"DROP TABLE t_p89870318_access_bars_service.{name}")
+        dropped.append(name)
+    conn.commit()
+    
+    return dropped
+
+def rollup_closed_days(cursor, conn) -> Optional[date]:
+    '''Folds closed days past the watermark into the daily rollup tables, returns the new watermark'''
+    closed_before = (datetime.utcnow() - MAX_VISIT_AGE).date()
+    
+    cursor.execute("""
+        SELECT rolled_up_through FROM t_p89870318_access_bars_service.analytics_rollup_state 
+        WHERE id = 1 FOR UPDATE SKIP LOCKED
+    """)
+    state = cursor.fetchone()
+    if state is None:
+        # Another instance is rolling up right now; its watermark will be read next time
+        conn.commit()
+        return read_rollup_watermark(cursor)
+    rolled_up_through = state[0]
+    
+    if rolled_up_through is None:
+        cursor.execute("SELECT MIN(visited_at)::date FROM t_p89870318_access_bars_service.page_visits")
+        rolled_up_through = cursor.fetchone()[0] or closed_before
+    
+    if rolled_up_through >= closed_before:
+        conn.commit()
+        return rolled_up_through
+    
+    rollup_end = min(closed_before, rolled_up_through + timedelta(days=ROLLUP_MAX_DAYS_PER_RUN))
+    day_range = (rolled_up_through, rollup_end)
+    visit_range = (datetime.combine(rolled_up_through, time.min), datetime.combine(rollup_end, time.min))
+    
+    for table in ('page_visits_daily', 'page_visits_daily_pages', 'page_visits_daily_referrers'):
+        cursor.execute(f"""
+            DELETE FROM t_p89870318_access_bars_service.{table} 
+            WHERE visit_date >= %s AND visit_date < %s
+        """, day_range)
+    
+    cursor.execute("""
+        INSERT INTO t_p89870318_access_bars_service.page_visits_daily (visit_date, visits)
+        SELECT DATE(visited_at), COUNT(*)
+        FROM t_p89870318_access_bars_service.page_visits 
+        WHERE visited_at >= %s AND visited_at < %s
+        GROUP BY DATE(visited_at)
+    """, visit_range)
+    cursor.execute("""
+        INSERT INTO t_p89870318_access_bars_service.page_visits_daily_pages (visit_date, page_url, visits)
+        SELECT DATE(visited_at), page_url, COUNT(*)
+        FROM t_p89870318_access_bars_service.page_visits 
+        WHERE visited_at >= %s AND visited_at < %s
+        GROUP BY DATE(visited_at), page_url
+    """, visit_range)
+    cursor.execute("""
+        INSERT INTO t_p89870318_access_bars_service.page_visits_daily_referrers (visit_date, referrer_id, visits)
+        SELECT DATE(visited_at), referrer_id, COUNT(*)
+        FROM t_p89870318_access_bars_service.page_visits 
+        WHERE visited_at >= %s AND visited_at < %s
+        GROUP BY DATE(visited_at), referrer_id
+    """, visit_range)
+    sketches = {}
+    with conn.cursor(name='rollup_visitors') as visitors_cursor:
+        visitors_cursor.itersize = 10000
+        visitors_cursor.execute("""
+            SELECT DISTINCT DATE(visited_at), user_ip
+            FROM t_p89870318_access_bars_service.page_visits 
+            WHERE visited_at >= %s AND visited_at < %s AND user_ip IS NOT NULL
+        """, visit_range)
+        for visit_date, user_ip in visitors_cursor:
+            if visit_date not in sketches:
+                sketches[visit_date] = hll.new_sketch()
+            hll.add(sketches[visit_date], user_ip)
+    
+    if sketches:
+        execute_values(cursor, """
+            UPDATE t_p89870318_access_bars_service.page_visits_daily AS daily
+            SET visitor_sketch = sketches.visitor_sketch
+            FROM (VALUES %s) AS sketches (visit_date, visitor_sketch)
+            WHERE daily.visit_date = sketches.visit_date
+        """, [(visit_date, psycopg2.Binary(hll.serialize(registers))) for visit_date, registers in sketches.items()],
+            template='(%s::date, %s::bytea)', page_size=len(sketches))
+    
+    cursor.execute("""
+        UPDATE t_p89870318_access_bars_service.analytics_rollup_state 
+        SET rolled_up_through = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1
+    """, (rollup_end,))
+    conn.commit()
+    
+    return rollup_end
+
+def read_rollup_watermark(cursor) -> Optional[date]:
+    cursor.execute("""
+        SELECT rolled_up_through FROM t_p89870318_access_bars_service.analytics_rollup_state WHERE id = 1
+    """)
+    state = cursor.fetchone()
+    return state[0] if state else None
+
+def maintain_visit_tables(cursor, conn) -> Dict[str, Any]:
+    '''Timer-trigger job: creates upcoming partitions, rolls up closed days and drops expired partitions'''
+    ensure_visit_partitions(cursor, conn)
+    rolled_up_through = rollup_closed_days(cursor, conn)
+    dropped = drop_expired_visit_partitions(cursor, conn, rolled_up_through)
+    return {
+        'rolled_up_through': rolled_up_through.isoformat() if rolled_up_through else None,
+        'dropped_partitions': dropped
+    }
+
+def visit_window_rollup_range(start_date: datetime, end_date: datetime, rolled_up_through: Optional[date]) -> Tuple[date, date]:
+    '''Whole days of the window that can be read from the rollups: [rollup_start, rollup_end)'''
+    rollup_start = start_date.date() if start_date.time() == time.min else start_date.date() + timedelta(days=1)
+    rollup_end = min(rolled_up_through, end_date.date()) if rolled_up_through else rollup_start
+    if rollup_end <= rollup_start:
+        rollup_start = rollup_end = start_date.date()
+    return rollup_start, rollup_end
+
+def new_visit_counts() -> Dict[str, Any]:
+    return {'total': 0, 'pages': {}, 'days': {}, 'referrers': {}, 'sketch': None, 'visitors': [], 'unique': None}
+
+def query_rollup_counts(cursor, rollup_start: date, rollup_end: date) -> Dict[str, Any]:
+    counts = new_visit_counts()
+    if rollup_end <= rollup_start:
+        return counts
+    
+    cursor.execute("""
+        (SELECT 'day', visit_date::text, visits
+         FROM t_p89870318_access_bars_service.page_visits_daily 
+         WHERE visit_date >= %(rollup_start)s AND visit_date < %(rollup_end)s)
+        UNION ALL
+        (SELECT 'page', page_url, SUM(visits)::bigint
+         FROM t_p89870318_access_bars_service.page_visits_daily_pages 
+         WHERE visit_date >= %(rollup_start)s AND visit_date < %(rollup_end)s
+         GROUP BY page_url)
+        UNION ALL
+        (SELECT 'referrer', COALESCE(NULLIF(referrers.referrer_url, ''), 'Direct'), referrer_visits.visits
+         FROM (
+             SELECT referrer_id, SUM(visits)::bigint AS visits
+             FROM t_p89870318_access_bars_service.page_visits_daily_referrers 
+             WHERE visit_date >= %(rollup_start)s AND visit_date < %(rollup_end)s
+             GROUP BY referrer_id
+         ) AS referrer_visits
+         JOIN t_p89870318_access_bars_service.visit_referrers AS referrers ON referrers.id = referrer_visits.referrer_id)
+    """, {'rollup_start': rollup_start, 'rollup_end': rollup_end})
+    
+    for dimension, value, visits in cursor.fetchall():
+        if dimension == 'day':
+            counts['days'][value] = visits
+            counts['total'] += visits
+        elif dimension == 'page':
+            counts['pages'][value] = visits
+        elif dimension == 'referrer':
+            counts['referrers'][value] = counts['referrers'].get(value, 0) + visits
+    
+    cursor.execute("""
+        SELECT visitor_sketch FROM t_p89870318_access_bars_service.page_visits_daily 
+        WHERE visit_date >= %s AND visit_date < %s AND visitor_sketch IS NOT NULL
+    """, (rollup_start, rollup_end))
+    sketches = cursor.fetchall()
+    if sketches:
+        counts['sketch'] = hll.new_sketch()
+        for (visitor_sketch,) in sketches:
+            hll.merge(counts['sketch'], hll.deserialize(visitor_sketch))
+    
+    return counts
+
+def query_raw_counts(cursor, start_date: datetime, end_date: datetime, rollup_start: date, rollup_end: date, exact_unique: bool) -> Dict[str, Any]:
+    '''Aggregates the window days not covered by the rollups in one statement that scans page_visits once'''
+    if exact_unique:
+        unique_visitors_query = """(SELECT 'unique', NULL, COUNT(DISTINCT user_ip)
+         FROM t_p89870318_access_bars_service.page_visits 
+         WHERE visited_at >= %(start)s AND visited_at <= %(end)s)"""
+    else:
+        unique_visitors_query = """(SELECT DISTINCT 'visitor', user_ip, 0::bigint
+         FROM window_visits
+         WHERE user_ip IS NOT NULL)"""
+    
+    cursor.execute(f"""
+        WITH window_visits AS MATERIALIZED (
+            SELECT page_url, user_ip, DATE(visited_at) AS visit_date, referrer_id
+            FROM t_p89870318_access_bars_service.page_visits 
+            WHERE (visited_at >= %(start)s AND visited_at < %(raw_head_end)s)
+               OR (visited_at >= %(raw_tail_start)s AND visited_at <= %(end)s)
+        )
+        (SELECT 'day', visit_date::text, COUNT(*) FROM window_visits GROUP BY visit_date)
+        UNION ALL
+        (SELECT 'page', page_url, COUNT(*) FROM window_visits GROUP BY page_url)
+        UNION ALL
+        (SELECT 'referrer', COALESCE(NULLIF(referrers.referrer_url, ''), 'Direct'), referrer_visits.visits
+         FROM (SELECT referrer_id, COUNT(*) AS visits FROM window_visits GROUP BY referrer_id) AS referrer_visits
+         JOIN t_p89870318_access_bars_service.visit_referrers AS referrers ON referrers.id = referrer_visits.referrer_id)
+        UNION ALL
+        {unique_visitors_query}
+    """, {
+        'start': start_date,
+        'end': end_date,
+        'raw_head_end': max(start_date, datetime.combine(rollup_start, time.min)),
+        'raw_tail_start': max(start_date, datetime.combine(rollup_end, time.min))
+    })
+    
+    counts = new_visit_counts()
+    for dimension, value, visits in cursor.fetchall():
+        if dimension == 'day':
+            counts['days'][value] = visits
+            counts['total'] += visits
+        elif dimension == 'page':
+            counts['pages'][value] = visits
+        elif dimension == 'referrer':
+            counts['referrers'][value] = counts['referrers'].get(value, 0) + visits
+        elif dimension == 'visitor':
+            counts['visitors'].append(value)
+        elif dimension == 'unique':
+            counts['unique'] = visits
+    
+    return counts
+
+def top_counts(*sources: Dict[str, int], limit: int = 10) -> List[Tuple[str, int]]:
+    merged = {}
+    for source in sources:
+        for key, visits in source.items():
+            merged[key] = merged.get(key, 0) + visits
+    return sorted(merged.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+def combine_visit_counts(rollup_counts: Dict[str, Any], raw_counts: Dict[str, Any]) -> Dict[str, Any]:
+    if raw_counts['unique'] is not None:
+        unique_visitors = raw_counts['unique']
+    elif rollup_counts['sketch'] is None:
+        unique_visitors = len(raw_counts['visitors'])
+    else:
+        merged = bytearray(rollup_counts['sketch'])
+        for user_ip in raw_counts['visitors']:
+            hll.add(merged, user_ip)
+        unique_visitors = hll.estimate(merged)
+    
+    days = dict(rollup_counts['days'])
+    days.update(raw_counts['days'])
+    
+    return {
+        'total_visits': rollup_counts['total'] + raw_counts['total'],
+        'unique_visitors': unique_visitors,
+        'top_pages': [
+            {'page_url': page_url, 'visits': visits}
+            for page_url, visits in top_counts(rollup_counts['pages'], raw_counts['pages'])
+        ],
+        'daily_stats': [{'visit_date': visit_date, 'visits': days[visit_date]} for visit_date in sorted(days)],
+        'top_referrers': [
+            {'referrer': referrer, 'visits': visits}
+            for referrer, visits in top_counts(rollup_counts['referrers'], raw_counts['referrers'])
+        ]
+    }
+
+def analytics_cache_get(key: Tuple, ttl_seconds: Optional[int] = None) -> Any:
+    entry = _analytics_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if ttl_seconds is not None and clock.monotonic() - stored_at >= ttl_seconds:
+        return None
+    _analytics_cache.move_to_end(key)
+    return value
+
+def analytics_cache_put(key: Tuple, value: Any) -> None:
+    if ANALYTICS_CACHE_MAX_ENTRIES <= 0:
+        return
+    _analytics_cache[key] = (clock.monotonic(), value)
+    _analytics_cache.move_to_end(key)
+    while len(_analytics_cache) > ANALYTICS_CACHE_MAX_ENTRIES:
+        _analytics_cache.popitem(last=False)
+
+def analytics_cache_headers(status: str) -> Dict[str, str]:
+    _analytics_cache_stats[status] += 1
+    return {
+        'X-Analytics-Cache': status.upper(),
+        'X-Analytics-Cache-Hits': str(_analytics_cache_stats['hit']),
+        'X-Analytics-Cache-Partial-Hits': str(_analytics_cache_stats['partial']),
+        'X-Analytics-Cache-Misses': str(_analytics_cache_stats['miss']),
+        'Access-Control-Expose-Headers': 'X-Analytics-Cache, X-Analytics-Cache-Hits, X-Analytics-Cache-Partial-Hits, X-Analytics-Cache-Misses'
+    }
+
+def compute_visit_aggregates(cursor, start_date: datetime, end_date: datetime, rolled_up_through: Optional[date] = None, exact_unique: bool = False) -> Dict[str, Any]:
+    '''
+    Computes every dashboard aggregate. Whole days before rolled_up_through are read from the
+    daily rollups; only the partial edge days scan page_visits. Unique visitors merge the
+    per-day HLL sketches unless exact_unique asks for COUNT(DISTINCT) over the raw window
+    '''
+    rollup_start, rollup_end = visit_window_rollup_range(start_date, end_date, rolled_up_through)
+    return combine_visit_counts(
+        query_rollup_counts(cursor, rollup_start, rollup_end),
+        query_raw_counts(cursor, start_date, end_date, rollup_start, rollup_end, exact_unique)
+    )
+
+def parse_export_cursor(value: str) -> Tuple[datetime, int]:
+    visited_at, _, visit_id = value.rpartition(',')
+    try:
+        return datetime.fromisoformat(visited_at), int(visit_id)
+    except ValueError:
+        raise ValueError('Invalid export cursor, expected "<visited_at>,<id>"')
+
+def format_export_rows(rows: List[Tuple], export_format: str) -> str:
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        return buffer.getvalue()
+    return ''.join(
+        json.dumps(dict(zip(VISIT_EXPORT_COLUMNS, row)), ensure_ascii=False, default=str) + '\n'
+        for row in rows
+    )
+
+def export_visits(conn, start_date: datetime, end_date: datetime, after: Optional[Tuple[datetime, int]], limit: int, export_format: str) -> Tuple[bytes, int, Optional[Tuple[datetime, int]]]:
+    '''
+    Streams one page of raw visits in (visited_at, id) order into a gzip member.
+    Rows are read from a server-side cursor in fixed chunks and compressed as they arrive,
+    so memory is bounded by the page size, not by the export range.
+    Returns (gzipped body, row count, last (visited_at, id) when more rows may follow).
+    '''
+    after_visited_at, after_id = after or (start_date, 0)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    chunks = []
+    row_count = 0
+    last_key = None
+    
+    if export_format == 'csv' and after is None:
+        chunks.append(compressor.compress(format_export_rows([VISIT_EXPORT_COLUMNS], 'csv').encode('utf-8')))
+    
+    with conn.cursor(name='visit_export') as cursor:
+        cursor.itersize = VISIT_EXPORT_CHUNK_ROWS
+        cursor.execute("""
+            SELECT visits.id, visits.page_url, visits.user_ip, user_agents.user_agent, 
+                   referrers.referrer_url, visits.session_id, visits.visited_at
+            FROM t_p89870318_access_bars_service.page_visits AS visits
+            JOIN t_p89870318_access_bars_service.visit_user_agents AS user_agents ON user_agents.id = visits.user_agent_id
+            JOIN t_p89870318_access_bars_service.visit_referrers AS referrers ON referrers.id = visits.referrer_id
+            WHERE visits.visited_at >= %s AND visits.visited_at < %s
+              AND (visits.visited_at, visits.id) > (%s, %s)
+            ORDER BY visits.visited_at, visits.id
+            LIMIT %s
+        """, (start_date, end_date, after_visited_at, after_id, limit))
+        
+        while True:
+            rows = cursor.fetchmany(VISIT_EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            chunks.append(compressor.compress(format_export_rows(rows, export_format).encode('utf-8')))
+            row_count += len(rows)
+            last_key = (rows[-1][6], rows[-1][0])
+    
+    conn.commit()
+    chunks.append(compressor.flush())
+    return b''.join(chunks), row_count, last_key if row_count == limit else None
+
+def handle_visit_export(event: Dict[str, Any], params: Dict[str, str]) -> Dict[str, Any]:
+    if not shared_auth.verify_admin_request(event):
+        return error_response('Unauthorized', 401)
+    
+    export_format = params.get('export', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return error_response('export must be ndjson or csv', 400)
+    
+    try:
+        end_day = date.fromisoformat(params['to']) if params.get('to') else date.today()
+        start_day = date.fromisoformat(params['from']) if params.get('from') else end_day - timedelta(days=30)
+        after = parse_export_cursor(params['cursor']) if params.get('cursor') else None
+        limit = min(max(int(params.get('limit', VISIT_EXPORT_PAGE_ROWS)), 1), VISIT_EXPORT_PAGE_ROWS)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    
+    if start_day > end_day:
+        return error_response('from must not be after to', 400)
+    
+    conn = None
+    
+    try:
+        conn = get_db_connection()
+        body, row_count, next_key = export_visits(
+            conn,
+            datetime.combine(start_day, time.min),
+            datetime.combine(end_day + timedelta(days=1), time.min),
+            after,
+            limit,
+            export_format
+        )
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        return error_response(str(e), 500)
+    finally:
+        if conn:
+            conn.close()
+    
+    next_cursor = f'{next_key[0].isoformat()},{next_key[1]}' if next_key else ''
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/gzip',
+            'Content-Disposition': f'attachment; filename="page_visits_{start_day}_{end_day}.{export_format}.gz"',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'X-Export-Content-Type, X-Export-Rows, X-Export-Next-Cursor',
+            'X-Export-Content-Type': content_type,
+            'X-Export-Rows': str(row_count),
+            'X-Export-Next-Cursor': next_cursor
+        },
+        'body': base64.b64encode(body).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+def cached_login_failures(client_ip: str) -> Optional[List[datetime]]:
+    '''Failed attempts of the IP known to this warm instance, used only to answer lockouts; None once older than LOGIN_STATE_SYNC_SECONDS'''
+    entry = _login_failures.get(client_ip)
+    if entry is None or clock.monotonic() - entry[0] >= LOGIN_STATE_SYNC_SECONDS:
+        return None
+    return entry[1]
+
+def remember_login_failures(client_ip: str, failures: List[datetime], synced_at: Optional[float] = None) -> None:
+    now = clock.monotonic()
+    _login_failures[client_ip] = (now if synced_at is None else synced_at, failures[-LOGIN_MAX_FAILED_ATTEMPTS:])
+    
+    if len(_login_failures) > LOGIN_TRACKED_IPS:
+        for ip, (ip_synced_at, _) in list(_login_failures.items()):
+            if now - ip_synced_at >= LOGIN_STATE_SYNC_SECONDS:
+                del _login_failures[ip]
+        if len(_login_failures) > LOGIN_TRACKED_IPS:
+            _login_failures.clear()
+
+def load_login_failures(cursor, client_ip: str) -> List[datetime]:
+    '''The latest failed attempts of the IP (at most LOGIN_MAX_FAILED_ATTEMPTS) - enough to decide on a lockout and its end'''
+    cursor.execute("""
+        SELECT recent_failures FROM login_ip_state WHERE ip_address = %s
+    """, (client_ip,))
+    row = cursor.fetchone()
+    return list(row[0]) if row else []
+
+def record_login_failure(cursor, client_ip: str) -> List[datetime]:
+    '''Journals the failed attempt and folds it into login_ip_state in one statement, returns the updated failures'''
+    cursor.execute("""
+        WITH attempt AS (
+            INSERT INTO login_attempts (ip_address, success) 
+            VALUES (%(ip)s, FALSE)
+            RETURNING ip_address, attempt_time
+        )
+        INSERT INTO login_ip_state AS state (ip_address, recent_failures, updated_at)
+        SELECT ip_address, ARRAY[attempt_time], attempt_time FROM attempt
+        ON CONFLICT (ip_address) DO UPDATE SET
+            recent_failures = ARRAY(
+                SELECT failure FROM (
+                    SELECT failure 
+                    FROM unnest(state.recent_failures || EXCLUDED.recent_failures) AS failure
+                    WHERE failure > EXCLUDED.updated_at - %(lockout)s
+                    ORDER BY failure DESC
+                    LIMIT %(max_failures)s
+                ) AS latest
+                ORDER BY failure
+            ),
+            updated_at = EXCLUDED.updated_at
+        RETURNING recent_failures
+    """, {'ip': client_ip, 'lockout': LOGIN_LOCKOUT, 'max_failures': LOGIN_MAX_FAILED_ATTEMPTS})
+    return list(cursor.fetchone()[0])
+
+def prune_login_attempts(cursor, conn) -> int:
+    '''Deletes journal rows past LOGIN_ATTEMPTS_RETENTION_DAYS and idle IP states in short batches; run by the timer trigger'''
+    now = datetime.utcnow()
+    cursor.execute("""
+        DELETE FROM login_ip_state WHERE updated_at < %s
+    """, (now - LOGIN_LOCKOUT,))
+    conn.commit()
+    
+    pruned = 0
+    for _ in range(LOGIN_PRUNE_MAX_BATCHES):
+        cursor.execute("""
+            DELETE FROM login_attempts 
+            WHERE id IN (
+                SELECT id FROM login_attempts 
+                WHERE attempt_time < %s 
+                ORDER BY attempt_time 
+                LIMIT %s
+            )
+        """, (now - timedelta(days=LOGIN_ATTEMPTS_RETENTION_DAYS), LOGIN_PRUNE_BATCH_ROWS))
+        conn.commit()
+        pruned += cursor.rowcount
+        if cursor.rowcount < LOGIN_PRUNE_BATCH_ROWS:
+            break
+    
+    return pruned
+
+def login_lockout_seconds(failures: List[datetime], now: datetime) -> int:
+    recent = [attempt_time for attempt_time in failures if attempt_time > now - LOGIN_LOCKOUT]
+    if len(recent) < LOGIN_MAX_FAILED_ATTEMPTS:
+        return 0
+    return int((recent[-1] + LOGIN_LOCKOUT - now).total_seconds())
+
+def too_many_attempts_response(wait_seconds: int) -> Dict[str, Any]:
+    return {
+        'statusCode': 429,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Retry-After': str(wait_seconds)
+        },
+        'isBase64Encoded': False,
+        'body': json.dumps({
+            'success': False,
+            'error': f'Too many failed attempts. Try again in {wait_seconds // 60} minutes'
+        })
+    }
+
 def handle_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'POST')
     
@@ -64,16 +834,14 @@ def handle_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not correct_password:
             return error_response('PASSWORD not configured', 500)
         
-        headers = event.get('headers', {})
-        request_context = event.get('requestContext', {})
+        client_ip = get_client_ip(event)
         
-        client_ip = (
-            headers.get('x-real-ip') or 
-            headers.get('X-Real-Ip') or
-            headers.get('x-original-forwarded-for', '').split(',')[0].strip() or
-            headers.get('X-Original-Forwarded-For', '').split(',')[0].strip() or
-            request_context.get('identity', {}).get('sourceIp', 'unknown')
-        )
+        # A locked out IP is answered from instance memory without touching the database
+        failures = cached_login_failures(client_ip)
+        if failures is not None:
+            wait_seconds = login_lockout_seconds(failures, datetime.utcnow())
+            if wait_seconds > 0:
+                return too_many_attempts_response(wait_seconds)
         
         conn = None
         cursor = None
@@ -82,40 +850,14 @@ def handle_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-            
-            cursor.execute("""
-                SELECT COUNT(*) FROM login_attempts 
-                WHERE ip_address = %s AND attempt_time > %s AND success = FALSE
-            """, (client_ip, one_hour_ago))
+            # Memory only answers lockouts: other instances may have recorded failures since the last sync
+            synced_at = clock.monotonic()
+            failures = load_login_failures(cursor, client_ip)
+            remember_login_failures(client_ip, failures, synced_at)
             
-            failed_attempts = cursor.fetchone()[0]
-            
-            if failed_attempts >= 5:
-                cursor.execute("""
-                    SELECT MAX(attempt_time) FROM login_attempts 
-                    WHERE ip_address = %s AND success = FALSE
-                """, (client_ip,))
-                
-                last_attempt = cursor.fetchone()[0]
-                if last_attempt:
-                    wait_until = last_attempt + timedelta(hours=1)
-                    wait_seconds = int((wait_until - datetime.utcnow()).total_seconds())
-                    
-                    if wait_seconds > 0:
-                        return {
-                            'statusCode': 429,
-                            'headers': {
-                                'Content-Type': 'application/json',
-                                'Access-Control-Allow-Origin': '*',
-                                'Retry-After': str(wait_seconds)
-                            },
-                            'isBase64Encoded': False,
-                            'body': json.dumps({
-                                'success': False,
-                                'error': f'Too many failed attempts. Try again in {wait_seconds // 60} minutes'
-                            })
-                        }
+            wait_seconds = login_lockout_seconds(failures, datetime.utcnow())
+            if wait_seconds > 0:
+                return too_many_attempts_response(wait_seconds)
             
             body_data = json.loads(event.get('body', '{}'))
             provided_password = body_data.get('password', '')
@@ -124,8 +866,13 @@ def handle_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             correct_bytes = correct_password.encode('utf-8')
             
             if secrets.compare_digest(provided_bytes, correct_bytes):
-                session_token = secrets.token_urlsafe(32)
-                expires_at = (datetime.utcnow() + timedelta(hours=24)).isoformat()
+                if shared_auth.signing_keys():
+                    ttl_seconds = int(os.environ.get('ADMIN_TOKEN_TTL_SECONDS', shared_auth.DEFAULT_TOKEN_TTL_SECONDS))
+                    admin_token, expires_timestamp = shared_auth.issue_admin_token('admin', ttl_seconds)
+                    expires_at = datetime.utcfromtimestamp(expires_timestamp).isoformat()
+                else:
+                    admin_token = os.environ.get('ADMIN_TOKEN', secrets.token_urlsafe(32))
+                    expires_at = (datetime.utcnow() + timedelta(hours=24)).isoformat()
                 
                 cursor.execute("""
                     INSERT INTO login_attempts (ip_address, success) 
@@ -133,8 +880,6 @@ def handle_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 """, (client_ip,))
                 conn.commit()
                 
-                admin_token = os.environ.get('ADMIN_TOKEN', session_token)
-                
                 return success_response({
                     'success': True,
                     'token': admin_token,
@@ -142,11 +887,10 @@ def handle_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'message': 'Authentication successful'
                 })
             else:
-                cursor.execute("""
-                    INSERT INTO login_attempts (ip_address, success) 
-                    VALUES (%s, FALSE)
-                """, (client_ip,))
+                synced_at = clock.monotonic()
+                failures = record_login_failure(cursor, client_ip)
                 conn.commit()
+                remember_login_failures(client_ip, failures, synced_at)
                 
                 return error_response('Invalid password', 401)
         
@@ -172,6 +916,31 @@ def handle_analytics(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     if method == 'OPTIONS':
         return cors_response('GET, POST, OPTIONS')
     
+    if method == 'GET':
+        params = event.get('queryStringParameters', {}) or {}
+        if params.get('export'):
+            return handle_visit_export(event, params)
+        
+        try:
+            period_days = int(params.get('days', 7))
+        except ValueError as e:
+            return error_response(str(e), 500)
+        
+        if period_days < 1 or period_days > 365:
+            period_days = 7
+        
+        exact_unique = params.get('exact', '').lower() == 'true'
+        
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=period_days)
+        
+        response_key = ('response', period_days, exact_unique, end_date.date())
+        analytics_data = analytics_cache_get(response_key, ANALYTICS_CACHE_TTL_SECONDS)
+        if analytics_data is not None:
+            response = success_response(analytics_data)
+            response['headers'].update(analytics_cache_headers('hit'))
+            return response
+    
     conn = None
     cursor = None
     
@@ -180,32 +949,23 @@ def handle_analytics(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         cursor = conn.cursor()
         
         if method == 'POST':
+            ensure_visit_partitions(cursor, conn)
             body_data = json.loads(event.get('body', '{}'))
+            
+            if isinstance(body_data.get('visits'), list):
+                return record_visit_batch(cursor, conn, event, body_data['visits'])
+            
             headers = event.get('headers', {})
-            request_context = event.get('requestContext', {})
             
             page_url = body_data.get('page', '/')
             user_agent = headers.get('user-agent', headers.get('User-Agent', ''))
             referrer = headers.get('referer', headers.get('Referer', ''))
-            
-            visitor_ip = (
-                headers.get('x-real-ip') or 
-                headers.get('X-Real-Ip') or
-                headers.get('x-original-forwarded-for', '').split(',')[0].strip() or
-                headers.get('X-Original-Forwarded-For', '').split(',')[0].strip() or
-                request_context.get('identity', {}).get('sourceIp', 'unknown')
-            )
+            visitor_ip = get_client_ip(event)
             
             visit_time = datetime.utcnow()
+            bot_reason = bots.classify_visit(user_agent, visitor_ip)
             
-            insert_query = """
-                INSERT INTO t_p89870318_access_bars_service.page_visits 
-                (page_url, user_ip, user_agent, referrer, visited_at)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            
-            cursor.execute(insert_query, (page_url, visitor_ip, user_agent, referrer, visit_time))
-            conn.commit()
+            store_visits(cursor, conn, [(page_url, visitor_ip, user_agent, referrer, None, visit_time)], bot_reason)
             
             return success_response({
                 'success': True,
@@ -214,73 +974,25 @@ def handle_analytics(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             })
             
         elif method == 'GET':
-            params = event.get('queryStringParameters', {}) or {}
-            period_days = int(params.get('days', 7))
+            # Rollups and partitions are maintained by the timer trigger; the read path only reads the watermark
+            rolled_up_through = read_rollup_watermark(cursor)
             
-            if period_days < 1 or period_days > 365:
-                period_days = 7
+            rollup_start, rollup_end = visit_window_rollup_range(start_date, end_date, rolled_up_through)
             
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=period_days)
+            rollup_key = ('rollup', rollup_start, rollup_end)
+            rollup_counts = analytics_cache_get(rollup_key)
+            cache_status = 'partial' if rollup_counts is not None else 'miss'
+            if rollup_counts is None:
+                rollup_counts = query_rollup_counts(cursor, rollup_start, rollup_end)
+                analytics_cache_put(rollup_key, rollup_counts)
             
-            total_visits_query = """
-                SELECT COUNT(*) as total_visits
-                FROM t_p89870318_access_bars_service.page_visits 
-                WHERE visited_at >= %s AND visited_at <= %s
-            """
-            cursor.execute(total_visits_query, (start_date, end_date))
-            total_visits = cursor.fetchone()[0]
+            raw_counts = query_raw_counts(cursor, start_date, end_date, rollup_start, rollup_end, exact_unique)
+            analytics_data = {'period_days': period_days, **combine_visit_counts(rollup_counts, raw_counts)}
+            analytics_cache_put(response_key, analytics_data)
             
-            unique_visitors_query = """
-                SELECT COUNT(DISTINCT user_ip) as unique_visitors
-                FROM t_p89870318_access_bars_service.page_visits 
-                WHERE visited_at >= %s AND visited_at <= %s
-            """
-            cursor.execute(unique_visitors_query, (start_date, end_date))
-            unique_visitors = cursor.fetchone()[0]
-            
-            top_pages_query = """
-                SELECT page_url, COUNT(*) as visits
-                FROM t_p89870318_access_bars_service.page_visits 
-                WHERE visited_at >= %s AND visited_at <= %s
-                GROUP BY page_url 
-                ORDER BY visits DESC 
-                LIMIT 10
-            """
-            cursor.execute(top_pages_query, (start_date, end_date))
-            top_pages = [{'page_url': row[0], 'visits': row[1]} for row in cursor.fetchall()]
-            
-            daily_stats_query = """
-                SELECT DATE(visited_at) as visit_date, COUNT(*) as visits
-                FROM t_p89870318_access_bars_service.page_visits 
-                WHERE visited_at >= %s AND visited_at <= %s
-                GROUP BY DATE(visited_at) 
-                ORDER BY visit_date
-            """
-            cursor.execute(daily_stats_query, (start_date, end_date))
-            daily_stats = [{'visit_date': str(row[0]), 'visits': row[1]} for row in cursor.fetchall()]
-            
-            top_referrers_query = """
-                SELECT COALESCE(NULLIF(referrer, ''), 'Direct') as referrer, COUNT(*) as visits
-                FROM t_p89870318_access_bars_service.page_visits 
-                WHERE visited_at >= %s AND visited_at <= %s
-                GROUP BY COALESCE(NULLIF(referrer, ''), 'Direct')
-                ORDER BY visits DESC 
-                LIMIT 10
-            """
-            cursor.execute(top_referrers_query, (start_date, end_date))
-            top_referrers = [{'referrer': row[0], 'visits': row[1]} for row in cursor.fetchall()]
-            
-            analytics_data = {
-                'period_days': period_days,
-                'total_visits': total_visits,
-                'unique_visitors': unique_visitors,
-                'top_pages': top_pages,
-                'daily_stats': daily_stats,
-                'top_referrers': top_referrers
-            }
-            
-            return success_response(analytics_data)
+            response = success_response(analytics_data)
+            response['headers'].update(analytics_cache_headers(cache_status))
+            return response
         
         else:
             return error_response('Method not allowed', 405)
@@ -294,7 +1006,38 @@ def handle_analytics(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if conn:
             conn.close()
 
+def timer_trigger_payload(event: Dict[str, Any]) -> Optional[str]:
+    '''Payload of a cloud timer trigger event ('' when not set), None for HTTP requests'''
+    messages = event.get('messages') or []
+    if not messages or not str(messages[0].get('event_metadata', {}).get('event_type', '')).endswith('TimerMessage'):
+        return None
+    return str((messages[0].get('details') or {}).get('payload') or '')
+
+def run_maintenance() -> Dict[str, Any]:
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        report = maintain_visit_tables(cursor, conn)
+        report['pruned_login_attempts'] = prune_login_attempts(cursor, conn)
+        return report
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    if timer_trigger_payload(event) is not None:
+        # The function's timer trigger runs table maintenance off the request path
+        try:
+            return success_response({'success': True, **run_maintenance()})
+        except Exception as e:
+            print(f"ERROR in maintenance: {str(e)}")
+            return error_response(str(e), 500)
+    
     params = event.get('queryStringParameters', {}) or {}
     endpoint = params.get('endpoint', 'auth')
     
@@ -5,13 +5,74 @@ Args: event - dict with httpMethod, body, queryStringParameters
 Returns: HTTP response with reviews data or notification status
 '''
 
+import base64
+import hashlib
 import json
 import os
 import smtplib
+import threading
+import time as clock
 import psycopg2
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import shared_auth
+
+REVIEWS_PAGE_DEFAULT_LIMIT = 20
+REVIEWS_PAGE_MAX_LIMIT = 100
+REVIEWS_BULK_MAX_IDS = 1000
+REVIEWS_CACHE_MAX_ENTRIES = int(os.environ.get('REVIEWS_CACHE_MAX_ENTRIES', '64'))
+REVIEWS_VERSION_CHECK_SECONDS = int(os.environ.get('REVIEWS_VERSION_CHECK_SECONDS', '5'))
+REVIEWS_CACHE_MAX_AGE_SECONDS = int(os.environ.get('REVIEWS_CACHE_MAX_AGE_SECONDS', '60'))
+SMTP_TIMEOUT_SECONDS = int(os.environ.get('SMTP_TIMEOUT_SECONDS', '10'))
+SMTP_NOOP_AFTER_SECONDS = int(os.environ.get('SMTP_NOOP_AFTER_SECONDS', '5'))
+SMTP_MAX_IDLE_SECONDS = int(os.environ.get('SMTP_MAX_IDLE_SECONDS', '120'))
+EMAIL_SETTINGS_CHECK_SECONDS = int(os.environ.get('EMAIL_SETTINGS_CHECK_SECONDS', '30'))
+EMAIL_SETTINGS_TTL_SECONDS = int(os.environ.get('EMAIL_SETTINGS_TTL_SECONDS', '600'))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', '50'))
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS', '300'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_SECONDS', '60'))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(os.environ.get('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', '3600'))
+EMAIL_OUTBOX_RUN_SECONDS = int(os.environ.get('EMAIL_OUTBOX_RUN_SECONDS', '25'))
+EMAIL_INLINE_DISPATCH_BATCH = int(os.environ.get('EMAIL_INLINE_DISPATCH_BATCH', '0'))
+REMINDER_SMTP_SESSIONS = int(os.environ.get('REMINDER_SMTP_SESSIONS', '4'))
+REMINDER_TIMEZONE = os.environ.get('REMINDER_TIMEZONE', 'Europe/Moscow')
+
+# Колонки email_settings в порядке, который ожидает email_settings_from_row
+EMAIL_SETTINGS_COLUMNS = (
+    'id, updated_at, smtp_host, smtp_port, sender_email, admin_email, notifications_enabled, '
+    'digest_enabled, digest_window_minutes, digest_max_bookings'
+)
+
+# Поля ответа и соответствующие им колонки reviews (порядок задает порядок ключей в ответе)
+REVIEW_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'service': 'service',
+    'rating': 'rating',
+    'text': 'text',
+    'status': 'status',
+    'date': 'created_at'
+}
+
+# Состояние теплого инстанса: готовые JSON-страницы одобренных отзывов по (версия, параметры выдачи)
+# и последняя прочитанная версия (monotonic-время проверки, версия)
+_reviews_cache: 'OrderedDict[Tuple, str]' = OrderedDict()
+_reviews_version: Optional[Tuple[float, int]] = None
+
+# Настройки почты теплого инстанса: monotonic-время загрузки и последней проверки,
+# версия строки email_settings (id, updated_at) и сами настройки
+_email_settings: Optional[Tuple[float, float, Optional[Tuple], Dict[str, Any]]] = None
+
+# SMTP-сессия теплого инстанса, своя у каждого потока (пул рассылки напоминаний):
+# session = ((хост, порт, логин, пароль), соединение, monotonic-время последней команды)
+_smtp_local = threading.local()
 
 def get_db_connection():
     database_url = os.environ.get('DATABASE_URL')
@@ -55,41 +116,364 @@ def error_response(message, status_code=500):
     }
 
 def verify_admin_token(event: Dict[str, Any]) -> bool:
-    headers = event.get('headers', {})
-    token = headers.get('x-admin-token') or headers.get('X-Admin-Token')
+    return shared_auth.verify_admin_request(event)
+
+def encode_review_cursor(created_at: datetime, review_id: int) -> str:
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()},{review_id}'.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_review_cursor(value: str) -> Tuple[datetime, int]:
+    try:
+        decoded = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode('utf-8')
+        created_at, review_id = decoded.rsplit(',', 1)
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Неверный курсор')
+
+def parse_review_fields(value: Optional[str]) -> List[str]:
+    if not value:
+        return list(REVIEW_FIELDS)
+    
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in REVIEW_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}. Доступны: {", ".join(REVIEW_FIELDS)}')
+    return [field for field in REVIEW_FIELDS if field in fields]
+
+def intern_review_service(cur, service: str) -> int:
+    cur.execute("""
+        WITH inserted AS (
+            INSERT INTO review_services (name) VALUES (%s)
+            ON CONFLICT (name) DO NOTHING
+            RETURNING id
+        )
+        SELECT id FROM inserted
+        UNION ALL
+        SELECT id FROM review_services WHERE name = %s
+        LIMIT 1
+    """, (service, service))
+    return cur.fetchone()[0]
+
+def review_list_query(cur, fields: List[str], status: Optional[str], service: Optional[str],
+                      search: str, after: Optional[Tuple[datetime, int]], limit: int) -> Tuple[str, tuple]:
+    columns = ', '.join(REVIEW_FIELDS[field] for field in fields)
+    query = f"SELECT {columns}, created_at, id FROM reviews WHERE 1=1"
+    query_params = []
+    
+    if status:
+        query += " AND status = %s"
+        query_params.append(status)
+    
+    # Подстрока ищется по справочнику услуг (единицы строк), отзывы выбираются по индексу service_id
+    if service and service.lower() != 'все':
+        pattern = service.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        cur.execute("SELECT id FROM review_services WHERE LOWER(name) LIKE %s", (f'%{pattern}%',))
+        service_ids = [row[0] for row in cur.fetchall()]
+        # Равенство позволяет читать индекс сразу в порядке выдачи; с = ANY(...) PostgreSQL сортирует строки сам
+        if len(service_ids) == 1:
+            query += " AND service_id = %s"
+            query_params.append(service_ids[0])
+        else:
+            query += " AND service_id = ANY(%s)"
+            query_params.append(service_ids)
+    
+    if search:
+        query += " AND to_tsvector('russian', text) @@ websearch_to_tsquery('russian', %s)"
+        query_params.append(search)
+    
+    # Keyset: следующая страница начинается строго после последней пары (created_at, id)
+    if after:
+        query += " AND (created_at, id) < (%s, %s)"
+        query_params.extend(after)
+    
+    query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    query_params.append(limit + 1)
+    
+    return query, tuple(query_params)
+
+def cached_reviews_version() -> Optional[int]:
+    '''Version known to this warm instance, None when it must be re-read from reviews_version'''
+    if _reviews_version is None or clock.monotonic() - _reviews_version[0] >= REVIEWS_VERSION_CHECK_SECONDS:
+        return None
+    return _reviews_version[1]
+
+def remember_reviews_version(version: int) -> None:
+    global _reviews_version
+    _reviews_version = (clock.monotonic(), version)
+
+def load_reviews_version(cur) -> int:
+    cur.execute("SELECT version FROM reviews_version WHERE id = 1")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def bump_reviews_version(cur) -> int:
+    '''Called inside every moderation transaction; readers switch to new cache keys once it commits'''
+    cur.execute("""
+        UPDATE reviews_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1
+        RETURNING version
+    """)
+    return cur.fetchone()[0]
+
+def reviews_cache_get(key: Tuple) -> Optional[str]:
+    body = _reviews_cache.get(key)
+    if body is not None:
+        _reviews_cache.move_to_end(key)
+    return body
+
+def reviews_cache_put(key: Tuple, body: str) -> None:
+    if REVIEWS_CACHE_MAX_ENTRIES <= 0:
+        return
+    _reviews_cache[key] = body
+    _reviews_cache.move_to_end(key)
+    while len(_reviews_cache) > REVIEWS_CACHE_MAX_ENTRIES:
+        _reviews_cache.popitem(last=False)
+
+def etag_matches(event: Dict[str, Any], etag: str) -> bool:
+    headers = event.get('headers', {}) or {}
+    if_none_match = headers.get('If-None-Match') or headers.get('if-none-match') or ''
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in (candidate[2:] if candidate.startswith('W/') else candidate for candidate in candidates)
+
+def load_reviews_page(cur, fields: List[str], status: Optional[str], service: Optional[str],
+                      search: str, after: Optional[Tuple[datetime, int]], limit: int) -> Dict[str, Any]:
+    query, query_params = review_list_query(cur, fields, status, service, search, after, limit)
+    cur.execute(query, query_params)
+    rows = cur.fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_review_cursor(rows[-1][-2], rows[-1][-1])
+    
+    reviews = []
+    for row in rows:
+        review = dict(zip(fields, row))
+        if 'date' in review:
+            review['date'] = review['date'].isoformat() if review['date'] else None
+        reviews.append(review)
+    
+    return {'success': True, 'reviews': reviews, 'next_cursor': next_cursor}
+
+def parse_review_ids(value: Any) -> List[int]:
+    '''Ids from a JSON list or a comma-separated query value, de-duplicated in request order'''
+    items = value.split(',') if isinstance(value, str) else value
+    if not isinstance(items, list):
+        raise ValueError('ids должен быть списком')
+    
+    try:
+        ids = list(dict.fromkeys(int(item) for item in items if str(item).strip()))
+    except (TypeError, ValueError):
+        raise ValueError('ids должны быть целыми числами')
+    
+    if not ids:
+        raise ValueError('ids не должен быть пустым')
+    if len(ids) > REVIEWS_BULK_MAX_IDS:
+        raise ValueError(f'Не больше {REVIEWS_BULK_MAX_IDS} отзывов за один запрос')
+    return ids
+
+def bulk_moderate_reviews(ids: List[int], status: Optional[str]) -> Dict[str, Any]:
+    '''
+    Sets status on (or deletes, when status is None) all ids with one statement in one transaction.
+    Rows are locked in id order so overlapping bulk requests queue instead of deadlocking.
+    Returns per-id results: updated, unchanged, deleted or not_found.
+    '''
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        if status is None:
+            cur.execute("""
+                WITH previous AS (
+                    SELECT id FROM reviews WHERE id = ANY(%s) ORDER BY id FOR UPDATE
+                )
+                DELETE FROM reviews
+                USING previous
+                WHERE reviews.id = previous.id
+                RETURNING reviews.id, reviews.service_id, reviews.status, reviews.rating
+            """, (ids,))
+            rows = cur.fetchall()
+            changes = [(row[1], row[2], row[3], -1) for row in rows]
+            outcomes = {row[0]: 'deleted' for row in rows}
+        else:
+            cur.execute("""
+                WITH previous AS (
+                    SELECT id, service_id, status, rating FROM reviews WHERE id = ANY(%s) ORDER BY id FOR UPDATE
+                ),
+                updated AS (
+                    UPDATE reviews SET status = %s, updated_at = CURRENT_TIMESTAMP
+                    FROM previous
+                    WHERE reviews.id = previous.id AND previous.status <> %s
+                    RETURNING reviews.id
+                )
+                SELECT previous.id, previous.service_id, previous.status, previous.rating, updated.id IS NOT NULL
+                FROM previous
+                LEFT JOIN updated ON updated.id = previous.id
+            """, (ids, status, status))
+            rows = cur.fetchall()
+            changes = []
+            outcomes = {}
+            for review_id, service_id, previous_status, rating, was_updated in rows:
+                outcomes[review_id] = 'updated' if was_updated else 'unchanged'
+                if was_updated:
+                    changes.extend([(service_id, previous_status, rating, -1), (service_id, status, rating, 1)])
+        
+        apply_review_stats(cur, changes)
+        version = bump_reviews_version(cur) if changes else None
+        conn.commit()
+        if version is not None:
+            remember_reviews_version(version)
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cur.close()
+        conn.close()
     
-    if not token:
-        return False
+    results = [{'id': review_id, 'result': outcomes.get(review_id, 'not_found')} for review_id in ids]
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result['result']] = counts.get(result['result'], 0) + 1
     
-    expected_token = os.environ.get('ADMIN_TOKEN')
-    if not expected_token:
-        return False
+    return {'success': True, 'results': results, 'counts': counts}
+
+def handle_approved_reviews(event: Dict[str, Any], fields: List[str], service: Optional[str],
+                            search: str, cursor: Optional[str], after: Optional[Tuple[datetime, int]], limit: int) -> Dict[str, Any]:
+    '''
+    Public listing: answers 304 or a cached body while reviews_version is unchanged.
+    Within REVIEWS_VERSION_CHECK_SECONDS the instance trusts the version it saw last and skips the database.
+    '''
+    service = service.lower() if service and service.lower() != 'все' else None
+    page_key = (service, search, cursor or '', limit, tuple(fields))
+    conn = None
     
-    return token == expected_token
+    try:
+        version = cached_reviews_version()
+        if version is None:
+            conn = get_db_connection()
+            with conn.cursor() as cur:
+                version = load_reviews_version(cur)
+            conn.commit()
+            remember_reviews_version(version)
+        
+        etag = f'"reviews-{version}-{hashlib.sha1(repr(page_key).encode("utf-8")).hexdigest()[:16]}"'
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag, X-Reviews-Cache',
+            'Cache-Control': f'public, max-age={REVIEWS_CACHE_MAX_AGE_SECONDS}',
+            'ETag': etag
+        }
+        
+        if etag_matches(event, etag):
+            return {'statusCode': 304, 'headers': headers, 'body': '', 'isBase64Encoded': False}
+        
+        body = reviews_cache_get((version,) + page_key)
+        headers['X-Reviews-Cache'] = 'HIT' if body is not None else 'MISS'
+        if body is None:
+            if conn is None:
+                conn = get_db_connection()
+            with conn.cursor() as cur:
+                body = json.dumps(load_reviews_page(cur, fields, 'approved', service, search, after, limit), default=str)
+            conn.commit()
+            reviews_cache_put((version,) + page_key, body)
+        
+        headers['Content-Type'] = 'application/json'
+        return {'statusCode': 200, 'headers': headers, 'body': body, 'isBase64Encoded': False}
+    finally:
+        if conn:
+            conn.close()
 
-def get_email_settings():
+def apply_review_stats(cur, changes: List[Tuple[int, str, int, int]]) -> None:
+    '''Adds (service_id, status, rating, delta) changes to review_rating_stats inside the caller's transaction'''
+    if not changes:
+        return
+    
+    service_ids, statuses, ratings, deltas = (list(column) for column in zip(*changes))
+    # Строки сводки блокируются в порядке ключа, чтобы встречные модерации не ловили взаимоблокировку
+    cur.execute("""
+        INSERT INTO review_rating_stats (service_id, status, rating, review_count)
+        SELECT service_id, status, rating, SUM(delta)
+        FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::int[]) AS changes(service_id, status, rating, delta)
+        GROUP BY service_id, status, rating
+        HAVING SUM(delta) <> 0
+        ORDER BY service_id, status, rating
+        ON CONFLICT (service_id, status, rating)
+        DO UPDATE SET review_count = review_rating_stats.review_count + EXCLUDED.review_count
+    """, (service_ids, statuses, ratings, deltas))
+
+def review_stats_changes(rows) -> List[Tuple[int, str, int, int]]:
+    '''Rows of (old service_id, status, rating, new service_id, status, rating) from an UPDATE ... RETURNING'''
+    changes = []
+    for row in rows:
+        changes.append((row[0], row[1], row[2], -1))
+        changes.append((row[3], row[4], row[5], 1))
+    return changes
+
+def summarize_ratings(counts: Dict[int, int]) -> Dict[str, Any]:
+    total = sum(counts.values())
+    return {
+        'count': total,
+        'average_rating': round(sum(rating * count for rating, count in counts.items()) / total, 2) if total else None,
+        'ratings': {str(rating): counts.get(rating, 0) for rating in range(1, 6)}
+    }
+
+def email_settings_from_row(row) -> Dict[str, Any]:
+    if row:
+        return {
+            'smtp_host': row[2] or 'smtp.yandex.ru',
+            'smtp_port': row[3] or 587, 
+            'sender_email': row[4] or '',
+            'admin_email': row[5] or '',
+            'notifications_enabled': row[6] if row[6] is not None else True,
+            'digest_enabled': bool(row[7]),
+            'digest_window_minutes': row[8] or 15,
+            'digest_max_bookings': row[9] or 10
+        }
+    else:
+        return {
+            'smtp_host': 'smtp.yandex.ru',
+            'smtp_port': 587,
+            'sender_email': '',
+            'admin_email': '',
+            'notifications_enabled': True,
+            'digest_enabled': False,
+            'digest_window_minutes': 15,
+            'digest_max_bookings': 10
+        }
+
+def remember_email_settings(row) -> Dict[str, Any]:
+    global _email_settings
+    
+    now = clock.monotonic()
+    settings = email_settings_from_row(row)
+    _email_settings = (now, now, (row[0], row[1]) if row else None, settings)
+    return dict(settings)
+
+def get_email_settings() -> Dict[str, Any]:
+    '''
+    Email settings from the warm-instance cache: no query at all for EMAIL_SETTINGS_CHECK_SECONDS after a load,
+    then one (id, updated_at) lookup confirms the cached row is still current (a save in another instance changes it).
+    The full row is re-read when the version differs or the copy is older than EMAIL_SETTINGS_TTL_SECONDS.
+    '''
+    global _email_settings
+    
+    cached = _email_settings
+    now = clock.monotonic()
+    fresh = cached is not None and now - cached[0] < EMAIL_SETTINGS_TTL_SECONDS
+    if fresh and now - cached[1] < EMAIL_SETTINGS_CHECK_SECONDS:
+        return dict(cached[3])
+    
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT smtp_host, smtp_port, sender_email, admin_email, notifications_enabled FROM t_p89870318_access_bars_service.email_settings ORDER BY id LIMIT 1")
-        result = cursor.fetchone()
+        if fresh:
+            cursor.execute("SELECT id, updated_at FROM t_p89870318_access_bars_service.email_settings ORDER BY id LIMIT 1")
+            version = cursor.fetchone()
+            if (tuple(version) if version else None) == cached[2]:
+                _email_settings = (cached[0], now, cached[2], cached[3])
+                return dict(cached[3])
         
-        if result:
-            return {
-                'smtp_host': result[0] or 'smtp.yandex.ru',
-                'smtp_port': result[1] or 587, 
-                'sender_email': result[2] or '',
-                'admin_email': result[3] or '',
-                'notifications_enabled': result[4] if result[4] is not None else True
-            }
-        else:
-            return {
-                'smtp_host': 'smtp.yandex.ru',
-                'smtp_port': 587,
-                'sender_email': '',
-                'admin_email': '',
-                'notifications_enabled': True
-            }
+        cursor.execute(f"SELECT {EMAIL_SETTINGS_COLUMNS} FROM t_p89870318_access_bars_service.email_settings ORDER BY id LIMIT 1")
+        return remember_email_settings(cursor.fetchone())
     finally:
         conn.close()
 
@@ -104,40 +488,23 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             params = event.get('queryStringParameters', {}) or {}
             status = params.get('status', 'approved')
             service = params.get('service')
+            search = (params.get('q') or '').strip()
+            
+            try:
+                limit = min(max(int(params.get('limit', REVIEWS_PAGE_DEFAULT_LIMIT)), 1), REVIEWS_PAGE_MAX_LIMIT)
+                after = decode_review_cursor(params['cursor']) if params.get('cursor') else None
+                fields = parse_review_fields(params.get('fields'))
+            except ValueError as e:
+                return error_response(str(e), 400)
+            
+            if status == 'approved':
+                return handle_approved_reviews(event, fields, service, search, params.get('cursor'), after, limit)
             
             conn = get_db_connection()
             cur = conn.cursor()
             
             try:
-                query = "SELECT id, name, service, rating, text, status, created_at FROM reviews WHERE 1=1"
-                query_params = []
-                
-                if status:
-                    query += " AND status = %s"
-                    query_params.append(status)
-                
-                if service and service.lower() != 'все':
-                    query += " AND LOWER(service) LIKE %s"
-                    query_params.append(f'%{service.lower()}%')
-                
-                query += " ORDER BY created_at DESC"
-                
-                cur.execute(query, tuple(query_params))
-                rows = cur.fetchall()
-                
-                reviews = []
-                for row in rows:
-                    reviews.append({
-                        'id': row[0],
-                        'name': row[1],
-                        'service': row[2],
-                        'rating': row[3],
-                        'text': row[4],
-                        'status': row[5],
-                        'date': row[6].isoformat() if row[6] else None
-                    })
-                
-                return success_response({'success': True, 'reviews': reviews})
+                return success_response(load_reviews_page(cur, fields, status, service, search, after, limit))
             finally:
                 cur.close()
                 conn.close()
@@ -167,13 +534,14 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             try:
                 query = """
-                    INSERT INTO reviews (name, service, rating, text, status)
-                    VALUES (%s, %s, %s, %s, 'pending')
-                    RETURNING id, name, service, rating, text, status, created_at
+                    INSERT INTO reviews (name, service, service_id, rating, text, status)
+                    VALUES (%s, %s, %s, %s, %s, 'pending')
+                    RETURNING id, name, service, rating, text, status, created_at, service_id
                 """
                 
-                cur.execute(query, (name, service, rating, text))
+                cur.execute(query, (name, service, intern_review_service(cur, service), rating, text))
                 row = cur.fetchone()
+                apply_review_stats(cur, [(row[7], row[5], row[3], 1)])
                 conn.commit()
                 
                 review = {
@@ -206,6 +574,15 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             review_id = body_data.get('id')
             status = body_data.get('status')
             
+            if 'ids' in body_data:
+                if status not in ['pending', 'approved', 'rejected']:
+                    return error_response('Неверный статус', 400)
+                try:
+                    ids = parse_review_ids(body_data['ids'])
+                except ValueError as e:
+                    return error_response(str(e), 400)
+                return success_response(bulk_moderate_reviews(ids, status))
+            
             if not review_id or not status:
                 return error_response('ID и статус обязательны', 400)
             
@@ -216,13 +593,29 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             cur = conn.cursor()
             
             try:
-                cur.execute("UPDATE reviews SET status = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s", (status, review_id))
+                cur.execute("""
+                    WITH previous AS (
+                        SELECT id, service_id, status, rating FROM reviews WHERE id = %s FOR UPDATE
+                    )
+                    UPDATE reviews SET status = %s, updated_at = CURRENT_TIMESTAMP
+                    FROM previous
+                    WHERE reviews.id = previous.id
+                    RETURNING previous.service_id, previous.status, previous.rating,
+                              reviews.service_id, reviews.status, reviews.rating
+                """, (review_id, status))
+                rows = cur.fetchall()
+                apply_review_stats(cur, review_stats_changes(rows))
+                version = bump_reviews_version(cur) if rows else None
                 conn.commit()
                 
-                if cur.rowcount > 0:
+                if rows:
+                    remember_reviews_version(version)
                     return success_response({'success': True, 'message': 'Статус обновлен'})
                 else:
                     return error_response('Отзыв не найден', 404)
+            except Exception as e:
+                conn.rollback()
+                raise e
             finally:
                 cur.close()
                 conn.close()
@@ -246,6 +639,7 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     if len(text) > 5000:
                         return error_response('Текст слишком длинный', 400)
                     cur.execute("UPDATE reviews SET text = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s", (text, review_id))
+                    updated = cur.rowcount
                 else:
                     name = body_data.get('name', '').strip()
                     service = body_data.get('service', '').strip()
@@ -259,17 +653,31 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         return error_response('Рейтинг должен быть от 1 до 5', 400)
                     
                     cur.execute("""
+                        WITH previous AS (
+                            SELECT id, service_id, status, rating FROM reviews WHERE id = %s FOR UPDATE
+                        )
                         UPDATE reviews 
-                        SET name = %s, service = %s, rating = %s, text = %s, updated_at = CURRENT_TIMESTAMP 
-                        WHERE id = %s
-                    """, (name, service, rating, text, review_id))
+                        SET name = %s, service = %s, service_id = %s, rating = %s, text = %s, updated_at = CURRENT_TIMESTAMP 
+                        FROM previous
+                        WHERE reviews.id = previous.id
+                        RETURNING previous.service_id, previous.status, previous.rating,
+                                  reviews.service_id, reviews.status, reviews.rating
+                    """, (review_id, name, service, intern_review_service(cur, service), rating, text))
+                    rows = cur.fetchall()
+                    apply_review_stats(cur, review_stats_changes(rows))
+                    updated = len(rows)
                 
+                version = bump_reviews_version(cur) if updated > 0 else None
                 conn.commit()
                 
-                if cur.rowcount > 0:
+                if updated > 0:
+                    remember_reviews_version(version)
                     return success_response({'success': True, 'message': 'Отзыв обновлен'})
                 else:
                     return error_response('Отзыв не найден', 404)
+            except Exception as e:
+                conn.rollback()
+                raise e
             finally:
                 cur.close()
                 conn.close()
@@ -281,6 +689,13 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             params = event.get('queryStringParameters', {}) or {}
             review_id = params.get('id')
             
+            if params.get('ids'):
+                try:
+                    ids = parse_review_ids(params['ids'])
+                except ValueError as e:
+                    return error_response(str(e), 400)
+                return success_response(bulk_moderate_reviews(ids, None))
+            
             if not review_id:
                 return error_response('ID обязателен', 400)
             
@@ -288,13 +703,20 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             cur = conn.cursor()
             
             try:
-                cur.execute("DELETE FROM reviews WHERE id = %s", (review_id,))
+                cur.execute("DELETE FROM reviews WHERE id = %s RETURNING service_id, status, rating", (review_id,))
+                rows = cur.fetchall()
+                apply_review_stats(cur, [(row[0], row[1], row[2], -1) for row in rows])
+                version = bump_reviews_version(cur) if rows else None
                 conn.commit()
                 
-                if cur.rowcount > 0:
+                if rows:
+                    remember_reviews_version(version)
                     return success_response({'success': True, 'message': 'Отзыв удален'})
                 else:
                     return error_response('Отзыв не найден', 404)
+            except Exception as e:
+                conn.rollback()
+                raise e
             finally:
                 cur.close()
                 conn.close()
@@ -305,6 +727,611 @@ def handle_reviews(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     except Exception as e:
         return error_response(str(e), 500)
 
+def handle_review_stats(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method = event.get('httpMethod', 'GET')
+    
+    if method == 'OPTIONS':
+        return cors_response('GET, OPTIONS')
+    
+    if method != 'GET':
+        return error_response('Метод не поддерживается', 405)
+    
+    conn = None
+    
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT review_services.name, stats.status, stats.rating, stats.review_count
+            FROM review_rating_stats AS stats
+            JOIN review_services ON review_services.id = stats.service_id
+            WHERE stats.review_count > 0
+        """)
+        rows = cur.fetchall()
+        cur.close()
+        
+        status_counts = {'pending': 0, 'approved': 0, 'rejected': 0}
+        approved_counts: Dict[int, int] = {}
+        service_statuses: Dict[str, Dict[str, int]] = {}
+        service_counts: Dict[str, Dict[int, int]] = {}
+        
+        for service, status, rating, count in rows:
+            status_counts[status] = status_counts.get(status, 0) + count
+            statuses = service_statuses.setdefault(service, {'pending': 0, 'approved': 0, 'rejected': 0})
+            statuses[status] = statuses.get(status, 0) + count
+            if status == 'approved':
+                approved_counts[rating] = approved_counts.get(rating, 0) + count
+                ratings = service_counts.setdefault(service, {})
+                ratings[rating] = ratings.get(rating, 0) + count
+        
+        # Рейтинг услуги считается только по одобренным отзывам, счетчики статусов - по всем
+        services = [
+            dict(service=service, statuses=statuses, **summarize_ratings(service_counts.get(service, {})))
+            for service, statuses in service_statuses.items()
+        ]
+        services.sort(key=lambda item: (-item['count'], item['service']))
+        
+        return success_response({
+            'success': True,
+            'statuses': status_counts,
+            'approved': summarize_ratings(approved_counts),
+            'services': services
+        })
+    except Exception as e:
+        return error_response(str(e), 500)
+    finally:
+        if conn:
+            conn.close()
+
+def open_smtp_session(settings: Dict[str, Any], email_password: str) -> smtplib.SMTP:
+    server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'], timeout=SMTP_TIMEOUT_SECONDS)
+    try:
+        server.starttls()
+        server.login(settings['sender_email'], email_password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def close_smtp_session() -> None:
+    session = getattr(_smtp_local, 'session', None)
+    if session is None:
+        return
+    server = session[1]
+    _smtp_local.session = None
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+def smtp_session(settings: Dict[str, Any], email_password: str) -> smtplib.SMTP:
+    '''
+    Returns the warm-instance SMTP connection of the calling thread, logged in and healthy.
+    A connection idle for SMTP_NOOP_AFTER_SECONDS is checked with NOOP, one idle for SMTP_MAX_IDLE_SECONDS
+    (servers drop those anyway) or opened with other settings is replaced without asking.
+    '''
+    key = (settings['smtp_host'], settings['smtp_port'], settings['sender_email'], email_password)
+    session = getattr(_smtp_local, 'session', None)
+    if session is not None and session[0] == key:
+        _, server, last_used = session
+        idle_seconds = clock.monotonic() - last_used
+        if idle_seconds < SMTP_NOOP_AFTER_SECONDS:
+            return server
+        if idle_seconds < SMTP_MAX_IDLE_SECONDS:
+            try:
+                if server.noop()[0] == 250:
+                    _smtp_local.session = (key, server, clock.monotonic())
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+    
+    close_smtp_session()
+    server = open_smtp_session(settings, email_password)
+    _smtp_local.session = (key, server, clock.monotonic())
+    return server
+
+def send_emails(settings: Dict[str, Any], email_password: str, messages: List[MIMEMultipart]) -> None:
+    '''
+    Sends messages one after another over the warm SMTP session.
+    A dropped connection (disconnect, socket error, 421) is reopened and the interrupted message is sent once more;
+    errors about the message itself (refused recipient, rejected data) are raised as is.
+    '''
+    for msg in messages:
+        for attempt in range(2):
+            server = smtp_session(settings, email_password)
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code != 421 or attempt:
+                    raise e
+                close_smtp_session()
+                continue
+            except smtplib.SMTPServerDisconnected as e:
+                close_smtp_session()
+                if attempt:
+                    raise e
+                continue
+            except smtplib.SMTPException:
+                raise
+            except OSError as e:
+                # SMTPException наследует OSError, поэтому сетевые ошибки разбираются после ошибок протокола
+                close_smtp_session()
+                if attempt:
+                    raise e
+                continue
+            _smtp_local.session = (_smtp_local.session[0], server, clock.monotonic())
+            break
+
+def build_email(settings: Dict[str, Any], draft: Tuple[str, str, str, str]) -> MIMEMultipart:
+    _, recipient, subject, body = draft
+    msg = MIMEMultipart()
+    msg['From'] = settings['sender_email']
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    return msg
+
+# Черновики писем (вид, получатель, тема, текст) - в таком виде они лежат в email_outbox
+def admin_booking_email(settings: Dict[str, Any], booking_data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    body = f'''
+Новая запись на сайте!
+
+Клиент: {booking_data.get('client_name', '')}
+Телефон: {booking_data.get('client_phone', '')}
+Email: {booking_data.get('client_email', '')}
+Услуга: {booking_data.get('service_name', '')}
+Дата: {booking_data.get('appointment_date', '')}
+Время: {booking_data.get('appointment_time', '')} - {booking_data.get('end_time', '')}
+Статус: ожидает подтверждения
+
+Войдите в админ-панель для подтверждения записи.
+
+---
+Система "Гармония энергий"
+'''
+    return ('admin_booking', settings['admin_email'], f'Новая запись: {booking_data.get("client_name", "")}', body)
+
+def client_confirmation_email(settings: Dict[str, Any], booking_data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    body = f'''
+Здравствуйте, {booking_data.get('client_name', '')}!
+
+Ваша запись успешно создана:
+
+Услуга: {booking_data.get('service_name', '')}
+Дата: {booking_data.get('appointment_date', '')}
+Время: {booking_data.get('appointment_time', '')}
+
+Ожидайте подтверждения от администратора.
+
+---
+С уважением,
+Наталия Великая
+Система "Гармония энергий"
+'''
+    return ('client_confirmation', booking_data['client_email'], 'Подтверждение записи', body)
+
+def status_update_email(settings: Dict[str, Any], booking_data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    status_text = {
+        'confirmed': 'подтверждена',
+        'cancelled': 'отменена',
+        'completed': 'завершена'
+    }.get(booking_data.get('status', ''), 'обновлена')
+    
+    body = f'''
+Здравствуйте, {booking_data.get('client_name', '')}!
+
+Статус вашей записи изменён на: {status_text}
+
+Услуга: {booking_data.get('service_name', '')}
+Дата: {booking_data.get('appointment_date', '')}
+Время: {booking_data.get('appointment_time', '')}
+
+---
+С уважением,
+Наталия Великая
+Система "Гармония энергий"
+'''
+    return ('status_update', booking_data['client_email'], f'Запись {status_text}', body)
+
+def test_smtp_email(settings: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    body = '''
+Это тестовое письмо для проверки SMTP настроек.
+
+Если вы получили это письмо, значит настройки работают корректно!
+
+SMTP сервер: {smtp_host}:{smtp_port}
+Email отправителя: {sender_email}
+Email администратора: {admin_email}
+
+---
+Система "Гармония энергий"
+'''.format(
+        smtp_host=settings['smtp_host'],
+        smtp_port=settings['smtp_port'],
+        sender_email=settings['sender_email'],
+        admin_email=settings['admin_email']
+    )
+    return ('test_smtp', settings['admin_email'], 'Тест SMTP - Гармония энергий', body)
+
+def reminder_email(settings: Dict[str, Any], booking_data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    body = f'''
+Здравствуйте, {booking_data.get('client_name', '')}!
+
+Напоминаем о вашей записи на завтра:
+
+Услуга: {booking_data.get('service_name', '')}
+Дата: {booking_data.get('appointment_date', '')}
+Время: {booking_data.get('appointment_time', '')} - {booking_data.get('end_time', '')}
+
+Если планы изменились, пожалуйста, сообщите об этом заранее.
+
+---
+С уважением,
+Наталия Великая
+Система "Гармония энергий"
+'''
+    return ('reminder', booking_data['client_email'], 'Напоминание о записи на завтра', body)
+
+def admin_digest_item(number: int, booking_data: Dict[str, Any]) -> str:
+    return f'''{number}. {booking_data.get('client_name', '')}, {booking_data.get('client_phone', '')}, {booking_data.get('client_email', '')}
+   {booking_data.get('service_name', '')}: {booking_data.get('appointment_date', '')} {booking_data.get('appointment_time', '')} - {booking_data.get('end_time', '')}
+'''
+
+def admin_digest_email(settings: Dict[str, Any], bookings: List[Dict[str, Any]]) -> Tuple[str, str, str, str]:
+    # Одна запись в сводке - обычное уведомление
+    if len(bookings) == 1:
+        return admin_booking_email(settings, bookings[0])
+    
+    items = '\n'.join(admin_digest_item(number, booking_data) for number, booking_data in enumerate(bookings, 1))
+    body = f'''
+Новые записи на сайте: {len(bookings)}
+
+{items}
+Все записи ожидают подтверждения. Войдите в админ-панель для подтверждения записей.
+
+---
+Система "Гармония энергий"
+'''
+    return ('admin_digest', settings['admin_email'], f'Новые записи: {len(bookings)}', body)
+
+def insert_outbox(cur, drafts: List[Tuple[str, str, str, str]]) -> List[int]:
+    kinds, recipients, subjects, bodies = (list(column) for column in zip(*drafts))
+    cur.execute("""
+        INSERT INTO t_p89870318_access_bars_service.email_outbox (kind, recipient, subject, body)
+        SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[], %s::text[])
+        RETURNING id
+    """, (kinds, recipients, subjects, bodies))
+    return [row[0] for row in cur.fetchall()]
+
+def flush_admin_digest(cur, settings: Dict[str, Any], force: bool = False) -> int:
+    '''
+    Moves accumulated new-booking notices into email_outbox as digest letters: a full digest (digest_max_bookings)
+    at once, a partial one when its oldest booking has waited digest_window_minutes, everything when force is set.
+    Items are locked with SKIP LOCKED, so concurrent flushes never put a booking into two digests. Caller commits.
+    Returns the number of digest letters queued.
+    '''
+    if not settings['admin_email']:
+        return 0
+    
+    flushed = 0
+    while True:
+        cur.execute("""
+            SELECT id, booking_data, created_at <= CURRENT_TIMESTAMP - make_interval(mins => %s)
+            FROM t_p89870318_access_bars_service.email_digest_items
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (settings['digest_window_minutes'], settings['digest_max_bookings']))
+        items = cur.fetchall()
+        if not items or (len(items) < settings['digest_max_bookings'] and not items[0][2] and not force):
+            return flushed
+        
+        insert_outbox(cur, [admin_digest_email(settings, [item[1] for item in items])])
+        cur.execute(
+            "DELETE FROM t_p89870318_access_bars_service.email_digest_items WHERE id = ANY(%s)",
+            ([item[0] for item in items],)
+        )
+        flushed += 1
+
+def enqueue_emails(drafts: List[Tuple[str, str, str, str]], digest_bookings: Optional[List[Dict[str, Any]]] = None,
+                   settings: Optional[Dict[str, Any]] = None) -> List[int]:
+    '''
+    Puts rendered drafts into email_outbox with one INSERT; nothing is sent inside the request.
+    dispatch_email_outbox delivers them later, so a slow or failing SMTP server neither delays nor loses them.
+    digest_bookings (admin digest mode) are stored in the same transaction; a digest they fill up is queued at once.
+    Returns the outbox ids of the drafts.
+    '''
+    if not drafts and not digest_bookings:
+        return []
+    
+    message_ids = []
+    
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        if drafts:
+            message_ids = insert_outbox(cur, drafts)
+        if digest_bookings:
+            cur.execute("""
+                INSERT INTO t_p89870318_access_bars_service.email_digest_items (booking_data)
+                SELECT unnest(%s::jsonb[])
+            """, ([json.dumps(booking_data, ensure_ascii=False) for booking_data in digest_bookings],))
+            flush_admin_digest(cur, settings)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    
+    return message_ids
+
+def claim_outbox_batch(cur, batch_size: int, message_ids: Optional[List[int]] = None) -> List[Tuple]:
+    '''
+    Takes up to batch_size due messages (pending, or sending with an expired lease) and leases them to this dispatcher.
+    SKIP LOCKED lets concurrent dispatchers take disjoint batches; attempts identifies the claim when settling.
+    message_ids limits the claim to those messages.
+    '''
+    cur.execute("""
+        UPDATE t_p89870318_access_bars_service.email_outbox AS outbox
+        SET status = 'sending', attempts = outbox.attempts + 1,
+            next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        FROM (
+            SELECT id FROM t_p89870318_access_bars_service.email_outbox
+            WHERE status IN ('pending', 'sending') AND next_attempt_at <= CURRENT_TIMESTAMP
+              AND (%s::bigint[] IS NULL OR id = ANY(%s::bigint[]))
+            ORDER BY next_attempt_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ) AS due
+        WHERE outbox.id = due.id
+        RETURNING outbox.id, outbox.attempts, outbox.kind, outbox.recipient, outbox.subject, outbox.body
+    """, (EMAIL_OUTBOX_LEASE_SECONDS, message_ids, message_ids, batch_size))
+    return sorted(cur.fetchall())
+
+def mark_outbox_sent(cur, message_id: int, attempts: int) -> None:
+    cur.execute("""
+        UPDATE t_p89870318_access_bars_service.email_outbox
+        SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+        WHERE id = %s AND attempts = %s AND status = 'sending'
+    """, (message_id, attempts))
+
+def retry_outbox(cur, claimed: List[Tuple[int, int]], error: str, permanent: bool = False) -> List[str]:
+    '''
+    Returns claimed (id, attempts) messages to the queue with exponential backoff
+    (EMAIL_OUTBOX_BACKOFF_SECONDS doubled per attempt, capped); permanent errors and the last attempt end as failed.
+    '''
+    cur.execute("""
+        UPDATE t_p89870318_access_bars_service.email_outbox AS outbox
+        SET status = CASE WHEN %s OR outbox.attempts >= %s THEN 'failed' ELSE 'pending' END,
+            next_attempt_at = CURRENT_TIMESTAMP
+                + make_interval(secs => LEAST(%s * power(2, outbox.attempts - 1), %s)),
+            last_error = %s
+        FROM unnest(%s::bigint[], %s::integer[]) AS claim(id, attempts)
+        WHERE outbox.id = claim.id AND outbox.attempts = claim.attempts AND outbox.status = 'sending'
+        RETURNING outbox.status
+    """, (
+        permanent, EMAIL_OUTBOX_MAX_ATTEMPTS, EMAIL_OUTBOX_BACKOFF_SECONDS, EMAIL_OUTBOX_MAX_BACKOFF_SECONDS,
+        error[:1000], [item[0] for item in claimed], [item[1] for item in claimed]
+    ))
+    return [row[0] for row in cur.fetchall()]
+
+def release_outbox(cur, claimed: List[Tuple[int, int]]) -> None:
+    # Не начатые письма возвращаются в очередь без потери попытки
+    cur.execute("""
+        UPDATE t_p89870318_access_bars_service.email_outbox AS outbox
+        SET status = 'pending', attempts = outbox.attempts - 1, next_attempt_at = CURRENT_TIMESTAMP
+        FROM unnest(%s::bigint[], %s::integer[]) AS claim(id, attempts)
+        WHERE outbox.id = claim.id AND outbox.attempts = claim.attempts AND outbox.status = 'sending'
+    """, ([item[0] for item in claimed], [item[1] for item in claimed]))
+
+def outbox_error_kind(error: Exception) -> str:
+    '''
+    connection - the server is unreachable or rejects the session, the rest of the batch waits too;
+    permanent - a 5xx answer about this message; temporary - anything else about this message.
+    '''
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                          smtplib.SMTPHeloError, smtplib.SMTPAuthenticationError)):
+        return 'connection'
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return 'permanent' if codes and min(codes) >= 500 else 'temporary'
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 'permanent' if error.smtp_code >= 500 else 'temporary'
+    if isinstance(error, smtplib.SMTPException):
+        return 'temporary'
+    return 'connection'
+
+def dispatch_email_outbox(batch_size: int = EMAIL_OUTBOX_BATCH_SIZE, message_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    '''
+    Delivers due email_outbox messages batch by batch over the warm SMTP session for up to EMAIL_OUTBOX_RUN_SECONDS.
+    With message_ids only those messages are claimed, in one batch, and digests are left to the full run.
+    Every message is settled (sent / back to pending with backoff / failed) in its own commit right after SMTP answers,
+    so several dispatchers can run at once and a crashed one only delays its batch until the lease expires.
+    '''
+    settings = get_email_settings()
+    email_password = os.environ.get('EMAIL_PASSWORD')
+    if not settings['sender_email']:
+        raise ValueError('Email не настроен')
+    if not email_password:
+        raise ValueError('EMAIL_PASSWORD не настроен')
+    
+    report = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    started = clock.monotonic()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        # Сводки, у которых истекло окно (или все накопленные, если режим сводки выключили), едут в этом же запуске
+        report['digests'] = 0 if message_ids else flush_admin_digest(cur, settings, force=not settings['digest_enabled'])
+        conn.commit()
+        
+        while clock.monotonic() - started < EMAIL_OUTBOX_RUN_SECONDS:
+            batch = claim_outbox_batch(cur, batch_size, message_ids)
+            conn.commit()
+            claimed_at = clock.monotonic()
+            report['claimed'] += len(batch)
+            
+            for position, (message_id, attempts, *draft) in enumerate(batch):
+                if clock.monotonic() - claimed_at > EMAIL_OUTBOX_LEASE_SECONDS / 2:
+                    # Аренда на исходе: остаток пакета достанется следующему запуску, а не второму диспетчеру
+                    release_outbox(cur, [item[:2] for item in batch[position:]])
+                    conn.commit()
+                    report['claimed'] -= len(batch) - position
+                    return report
+                
+                try:
+                    send_emails(settings, email_password, [build_email(settings, draft)])
+                except (smtplib.SMTPException, OSError) as e:
+                    kind = outbox_error_kind(e)
+                    pending = batch[position:] if kind == 'connection' else batch[position:position + 1]
+                    for status in retry_outbox(cur, [item[:2] for item in pending], f'{type(e).__name__}: {e}', kind == 'permanent'):
+                        report['failed' if status == 'failed' else 'retried'] += 1
+                    conn.commit()
+                    if kind == 'connection':
+                        return report
+                    continue
+                
+                mark_outbox_sent(cur, message_id, attempts)
+                conn.commit()
+                report['sent'] += 1
+            
+            if message_ids or len(batch) < batch_size:
+                break
+    finally:
+        cur.close()
+        conn.close()
+    
+    return report
+
+def dispatch_after_enqueue(message_ids: List[int]) -> None:
+    '''
+    Optional fallback for deployments without the timer trigger (off by default, EMAIL_INLINE_DISPATCH_BATCH=0):
+    sends up to EMAIL_INLINE_DISPATCH_BATCH of the messages this request has just queued, never anyone else's.
+    A failure only leaves them to the outbox retries and never fails the request.
+    '''
+    message_ids = message_ids[:EMAIL_INLINE_DISPATCH_BATCH]
+    if not message_ids:
+        return
+    try:
+        dispatch_email_outbox(len(message_ids), message_ids)
+    except Exception as e:
+        print(f"Письма остались в очереди: {str(e)}")
+
+def drain_email_outbox(batch_size: int) -> Dict[str, Any]:
+    # Работает в потоке пула: своя SMTP-сессия, закрывается, когда очередь опустела
+    try:
+        return dispatch_email_outbox(batch_size)
+    finally:
+        close_smtp_session()
+
+def queue_booking_reminders(settings: Dict[str, Any], day: date) -> Tuple[int, int]:
+    '''
+    Finds confirmed bookings on day in both schedule (bookings) and diary (diary_bookings) with one query,
+    marks them in booking_reminders and queues the rendered reminders in the same transaction.
+    A booking already marked (earlier run, or a concurrent one holding the marker) is skipped, so reruns are no-ops.
+    Returns (bookings due, reminders queued).
+    '''
+    conn = get_db_connection()
+    cur = conn.cursor()
+    
+    try:
+        cur.execute("""
+            WITH due AS (
+                SELECT 'schedule' AS source, b.id AS booking_id, b.client_name, b.client_email,
+                       COALESCE(b.service_name, s.name) AS service_name, b.start_time, b.end_time
+                FROM t_p89870318_access_bars_service.bookings b
+                LEFT JOIN t_p89870318_access_bars_service.services s ON s.id = b.service_id
+                WHERE b.booking_date = %(day)s AND b.status = 'confirmed' AND COALESCE(b.client_email, '') <> ''
+                UNION ALL
+                SELECT 'diary', b.id, u.name, u.email, s.name, b.start_time, b.end_time
+                FROM t_p89870318_access_bars_service.diary_bookings b
+                JOIN t_p89870318_access_bars_service.diary_clients c ON c.id = b.client_id
+                JOIN t_p89870318_access_bars_service.diary_users u ON u.id = c.user_id
+                LEFT JOIN t_p89870318_access_bars_service.diary_services s ON s.id = b.service_id
+                WHERE b.booking_date = %(day)s AND b.status = 'confirmed' AND COALESCE(u.email, '') <> ''
+            )
+            SELECT due.* FROM due
+            WHERE NOT EXISTS (
+                SELECT 1 FROM t_p89870318_access_bars_service.booking_reminders r
+                WHERE r.source = due.source AND r.booking_id = due.booking_id AND r.booking_date = %(day)s
+            )
+            ORDER BY due.start_time, due.source, due.booking_id
+        """, {'day': day})
+        due = cur.fetchall()
+        if not due:
+            conn.commit()
+            return 0, 0
+        
+        cur.execute("""
+            INSERT INTO t_p89870318_access_bars_service.booking_reminders (source, booking_id, booking_date)
+            SELECT source, booking_id, %s FROM unnest(%s::varchar[], %s::integer[]) AS due(source, booking_id)
+            ON CONFLICT DO NOTHING
+            RETURNING source, booking_id
+        """, (day, [row[0] for row in due], [row[1] for row in due]))
+        marked = set(cur.fetchall())
+        
+        drafts = [
+            reminder_email(settings, {
+                'client_name': client_name,
+                'client_email': client_email,
+                'service_name': service_name or '',
+                'appointment_date': day.strftime('%d.%m.%Y'),
+                'appointment_time': start_time.strftime('%H:%M') if start_time else '',
+                'end_time': end_time.strftime('%H:%M') if end_time else ''
+            })
+            for source, booking_id, client_name, client_email, service_name, start_time, end_time in due
+            if (source, booking_id) in marked
+        ]
+        if drafts:
+            insert_outbox(cur, drafts)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cur.close()
+        conn.close()
+    
+    return len(due), len(drafts)
+
+def send_booking_reminders(day: Optional[date] = None) -> Dict[str, Any]:
+    '''
+    Reminder job: queues reminders for day (tomorrow in REMINDER_TIMEZONE by default) and drains the outbox
+    with a pool of REMINDER_SMTP_SESSIONS threads, each sending over its own SMTP session.
+    '''
+    settings = get_email_settings()
+    if not settings['sender_email']:
+        raise ValueError('Email не настроен')
+    if not os.environ.get('EMAIL_PASSWORD'):
+        raise ValueError('EMAIL_PASSWORD не настроен')
+    if day is None:
+        day = datetime.now(ZoneInfo(REMINDER_TIMEZONE)).date() + timedelta(days=1)
+    
+    started = clock.monotonic()
+    due, queued = queue_booking_reminders(settings, day)
+    
+    report = {'date': day.isoformat(), 'due': due, 'queued': queued, 'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+    if queued:
+        # Пакеты поровну на сессии, чтобы все потоки пула были заняты
+        sessions = max(1, min(REMINDER_SMTP_SESSIONS, queued))
+        batch_size = min(EMAIL_OUTBOX_BATCH_SIZE, -(-queued // sessions))
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            for result in pool.map(drain_email_outbox, [batch_size] * sessions):
+                for key in ('claimed', 'sent', 'retried', 'failed'):
+                    report[key] += result[key]
+    
+    seconds = clock.monotonic() - started
+    report['seconds'] = round(seconds, 3)
+    report['messages_per_second'] = round(report['sent'] / seconds, 1) if seconds > 0 else 0.0
+    return report
+
+def timer_trigger_payload(event: Dict[str, Any]) -> Optional[str]:
+    '''Payload of a cloud timer trigger event ('' when not set), None for HTTP requests'''
+    messages = event.get('messages') or []
+    if not messages or not str(messages[0].get('event_metadata', {}).get('event_type', '')).endswith('TimerMessage'):
+        return None
+    return str((messages[0].get('details') or {}).get('payload') or '')
+
 def handle_notifications(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method = event.get('httpMethod', 'POST')
     
@@ -344,6 +1371,14 @@ def handle_notifications(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 
                 settings_data = body_data.get('settings', {})
                 
+                try:
+                    digest_window_minutes = int(settings_data.get('digest_window_minutes', 15))
+                    digest_max_bookings = int(settings_data.get('digest_max_bookings', 10))
+                except (TypeError, ValueError):
+                    return error_response('Некорректные параметры сводки', 400)
+                if not 1 <= digest_window_minutes <= 1440 or not 1 <= digest_max_bookings <= 100:
+                    return error_response('Окно сводки: 1-1440 минут, размер: 1-100 записей', 400)
+                
                 conn = get_db_connection()
                 cursor = conn.cursor()
                 
@@ -355,30 +1390,43 @@ def handle_notifications(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         cursor.execute("""
                             UPDATE t_p89870318_access_bars_service.email_settings 
                             SET smtp_host = %s, smtp_port = %s, sender_email = %s, 
-                                admin_email = %s, notifications_enabled = %s, updated_at = CURRENT_TIMESTAMP
+                                admin_email = %s, notifications_enabled = %s, digest_enabled = %s,
+                                digest_window_minutes = %s, digest_max_bookings = %s, updated_at = CURRENT_TIMESTAMP
                             WHERE id = %s
-                        """, (
+                            RETURNING {EMAIL_SETTINGS_COLUMNS}
+                        """.format(EMAIL_SETTINGS_COLUMNS=EMAIL_SETTINGS_COLUMNS), (
                             settings_data.get('smtp_host', 'smtp.yandex.ru'),
                             settings_data.get('smtp_port', 587),
                             settings_data.get('sender_email', ''),
                             settings_data.get('admin_email', ''),
                             settings_data.get('notifications_enabled', True),
+                            bool(settings_data.get('digest_enabled', False)),
+                            digest_window_minutes,
+                            digest_max_bookings,
                             existing[0]
                         ))
                     else:
                         cursor.execute("""
                             INSERT INTO t_p89870318_access_bars_service.email_settings 
-                            (smtp_host, smtp_port, sender_email, admin_email, notifications_enabled)
-                            VALUES (%s, %s, %s, %s, %s)
-                        """, (
+                            (smtp_host, smtp_port, sender_email, admin_email, notifications_enabled,
+                             digest_enabled, digest_window_minutes, digest_max_bookings)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                            RETURNING {EMAIL_SETTINGS_COLUMNS}
+                        """.format(EMAIL_SETTINGS_COLUMNS=EMAIL_SETTINGS_COLUMNS), (
                             settings_data.get('smtp_host', 'smtp.yandex.ru'),
                             settings_data.get('smtp_port', 587),
                             settings_data.get('sender_email', ''),
                             settings_data.get('admin_email', ''),
-                            settings_data.get('notifications_enabled', True)
+                            settings_data.get('notifications_enabled', True),
+                            bool(settings_data.get('digest_enabled', False)),
+                            digest_window_minutes,
+                            digest_max_bookings
                         ))
                     
+                    saved = cursor.fetchone()
                     conn.commit()
+                    # Этот инстанс сразу работает с новыми настройками, остальные увидят новый updated_at при проверке
+                    remember_email_settings(saved)
                     return success_response({'success': True, 'message': 'Настройки сохранены'})
                 finally:
                     cursor.close()
@@ -398,39 +1446,58 @@ def handle_notifications(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 if not email_password:
                     return error_response('EMAIL_PASSWORD не настроен', 500)
                 
-                msg = MIMEMultipart()
-                msg['From'] = settings['sender_email']
-                msg['To'] = settings['admin_email']
-                msg['Subject'] = f'Новая запись: {booking_data.get("client_name", "")}'
+                if settings['digest_enabled']:
+                    enqueue_emails([], [booking_data], settings)
+                    return success_response({
+                        'success': True,
+                        'queued': 0,
+                        'digest': 1,
+                        'message': 'Запись добавлена в сводку для администратора'
+                    })
                 
-                body = f'''
-Новая запись на сайте!
-
-Клиент: {booking_data.get('client_name', '')}
-Телефон: {booking_data.get('client_phone', '')}
-Email: {booking_data.get('client_email', '')}
-Услуга: {booking_data.get('service_name', '')}
-Дата: {booking_data.get('appointment_date', '')}
-Время: {booking_data.get('appointment_time', '')} - {booking_data.get('end_time', '')}
-Статус: ожидает подтверждения
-
-Войдите в админ-панель для подтверждения записи.
-
----
-Система "Гармония энергий"
-'''
+                dispatch_after_enqueue(enqueue_emails([admin_booking_email(settings, booking_data)]))
                 
-                msg.attach(MIMEText(body, 'plain', 'utf-8'))
+                return success_response({
+                    'success': True,
+                    'queued': 1,
+                    'message': f'Уведомление администратору поставлено в очередь на {settings["admin_email"]}'
+                })
+            
+            elif action == 'send_booking_emails':
+                booking_data = body_data.get('booking_data', {})
+                settings = get_email_settings()
                 
-                server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'])
-                server.starttls()
-                server.login(settings['sender_email'], email_password)
-                server.send_message(msg)
-                server.quit()
+                if not settings['notifications_enabled']:
+                    return success_response({'success': True, 'message': 'Уведомления отключены'})
+                
+                if not settings['sender_email']:
+                    return error_response('Email не настроен', 400)
+                
+                email_password = os.environ.get('EMAIL_PASSWORD')
+                if not email_password:
+                    return error_response('EMAIL_PASSWORD не настроен', 500)
+                
+                # Письма администратору и клиенту ставятся в очередь одной транзакцией;
+                # в режиме сводки уведомление администратору ждет сводного письма
+                drafts = []
+                digest_bookings = []
+                if settings['admin_email']:
+                    if settings['digest_enabled']:
+                        digest_bookings.append(booking_data)
+                    else:
+                        drafts.append(admin_booking_email(settings, booking_data))
+                if booking_data.get('client_email'):
+                    drafts.append(client_confirmation_email(settings, booking_data))
+                
+                message_ids = enqueue_emails(drafts, digest_bookings, settings)
+                dispatch_after_enqueue(message_ids)
+                queued = len(message_ids)
                 
                 return success_response({
                     'success': True,
-                    'message': f'Уведомление администратору отправлено на {settings["admin_email"]}'
+                    'queued': queued,
+                    'digest': len(digest_bookings),
+                    'message': f'Писем в очереди отправки: {queued}'
                 })
             
             elif action == 'send_client_confirmation':
@@ -451,37 +1518,9 @@ Email: {booking_data.get('client_email', '')}
                 if not email_password:
                     return error_response('EMAIL_PASSWORD не настроен', 500)
                 
-                msg = MIMEMultipart()
-                msg['From'] = settings['sender_email']
-                msg['To'] = client_email
-                msg['Subject'] = 'Подтверждение записи'
+                dispatch_after_enqueue(enqueue_emails([client_confirmation_email(settings, booking_data)]))
                 
-                body = f'''
-Здравствуйте, {booking_data.get('client_name', '')}!
-
-Ваша запись успешно создана:
-
-Услуга: {booking_data.get('service_name', '')}
-Дата: {booking_data.get('appointment_date', '')}
-Время: {booking_data.get('appointment_time', '')}
-
-Ожидайте подтверждения от администратора.
-
----
-С уважением,
-Наталия Великая
-Система "Гармония энергий"
-'''
-                
-                msg.attach(MIMEText(body, 'plain', 'utf-8'))
-                
-                server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'])
-                server.starttls()
-                server.login(settings['sender_email'], email_password)
-                server.send_message(msg)
-                server.quit()
-                
-                return success_response({'success': True, 'message': 'Подтверждение отправлено клиенту'})
+                return success_response({'success': True, 'queued': 1, 'message': 'Подтверждение клиенту поставлено в очередь'})
             
             elif action == 'send_status_update':
                 booking_data = body_data.get('booking_data', {})
@@ -501,41 +1540,9 @@ Email: {booking_data.get('client_email', '')}
                 if not email_password:
                     return error_response('EMAIL_PASSWORD не настроен', 500)
                 
-                status_text = {
-                    'confirmed': 'подтверждена',
-                    'cancelled': 'отменена',
-                    'completed': 'завершена'
-                }.get(booking_data.get('status', ''), 'обновлена')
-                
-                msg = MIMEMultipart()
-                msg['From'] = settings['sender_email']
-                msg['To'] = client_email
-                msg['Subject'] = f'Запись {status_text}'
+                dispatch_after_enqueue(enqueue_emails([status_update_email(settings, booking_data)]))
                 
-                body = f'''
-Здравствуйте, {booking_data.get('client_name', '')}!
-
-Статус вашей записи изменён на: {status_text}
-
-Услуга: {booking_data.get('service_name', '')}
-Дата: {booking_data.get('appointment_date', '')}
-Время: {booking_data.get('appointment_time', '')}
-
----
-С уважением,
-Наталия Великая
-Система "Гармония энергий"
-'''
-                
-                msg.attach(MIMEText(body, 'plain', 'utf-8'))
-                
-                server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'])
-                server.starttls()
-                server.login(settings['sender_email'], email_password)
-                server.send_message(msg)
-                server.quit()
-                
-                return success_response({'success': True, 'message': 'Уведомление отправлено клиенту'})
+                return success_response({'success': True, 'queued': 1, 'message': 'Уведомление клиенту поставлено в очередь'})
             
             elif action == 'test_smtp':
                 settings = get_email_settings()
@@ -547,42 +1554,32 @@ Email: {booking_data.get('client_email', '')}
                 if not email_password:
                     return error_response('EMAIL_PASSWORD не настроен. Добавьте секрет EMAIL_PASSWORD в настройках проекта', 500)
                 
-                msg = MIMEMultipart()
-                msg['From'] = settings['sender_email']
-                msg['To'] = settings['admin_email']
-                msg['Subject'] = 'Тест SMTP - Гармония энергий'
-                
-                body = '''
-Это тестовое письмо для проверки SMTP настроек.
-
-Если вы получили это письмо, значит настройки работают корректно!
-
-SMTP сервер: {smtp_host}:{smtp_port}
-Email отправителя: {sender_email}
-Email администратора: {admin_email}
-
----
-Система "Гармония энергий"
-'''.format(
-                    smtp_host=settings['smtp_host'],
-                    smtp_port=settings['smtp_port'],
-                    sender_email=settings['sender_email'],
-                    admin_email=settings['admin_email']
-                )
-                
-                msg.attach(MIMEText(body, 'plain', 'utf-8'))
-                
-                server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'])
-                server.starttls()
-                server.login(settings['sender_email'], email_password)
-                server.send_message(msg)
-                server.quit()
+                # Проверка настроек всегда проходит полное подключение и вход, а не теплую сессию
+                close_smtp_session()
+                send_emails(settings, email_password, [build_email(settings, test_smtp_email(settings))])
                 
                 return success_response({
                     'success': True,
                     'message': f'Тестовое письмо успешно отправлено на {settings["admin_email"]}'
                 })
             
+            elif action == 'dispatch_outbox':
+                if not verify_admin_token(event):
+                    return error_response('Unauthorized', 401)
+                
+                return success_response({'success': True, **dispatch_email_outbox()})
+            
+            elif action == 'send_reminders':
+                if not verify_admin_token(event):
+                    return error_response('Unauthorized', 401)
+                
+                try:
+                    day = date.fromisoformat(body_data['date']) if body_data.get('date') else None
+                except (TypeError, ValueError):
+                    return error_response('Дата должна быть в формате ГГГГ-ММ-ДД', 400)
+                
+                return success_response({'success': True, **send_booking_reminders(day)})
+            
             else:
                 return error_response('Неизвестное действие', 400)
         
@@ -595,12 +1592,25 @@ Email администратора: {admin_email}
     return error_response('Метод не поддерживается', 405)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    payload = timer_trigger_payload(event)
+    if payload is not None:
+        # Таймер-триггеры функции: напоминания на завтра (payload booking_reminders) или разбор очереди писем
+        try:
+            if payload == 'booking_reminders':
+                return success_response({'success': True, **send_booking_reminders()})
+            return success_response({'success': True, **dispatch_email_outbox()})
+        except Exception as e:
+            print(f"Ошибка диспетчера писем: {str(e)}")
+            return error_response(str(e), 500)
+    
     params = event.get('queryStringParameters', {}) or {}
     endpoint = params.get('endpoint', 'reviews')
     
     if endpoint == 'reviews':
         return handle_reviews(event, context)
+    elif endpoint == 'review_stats':
+        return handle_review_stats(event, context)
     elif endpoint == 'notifications':
         return handle_notifications(event, context)
     else:
-        return error_response('Not found - use ?endpoint=reviews or ?endpoint=notifications', 404)
\ No newline at end of file
+        return error_response('Not found - use ?endpoint=reviews, ?endpoint=review_stats or ?endpoint=notifications', 404)
\ No newline at end of file
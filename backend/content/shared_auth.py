@@ -0,0 +1,106 @@
+'''
+Shared admin session tokens: HMAC-SHA256 over key id, subject and expiry
+Identical copies live in backend/api, backend/content, backend/schedule and backend/diary - keep them in sync
+'''
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+TOKEN_VERSION = 'v1'
+DEFAULT_TOKEN_TTL_SECONDS = 24 * 3600
+
+_keys_cache: Tuple[Optional[str], Dict[str, bytes]] = (None, {})
+
+def signing_keys() -> Dict[str, bytes]:
+    '''
+    Читает ключи подписи из ADMIN_TOKEN_KEYS в формате "kid1:secret1,kid2:secret2"
+    Первый ключ подписывает новые токены, остальные только проверяются (ротация)
+    Returns: dict kid -> секрет в порядке объявления
+    '''
+    global _keys_cache
+
+    raw_keys = os.environ.get('ADMIN_TOKEN_KEYS', '')
+    if raw_keys != _keys_cache[0]:
+        keys = {}
+        for item in raw_keys.split(','):
+            kid, _, secret = item.strip().partition(':')
+            if kid and secret:
+                keys[kid] = secret.encode('utf-8')
+        _keys_cache = (raw_keys, keys)
+    return _keys_cache[1]
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _sign(secret: bytes, payload: str) -> str:
+    return _b64encode(hmac.new(secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+def issue_admin_token(subject: str = 'admin', ttl_seconds: int = DEFAULT_TOKEN_TTL_SECONDS, now: Optional[float] = None) -> Tuple[str, int]:
+    '''
+    Выпускает подписанный токен сессии администратора
+    Args: subject - кому выдан токен; ttl_seconds - срок жизни; now - unix-время (для тестов)
+    Returns: (токен вида v1.kid.subject.expires.signature, unix-время истечения)
+    '''
+    keys = signing_keys()
+    if not keys:
+        raise ValueError('ADMIN_TOKEN_KEYS not configured')
+
+    kid, secret = next(iter(keys.items()))
+    expires_at = int(now if now is not None else time.time()) + ttl_seconds
+    payload = f'{TOKEN_VERSION}.{kid}.{_b64encode(subject.encode("utf-8"))}.{expires_at}'
+    return f'{payload}.{_sign(secret, payload)}', expires_at
+
+def verify_admin_token_value(token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    '''
+    Проверяет подпись и срок токена без обращения к базе; подпись сравнивается за постоянное время
+    Args: token - значение заголовка X-Admin-Token; now - unix-время (для тестов)
+    Returns: {'sub', 'kid', 'exp'} для действительного токена, иначе None
+    '''
+    # Токен выдается только в ASCII: иное значение заголовка отклоняется до разбора и подписи
+    if not token.isascii():
+        return None
+
+    payload, _, signature = token.rpartition('.')
+    parts = payload.split('.')
+    if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+        return None
+
+    _, kid, subject, expires_at = parts
+    secret = signing_keys().get(kid)
+    if secret is None or not expires_at.isdigit():
+        return None
+    if not hmac.compare_digest(_sign(secret, payload), signature):
+        return None
+    if int(expires_at) <= (now if now is not None else time.time()):
+        return None
+
+    try:
+        return {'sub': _b64decode(subject).decode('utf-8'), 'kid': kid, 'exp': int(expires_at)}
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def verify_admin_request(event: Dict[str, Any]) -> bool:
+    '''
+    Проверяет заголовок X-Admin-Token запроса
+    Пока ADMIN_TOKEN_KEYS не заданы, принимается статический ADMIN_TOKEN (прежнее поведение)
+    Returns: True для запроса администратора
+    '''
+    headers = event.get('headers', {}) or {}
+    token = headers.get('x-admin-token') or headers.get('X-Admin-Token')
+    if not token:
+        return False
+
+    if signing_keys():
+        return verify_admin_token_value(token) is not None
+
+    expected_token = os.environ.get('ADMIN_TOKEN')
+    if not expected_token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), expected_token.encode('utf-8'))
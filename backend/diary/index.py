@@ -11,6 +11,8 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 import urllib.request
 
+import shared_auth
+
 SCHEMA = 't_p89870318_access_bars_service'
 
 DAY_MAPPING = {
@@ -29,7 +31,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-Auth-Token, X-Admin-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -38,6 +40,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     resource = event.get('queryStringParameters', {}).get('resource', 'bookings')
     
+    if resource in ('debug', 'debug_all') and not shared_auth.verify_admin_request(event):
+        return {
+            'statusCode': 401,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'isBase64Encoded': False,
+            'body': json.dumps({'error': 'Unauthorized'})
+        }
+    
     db_url = os.environ.get('DATABASE_URL')
     conn = psycopg2.connect(db_url)
     
@@ -6,6 +6,15 @@ import requests
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+import shared_auth
+import slots
+
+ADMIN_ACTIONS = {'save_settings', 'save_work_hours', 'update_booking_status', 'update_booking_service', 'update_booking'}
+
+# Горизонт расписания без date: по умолчанию неделя, не больше SCHEDULE_MAX_DAYS дней
+SCHEDULE_DEFAULT_DAYS = 7
+SCHEDULE_MAX_DAYS = int(os.environ.get('SCHEDULE_MAX_DAYS', '90'))
+
 def get_db_connection(dict_cursor=False):
     database_url = os.environ.get('DATABASE_URL')
     if not database_url:
@@ -90,6 +99,9 @@ def handler(event, context):
                 body = json.loads(event.get('body', '{}'))
                 action = body.get('action', 'create_booking')
                 
+                if action in ADMIN_ACTIONS and not shared_auth.verify_admin_request(event):
+                    return error_response('Unauthorized', 401)
+                
                 if action == 'save_settings':
                     return save_schedule_settings(cursor, conn, body)
                 elif action == 'save_work_hours':
@@ -138,6 +150,14 @@ def get_schedule(cursor, event):
     date_str = params.get('date')
     service_id = params.get('service_id')
     
+    try:
+        horizon = int(params.get('days') or SCHEDULE_DEFAULT_DAYS)
+        service_ids = [int(part) for part in (params.get('service_ids') or '').split(',') if part.strip()]
+    except ValueError:
+        return error_response('days and service_ids must be integers', 400)
+    if not 1 <= horizon <= SCHEDULE_MAX_DAYS:
+        return error_response(f'days must be between 1 and {SCHEDULE_MAX_DAYS}', 400)
+    
     if date_str:
         cursor.execute("""
             SELECT ms.*, 
@@ -164,7 +184,7 @@ def get_schedule(cursor, event):
         """, (date_str,))
     else:
         today = datetime.now().date()
-        dates = [(today + timedelta(days=i)) for i in range(7)]
+        dates = [(today + timedelta(days=i)) for i in range(horizon)]
         cursor.execute("""
             SELECT ms.*, 
                    COALESCE(
@@ -203,116 +223,40 @@ def get_schedule(cursor, event):
     else:
         service_duration = 60
     
+    # Несколько услуг сразу: слоты для каждой считаются одним проходом по всем дням
+    service_durations = {}
+    if service_ids:
+        cursor.execute("""
+            SELECT id, duration_minutes FROM t_p89870318_access_bars_service.services 
+            WHERE id = ANY(%s) AND is_active = true
+        """, (service_ids,))
+        service_durations = {row['id']: row['duration_minutes'] for row in cursor.fetchall()}
+        if len(service_durations) != len(set(service_ids)):
+            return error_response('Service not found', 404)
+    
+    day_slots = slots.available_slots(
+        schedule_data, [service_duration, *service_durations.values()], break_duration, time_slot_interval
+    )
+    
     result = []
-    for day in schedule_data:
-        available_slots = calculate_slots(day, service_duration, break_duration, time_slot_interval)
-        
-        result.append({
+    for day, by_duration in zip(schedule_data, day_slots):
+        day_result = {
             'date': day['date'].strftime('%Y-%m-%d'),
             'start_time': str(day['start_time']),
             'end_time': str(day['end_time']),
             'break_start_time': str(day['break_start_time']) if day['break_start_time'] else None,
             'break_end_time': str(day['break_end_time']) if day['break_end_time'] else None,
-            'available_slots': available_slots,
+            'available_slots': by_duration[service_duration],
             'bookings': day['bookings']
-        })
+        }
+        if service_durations:
+            day_result['available_slots_by_service'] = {
+                str(service): by_duration[duration] for service, duration in service_durations.items()
+            }
+        result.append(day_result)
     
     return success_response(result)
 
-def calculate_slots(day_schedule, service_duration_minutes, break_duration_minutes=30, time_slot_interval_minutes=30):
-    slots = []
-    date = day_schedule['date']
-    start_time = datetime.combine(date, day_schedule['start_time'])
-    end_time = datetime.combine(date, day_schedule['end_time'])
-    
-    # Создаем список заблокированных интервалов с учетом 30-минутных перерывов
-    blocked_intervals = []
-    
-    # Добавляем существующие записи + 30 минут после каждой
-    if day_schedule['bookings']:
-        for booking in day_schedule['bookings']:
-            if booking and booking['start_time'] and booking['end_time']:
-                # Конвертируем строки времени в объекты time
-                start_time_obj = datetime.strptime(booking['start_time'], '%H:%M:%S').time()
-                end_time_obj = datetime.strptime(booking['end_time'], '%H:%M:%S').time()
-                
-                booking_start = datetime.combine(date, start_time_obj)
-                booking_end = datetime.combine(date, end_time_obj)
-                
-                # Блокируем время записи + перерыв после неё
-                extended_booking_end = booking_end + timedelta(minutes=break_duration_minutes)
-                blocked_intervals.append((booking_start, extended_booking_end))
-    
-    # Объединяем пересекающиеся интервалы для оптимизации
-    blocked_intervals = merge_overlapping_intervals(blocked_intervals)
-    
-    current_time = start_time
-    slot_duration = timedelta(minutes=service_duration_minutes)
-    step = timedelta(minutes=time_slot_interval_minutes)
-    
-    # Разрешаем слоты, которые могут закончиться на 30 минут позже рабочего времени
-    extended_end_time = end_time + timedelta(minutes=30)
-    
-    while current_time + slot_duration <= extended_end_time:
-        slot_end = current_time + slot_duration
-        
-        # Проверяем, что слот не пересекается с заблокированными интервалами
-        slot_available = True
-        for blocked_start, blocked_end in blocked_intervals:
-            # Проверяем пересечение: слот должен полностью НЕ пересекаться с блоком
-            if not (slot_end <= blocked_start or current_time >= blocked_end):
-                slot_available = False
-                if current_time.strftime('%H:%M') == '19:00':
-                    print(f"DEBUG 19:00: Blocked by interval {blocked_start}-{blocked_end}, our slot: {current_time}-{slot_end}")
-                break
-        
-        # Дополнительная проверка: достаточно ли времени до следующей записи
-        if slot_available:
-            # Проверяем, что после нашего слота + перерыв нет других записей
-            our_session_end_with_break = slot_end + timedelta(minutes=break_duration_minutes)
-            
-            for blocked_start, blocked_end in blocked_intervals:
-                # Если следующая запись начинается раньше чем через break_duration_minutes после нашего слота
-                if blocked_start < our_session_end_with_break and blocked_start >= slot_end:
-                    slot_available = False
-                    if current_time.strftime('%H:%M') == '19:00':
-                        print(f"DEBUG 19:00: Blocked by booking {blocked_start}-{blocked_end}, our end: {slot_end}, with break: {our_session_end_with_break}")
-                    break
-        
-        # Проверяем, что время ещё не прошло
-        now = datetime.now()
-        if current_time < now:
-            slot_available = False
-        
-        if slot_available:
-            slots.append(current_time.strftime('%H:%M'))
-        
-        current_time += step
-    
-    return slots
-
-def merge_overlapping_intervals(intervals):
-    """Объединяет пересекающиеся временные интервалы"""
-    if not intervals:
-        return []
-    
-    # Сортируем интервалы по времени начала
-    sorted_intervals = sorted(intervals, key=lambda x: x[0])
-    merged = [sorted_intervals[0]]
-    
-    for current_start, current_end in sorted_intervals[1:]:
-        last_start, last_end = merged[-1]
-        
-        # Если интервалы пересекаются или касаются
-        if current_start <= last_end:
-            # Объединяем интервалы
-            merged[-1] = (last_start, max(last_end, current_end))
-        else:
-            # Добавляем новый интервал
-            merged.append((current_start, current_end))
-    
-    return merged
-
 def create_booking(cursor, conn, event):
     try:
         body = json.loads(event.get('body', '{}'))
@@ -363,9 +307,9 @@ def create_booking(cursor, conn, event):
         booking_id = cursor.fetchone()['id']
         conn.commit()
         
-        # Отправляем уведомление администратору о новой записи
+        # Отправляем уведомление администратору и подтверждение клиенту (одна SMTP-сессия в content)
         try:
-            send_new_booking_notification({
+            send_new_booking_emails({
                 'client_name': body['client_name'],
                 'client_phone': body['client_phone'],
                 'client_email': body.get('client_email', ''),
@@ -376,21 +320,7 @@ def create_booking(cursor, conn, event):
                 'notes': body.get('notes', '')
             })
         except Exception as e:
-            print(f"Failed to send admin notification: {str(e)}")
-        
-        # Отправляем подтверждение клиенту
-        try:
-            send_client_booking_confirmation({
-                'client_name': body['client_name'],
-                'client_email': body.get('client_email', ''),
-                'service_name': service['name'],
-                'booking_date': body['booking_date'],
-                'booking_time': start_datetime.time().strftime('%H:%M'),
-                'end_time': end_datetime.time().strftime('%H:%M'),
-                'notes': body.get('notes', '')
-            })
-        except Exception as e:
-            print(f"Failed to send client confirmation: {str(e)}")
+            print(f"Failed to send booking emails: {str(e)}")
         
         return success_response({
             'success': True,
@@ -742,13 +672,13 @@ def update_booking_full(cursor, conn, body):
         conn.rollback()
         return error_response(f'Failed to update booking: {str(e)}', 400)
 
-def send_new_booking_notification(booking_data):
-    """Отправляет уведомление о новой записи"""
+def send_new_booking_emails(booking_data):
+    """Отправляет уведомление администратору и подтверждение клиенту одним запросом"""
     try:
         notifications_url = 'https://functions.poehali.dev/19b63815-9352-48d4-80bd-71fc889808df?endpoint=notifications'
         
         payload = {
-            'action': 'send_notification',
+            'action': 'send_booking_emails',
             'booking_data': {
                 'client_name': booking_data['client_name'],
                 'client_phone': booking_data['client_phone'],
@@ -757,6 +687,7 @@ def send_new_booking_notification(booking_data):
                 'appointment_date': booking_data['booking_date'],
                 'appointment_time': booking_data['booking_time'],
                 'end_time': booking_data.get('end_time', ''),
+                'notes': booking_data.get('notes', ''),
                 'status': 'pending'
             }
         }
@@ -771,55 +702,14 @@ def send_new_booking_notification(booking_data):
         if response.status_code == 200:
             result = response.json()
             if result.get('success'):
-                print("New booking notification sent successfully")
-            else:
-                print(f"Notification failed: {result.get('error', 'Unknown error')}")
-        else:
-            print(f"Failed to send notification: {response.status_code}")
-            
-    except Exception as e:
-        print(f"Error sending notification: {str(e)}")
-
-def send_client_booking_confirmation(booking_data):
-    """Отправляет подтверждение записи клиенту"""
-    if not booking_data.get('client_email'):
-        print("No client email provided for confirmation")
-        return
-        
-    try:
-        notifications_url = 'https://functions.poehali.dev/19b63815-9352-48d4-80bd-71fc889808df?endpoint=notifications'
-        
-        payload = {
-            'action': 'send_client_confirmation',
-            'booking_data': {
-                'client_name': booking_data['client_name'],
-                'client_email': booking_data['client_email'],
-                'service_name': booking_data['service_name'],
-                'appointment_date': booking_data['booking_date'],
-                'appointment_time': booking_data['booking_time'],
-                'end_time': booking_data.get('end_time', ''),
-                'notes': booking_data.get('notes', '')
-            }
-        }
-        
-        response = requests.post(
-            notifications_url,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('success'):
-                print("Client confirmation sent successfully")
+                print(f"Booking emails queued: {result.get('queued', 0)}")
             else:
-                print(f"Client confirmation failed: {result.get('error', 'Unknown error')}")
+                print(f"Booking emails failed: {result.get('error', 'Unknown error')}")
         else:
-            print(f"Failed to send client confirmation: {response.status_code}")
+            print(f"Failed to send booking emails: {response.status_code}")
             
     except Exception as e:
-        print(f"Error sending client confirmation: {str(e)}")
+        print(f"Error sending booking emails: {str(e)}")
 
 def send_status_update_notification(booking_data):
     """Отправляет уведомление об изменении статуса клиенту"""
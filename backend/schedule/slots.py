@@ -0,0 +1,162 @@
+'''Free slot search over a working day in integer minutes'''
+
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Слот может закончиться на 30 минут позже рабочего времени
+END_OVERRUN_MINUTES = 30
+
+# Для одной длительности проход по дням не медленнее минутной карты (benchmarks/slot_bitmap.py)
+BITMAP_MIN_DURATIONS = 2
+
+def to_minutes(value):
+    '''
+    Переводит время в минуты от начала дня
+    Args: value - datetime.time или строка 'HH:MM[:SS]' (время записи из json_agg)
+    Returns: int, секунды отбрасываются
+    '''
+    if isinstance(value, str):
+        hours, _, rest = value.partition(':')
+        return int(hours) * 60 + int(rest[:2])
+    return value.hour * 60 + value.minute
+
+@lru_cache(maxsize=None)
+def format_minutes(minutes):
+    return f'{minutes // 60 % 24:02d}:{minutes % 60:02d}'
+
+def first_open_minute(date, now):
+    '''
+    Первая минута дня date, которая еще не прошла к моменту now
+    Returns: int; отрицательное число, если день еще не начался, и больше 1440, если он уже прошел
+    '''
+    elapsed = (now - datetime.combine(date, time())) // timedelta(microseconds=1)
+    return -(-elapsed // 60_000_000)
+
+def merge_overlapping_intervals(intervals):
+    """Объединяет пересекающиеся временные интервалы"""
+    if not intervals:
+        return []
+
+    # Сортируем интервалы по времени начала
+    sorted_intervals = sorted(intervals, key=lambda x: x[0])
+    merged = [sorted_intervals[0]]
+
+    for current_start, current_end in sorted_intervals[1:]:
+        last_start, last_end = merged[-1]
+
+        # Если интервалы пересекаются или касаются
+        if current_start <= last_end:
+            # Объединяем интервалы
+            merged[-1] = (last_start, max(last_end, current_end))
+        else:
+            # Добавляем новый интервал
+            merged.append((current_start, current_end))
+
+    return merged
+
+def blocked_intervals(bookings, break_duration_minutes):
+    '''
+    Заблокированные интервалы дня: каждая запись плюс перерыв после нее
+    Returns: отсортированный список непересекающихся (начало, конец) в минутах
+    '''
+    intervals = []
+    for booking in bookings or []:
+        if booking and booking['start_time'] and booking['end_time']:
+            intervals.append((to_minutes(booking['start_time']), to_minutes(booking['end_time']) + break_duration_minutes))
+    return merge_overlapping_intervals(intervals)
+
+def calculate_slots(day_schedule, service_duration_minutes, break_duration_minutes=30, time_slot_interval_minutes=30, clock=datetime.now):
+    '''
+    Свободные начала услуги в рабочем дне с шагом time_slot_interval_minutes
+    Слот свободен, если он не пересекает ни одну запись с ее перерывом и до следующей записи остается перерыв
+    Args: day_schedule - строка master_schedule с bookings; clock - источник текущего времени (вызывается один раз)
+    Returns: список 'HH:MM'
+    '''
+    start = to_minutes(day_schedule['start_time'])
+    end = to_minutes(day_schedule['end_time']) + END_OVERRUN_MINUTES
+    intervals = blocked_intervals(day_schedule['bookings'], break_duration_minutes)
+
+    # Прошедшие слоты недоступны: начинаем с первого шага, который еще впереди
+    current = start
+    opens = first_open_minute(day_schedule['date'], clock())
+    if opens > current:
+        current += -(-(opens - current) // time_slot_interval_minutes) * time_slot_interval_minutes
+
+    # Интервалы отсортированы и не пересекаются, поэтому их концы возрастают:
+    # указатель стоит на первом интервале, который еще не закончился к началу слота, и только движется вперед.
+    # Слот занят, если этот интервал начинается раньше, чем закончатся услуга и перерыв после нее
+    slots = []
+    position = 0
+    reach = service_duration_minutes + break_duration_minutes
+    while current + service_duration_minutes <= end:
+        while position < len(intervals) and intervals[position][1] <= current:
+            position += 1
+        if position == len(intervals) or intervals[position][0] >= current + reach:
+            slots.append(format_minutes(current))
+        current += time_slot_interval_minutes
+
+    return slots
+
+def available_slots(days, service_durations, break_duration_minutes=30, time_slot_interval_minutes=30, clock=datetime.now, bitmap=None):
+    '''
+    Свободные слоты сразу для нескольких дней и длительностей услуг (горизонт расписания на недели вперед)
+    С NumPy считает все дни одной минутной картой (bitmap_slots), иначе - calculate_slots по каждому дню
+    Args: days - строки master_schedule с bookings; service_durations - длительности в минутах;
+          bitmap - True/False принудительно выбирает движок, None - NumPy, если он установлен и длительностей несколько
+    Returns: список по дням: {длительность: ['HH:MM', ...]}
+    '''
+    durations = list(dict.fromkeys(service_durations))
+    now = clock()
+    if not days or not durations:
+        return [{} for _ in days]
+    if bitmap is None:
+        bitmap = numpy is not None and len(durations) >= BITMAP_MIN_DURATIONS
+    if bitmap:
+        return bitmap_slots(days, durations, break_duration_minutes, time_slot_interval_minutes, now)
+    return [
+        {duration: calculate_slots(day, duration, break_duration_minutes, time_slot_interval_minutes, clock=lambda: now) for duration in durations}
+        for day in days
+    ]
+
+def bitmap_slots(days, durations, break_duration_minutes, time_slot_interval_minutes, now):
+    '''
+    Минутная карта дней: строка на день, True - минута свободна; записи с перерывами вырезаются срезами
+    Начало c подходит, если в окне [c, c + услуга + перерыв) нет занятых минут:
+    по накопленной сумме занятых минут это одна разность taken[c + окно] - taken[c] для всех дней, шагов и длительностей сразу
+    '''
+    starts = numpy.array([to_minutes(day['start_time']) for day in days])
+    ends = numpy.array([to_minutes(day['end_time']) for day in days]) + END_OVERRUN_MINUTES
+    opens = numpy.array([first_open_minute(day['date'], now) for day in days])
+
+    # Окно слота заканчивается не позже конца дня с запасом и перерыва после услуги
+    width = max(int(ends.max()), 0) + break_duration_minutes + 1
+    free = numpy.ones((len(days), width), dtype=bool)
+    for row, day in enumerate(days):
+        for blocked_start, blocked_end in blocked_intervals(day['bookings'], break_duration_minutes):
+            free[row, blocked_start:blocked_end] = False
+    taken = numpy.zeros((len(days), width + 1), dtype=numpy.int16)
+    numpy.cumsum(~free, axis=1, out=taken[:, 1:])
+
+    # Кандидаты (день, шаг) и длительности (длительность, 1, 1) - массивы формы (длительность, день, шаг)
+    steps = max(int((ends - starts).max()) // time_slot_interval_minutes + 1, 0)
+    candidates = starts[:, None] + numpy.arange(steps) * time_slot_interval_minutes
+    service = numpy.array(durations)[:, None, None]
+    rows = numpy.arange(len(days))[:, None]
+    window_start = numpy.minimum(candidates, width)
+    window_end = numpy.minimum(candidates + service + break_duration_minutes, width)
+    fits = (
+        (candidates + service <= ends[:, None])
+        & (candidates >= opens[:, None])
+        & (taken[rows, window_end] == taken[rows, window_start])
+    )
+
+    result = [{} for _ in days]
+    for index, duration in enumerate(durations):
+        for row in range(len(days)):
+            result[row][duration] = [format_minutes(minute) for minute in candidates[row, fits[index, row]].tolist()]
+    return result
@@ -0,0 +1,99 @@
+'''
+Micro-benchmark of the per-request admin token check (backend/*/shared_auth.py)
+Usage: python benchmarks/admin_token_verify.py [--iterations 200000]
+Also checks token semantics (expiry, tampering, key rotation) and that all function copies are identical;
+exits with status 1 on failure
+'''
+
+import argparse
+import filecmp
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend')
+FUNCTIONS_WITH_AUTH = ('api', 'content', 'schedule', 'diary')
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'api'))
+
+import shared_auth  # noqa: E402
+
+
+def event_with(token):
+    return {'headers': {'X-Admin-Token': token}}
+
+
+def check_copies():
+    '''Каждая функция деплоится отдельно, поэтому модуль скопирован; копии должны совпадать'''
+    reference = os.path.join(BACKEND_DIR, 'api', 'shared_auth.py')
+    return all(
+        filecmp.cmp(reference, os.path.join(BACKEND_DIR, function, 'shared_auth.py'), shallow=False)
+        for function in FUNCTIONS_WITH_AUTH
+    )
+
+
+def check_semantics():
+    now = 1_800_000_000
+    os.environ['ADMIN_TOKEN_KEYS'] = 'k2:new-secret,k1:old-secret'
+    token, expires_at = shared_auth.issue_admin_token('admin', 3600, now=now)
+    payload, _, signature = token.rpartition('.')
+    tampered = payload.replace('.k2.', '.k1.') + '.' + signature
+
+    checks = {
+        'valid token': shared_auth.verify_admin_token_value(token, now=now + 10) == {'sub': 'admin', 'kid': 'k2', 'exp': expires_at},
+        'expired token': shared_auth.verify_admin_token_value(token, now=expires_at) is None,
+        'tampered token': shared_auth.verify_admin_token_value(tampered, now=now) is None,
+        'garbage token': shared_auth.verify_admin_token_value('not-a-token', now=now) is None,
+        'non-ASCII tokens rejected, not raised': all(
+            shared_auth.verify_admin_token_value(crafted, now=now) is None
+            for crafted in (f'{payload}.ё', 'v1.k2.ё.99999999999.abc', 'v1.k2.YQ.١٢٣.abc')
+        ),
+    }
+
+    os.environ['ADMIN_TOKEN_KEYS'] = 'k3:newest-secret,k2:new-secret'
+    checks['rotated key still verifies'] = shared_auth.verify_admin_token_value(token, now=now) is not None
+    os.environ['ADMIN_TOKEN_KEYS'] = 'k3:newest-secret'
+    checks['retired key rejected'] = shared_auth.verify_admin_token_value(token, now=now) is None
+    return checks
+
+
+def ns_per_call(func, argument, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(argument)
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    checks = check_semantics()
+    checks['identical copies in api/content/schedule/diary'] = check_copies()
+    for name, passed in checks.items():
+        print(f'{name}: {"ok" if passed else "FAIL"}')
+
+    os.environ['ADMIN_TOKEN_KEYS'] = 'k2:' + 'x' * 32 + ',k1:' + 'y' * 32
+    token, _ = shared_auth.issue_admin_token()
+    payload, _, signature = token.rpartition('.')
+    scenarios = {
+        'signed, valid': event_with(token),
+        'signed, bad signature': event_with(payload + '.' + 'A' * len(signature)),
+        'signed, unknown kid': event_with(token.replace('.k2.', '.k9.')),
+        'no header': {'headers': {}},
+    }
+
+    print(f'{"scenario":>24} {"ns/request":>11}')
+    for name, event in scenarios.items():
+        print(f'{name:>24} {ns_per_call(shared_auth.verify_admin_request, event, args.iterations):>11.0f}')
+
+    del os.environ['ADMIN_TOKEN_KEYS']
+    os.environ['ADMIN_TOKEN'] = 'z' * 43
+    print(f'{"static ADMIN_TOKEN":>24} {ns_per_call(shared_auth.verify_admin_request, event_with("z" * 43), args.iterations):>11.0f}')
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+'''
+Benchmark: legacy five-query analytics vs single-pass compute_visit_aggregates
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/analytics_aggregation.py --rows 3000000
+Runs against a throwaway local database - never point it at production
+'''
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'api'))
+
+from index import compute_visit_aggregates  # noqa: E402
+
+SCHEMA = 't_p89870318_access_bars_service'
+PERIODS = (1, 30, 365)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'db_migrations')
+VISIT_TABLES = (
+    'page_visits', 'visit_referrers', 'visit_user_agents', 'page_visits_daily',
+    'page_visits_daily_pages', 'page_visits_daily_referrers', 'analytics_rollup_state'
+)
+
+
+def run_migration(conn, filename):
+    with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as migration:
+        sql = migration.read()
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO {SCHEMA}')
+        cur.execute(sql)
+        cur.execute('RESET search_path')
+    conn.commit()
+
+
+def fill_visits(cur, rows):
+    '''Заполняет page_visits (схема V0001) синтетическими визитами за последние 400 дней'''
+    cur.execute(f'''
+        INSERT INTO {SCHEMA}.page_visits (page_url, user_ip, user_agent, referrer, visited_at)
+        SELECT
+            '/page-' || floor(power(random(), 3) * 40)::int,
+            '10.' || (visitor / 65536) || '.' || (visitor / 256 %% 256) || '.' || (visitor %% 256),
+            'Mozilla/5.0 (synthetic)',
+            (ARRAY['', '', '', 'https://yandex.ru/', 'https://www.google.com/', 'https://vk.com/', 'https://t.me/'])[1 + floor(random() * 7)::int],
+            NOW() - random() * INTERVAL '400 days'
+        FROM (
+            SELECT floor(power(random(), 2) * %s)::int AS visitor
+            FROM generate_series(1, %s)
+        ) AS visitors
+    ''', (max(rows // 8, 1000), rows))
+
+
+def build_visits_schema(conn, rows, partitioned=True):
+    '''
+    Пересоздает page_visits миграциями: V0001, синтетические визиты, затем миграции до текущей схемы
+    (V0038 переносит рефереры и user-agent в справочники уже заполненной таблицы)
+    '''
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+        for table in VISIT_TABLES:
+            cur.execute(f'DROP TABLE IF EXISTS {SCHEMA}.{table} CASCADE')
+    conn.commit()
+
+    run_migration(conn, 'V0001__create_page_visits_table.sql')
+    with conn.cursor() as cur:
+        print(f'Generating {rows} synthetic visits...')
+        fill_visits(cur, rows)
+    conn.commit()
+
+    migrations = ['V0034__create_page_visits_daily_rollups.sql', 'V0035__add_visitor_sketch_to_page_visits_daily.sql']
+    if partitioned:
+        migrations += ['V0036__partition_page_visits_by_month.sql', 'V0037__index_page_visits_for_keyset_export.sql']
+    migrations.append('V0038__create_visit_referrer_and_user_agent_dimensions.sql')
+    for filename in migrations:
+        run_migration(conn, filename)
+
+    with conn.cursor() as cur:
+        cur.execute(f'ANALYZE {SCHEMA}.page_visits')
+    conn.commit()
+
+
+def prepare_table(conn, rows):
+    '''Переиспользует уже заполненную таблицу текущей схемы или строит ее заново'''
+    with conn.cursor() as cur:
+        cur.execute('''
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = 'page_visits' AND column_name = 'referrer_id'
+        ''', (SCHEMA,))
+        if cur.fetchone():
+            cur.execute(f'SELECT COUNT(*) FROM {SCHEMA}.page_visits')
+            if cur.fetchone()[0] == rows:
+                conn.commit()
+                return
+    conn.commit()
+    build_visits_schema(conn, rows)
+
+
+def legacy_aggregates(cursor, start_date, end_date):
+    '''Пять отдельных запросов - поведение handle_analytics до единого прохода'''
+    window = f'FROM {SCHEMA}.page_visits WHERE visited_at >= %s AND visited_at <= %s'
+    params = (start_date, end_date)
+
+    cursor.execute(f'SELECT COUNT(*) {window}', params)
+    total_visits = cursor.fetchone()[0]
+    cursor.execute(f'SELECT COUNT(DISTINCT user_ip) {window}', params)
+    unique_visitors = cursor.fetchone()[0]
+    cursor.execute(f'SELECT page_url, COUNT(*) as visits {window} GROUP BY page_url ORDER BY visits DESC LIMIT 10', params)
+    top_pages = [{'page_url': row[0], 'visits': row[1]} for row in cursor.fetchall()]
+    cursor.execute(f'SELECT DATE(visited_at) as visit_date, COUNT(*) as visits {window} GROUP BY DATE(visited_at) ORDER BY visit_date', params)
+    daily_stats = [{'visit_date': str(row[0]), 'visits': row[1]} for row in cursor.fetchall()]
+    cursor.execute(f'''
+        SELECT COALESCE(NULLIF(r.referrer_url, ''), 'Direct') as referrer, COUNT(*) as visits
+        FROM {SCHEMA}.page_visits v JOIN {SCHEMA}.visit_referrers r ON r.id = v.referrer_id
+        WHERE v.visited_at >= %s AND v.visited_at <= %s
+        GROUP BY COALESCE(NULLIF(r.referrer_url, ''), 'Direct') ORDER BY visits DESC LIMIT 10
+    ''', params)
+    top_referrers = [{'referrer': row[0], 'visits': row[1]} for row in cursor.fetchall()]
+
+    return {
+        'total_visits': total_visits,
+        'unique_visitors': unique_visitors,
+        'top_pages': top_pages,
+        'daily_stats': daily_stats,
+        'top_referrers': top_referrers
+    }
+
+
+def same_result(legacy, single_pass):
+    '''Сравнивает ответы; порядок равных по visits позиций в топах не гарантирован'''
+    for key in ('total_visits', 'unique_visitors', 'daily_stats'):
+        if legacy[key] != single_pass[key]:
+            return False
+    for key in ('top_pages', 'top_referrers'):
+        if [item['visits'] for item in legacy[key]] != [item['visits'] for item in single_pass[key]]:
+            return False
+    return True
+
+
+def measure(func, cursor, start_date, end_date, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(cursor, start_date, end_date)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=3000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+
+    conn = psycopg2.connect(database_url)
+    try:
+        prepare_table(conn, args.rows)
+        cursor = conn.cursor()
+
+        print(f'{"days":>5} {"legacy ms":>12} {"single-pass ms":>15} {"speedup":>8} {"match":>6}')
+        for days in PERIODS:
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+            legacy_ms, legacy = measure(legacy_aggregates, cursor, start_date, end_date, args.repeat)
+            single_ms, single_pass = measure(compute_visit_aggregates, cursor, start_date, end_date, args.repeat)
+            print(f'{days:>5} {legacy_ms:>12.1f} {single_ms:>15.1f} {legacy_ms / single_ms:>7.2f}x {str(same_result(legacy, single_pass)):>6}')
+
+        cursor.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+'''
+End-to-end benchmark for the analytics endpoint (backend/api handler)
+Run: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/analytics_endpoint --rows 100000 1000000
+'''
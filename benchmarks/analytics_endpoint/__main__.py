@@ -0,0 +1,125 @@
+'''
+Benchmark: provisions page_visits in a throwaway database, generates synthetic visits and
+calls the api handler directly for POST and GET (days=1/7/30/365)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/analytics_endpoint --rows 100000 1000000 10000000
+       python benchmarks/analytics_endpoint --compare before.json after.json
+Writes latency percentiles and queries per call as JSON (--output)
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import generator  # noqa: E402
+import runner  # noqa: E402
+import schema  # noqa: E402
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(database_url, rows, args):
+    conn = psycopg2.connect(database_url)
+    try:
+        now = datetime.utcnow()
+        print(f'[{rows} rows] provisioning schema and generating visits...')
+        started = time.perf_counter()
+        schema.provision(conn, (now - timedelta(days=generator.HISTORY_DAYS)).date())
+        generator.fill(conn, rows, now, seed=args.seed)
+        generate_seconds = time.perf_counter() - started
+
+        runner.reset_instance_state(args.analytics_cache)
+        started = time.perf_counter()
+        runner.catch_up_rollups(conn)
+        rollup_seconds = time.perf_counter() - started
+    finally:
+        conn.close()
+
+    scenarios = runner.run_scenarios(args.repeat, args.post_repeat)
+    for name, metrics in scenarios.items():
+        print(f'  {name:<16} p50 {metrics["p50_ms"]:>9.2f} ms  p95 {metrics["p95_ms"]:>9.2f} ms  '
+              f'p99 {metrics["p99_ms"]:>9.2f} ms  queries {metrics["queries_per_call"]:>5}')
+
+    return {
+        'rows': rows,
+        'generate_seconds': round(generate_seconds, 1),
+        'rollup_catch_up_seconds': round(rollup_seconds, 1),
+        'scenarios': scenarios
+    }
+
+
+def compare(before_path, after_path):
+    with open(before_path, encoding='utf-8') as before_file, open(after_path, encoding='utf-8') as after_file:
+        before = {run['rows']: run['scenarios'] for run in json.load(before_file)['runs']}
+        after = {run['rows']: run['scenarios'] for run in json.load(after_file)['runs']}
+
+    print(f'{"rows":>9} {"scenario":<16} {"p50 before":>11} {"p50 after":>10} {"p95 before":>11} {"p95 after":>10} {"queries":>9}')
+    for rows in sorted(before.keys() & after.keys()):
+        for name in [name for name in before[rows] if name in after[rows]]:
+            old, new = before[rows][name], after[rows][name]
+            print(f'{rows:>9} {name:<16} {old["p50_ms"]:>11.2f} {new["p50_ms"]:>10.2f} '
+                  f'{old["p95_ms"]:>11.2f} {new["p95_ms"]:>10.2f} {old["queries_per_call"]:>4}->{new["queries_per_call"]:<4}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=50, help='calls per GET scenario')
+    parser.add_argument('--post-repeat', type=int, default=200, help='calls per POST scenario')
+    parser.add_argument('--seed', type=int, default=20261018)
+    parser.add_argument('--analytics-cache', action='store_true', help='keep the warm-instance analytics cache enabled')
+    parser.add_argument('--output', default=None, help='JSON results path (default: analytics_endpoint-<timestamp>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='print the difference between two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+
+    runner.instrument_handler(database_url)
+    with psycopg2.connect(database_url) as conn, conn.cursor() as cur:
+        cur.execute('SHOW server_version')
+        server_version = cur.fetchone()[0]
+
+    results = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'postgres': server_version,
+            'repeat': args.repeat,
+            'post_repeat': args.post_repeat,
+            'analytics_cache': args.analytics_cache,
+            'seed': args.seed
+        },
+        'runs': [run_size(database_url, rows, args) for rows in args.rows]
+    }
+
+    output = args.output or f'analytics_endpoint-{datetime.now():%Y%m%d-%H%M%S}.json'
+    with open(output, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+'''
+Synthetic page_visits with production-like shape:
+Zipf-distributed pages, weekly seasonality with growth and burst days, diurnal hours,
+a referrer mix dominated by direct/search traffic and browser user agents from benchmarks/user_agents.tsv
+'''
+
+import os
+import random
+from datetime import timedelta
+
+from schema import SCHEMA
+
+HISTORY_DAYS = 365
+SLOTS = 10000
+PAGE_COUNT = 200
+ZIPF_EXPONENT = 1.1
+BURST_DAY_SHARE = 0.04
+USER_AGENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'user_agents.tsv')
+
+# Доли трафика по источникам; остаток делят ссылки с партнерских сайтов
+REFERRER_MIX = (
+    ('', 0.42),
+    ('https://yandex.ru/', 0.22),
+    ('https://www.google.com/', 0.12),
+    ('https://vk.com/', 0.06),
+    ('https://t.me/', 0.05),
+    ('https://dzen.ru/', 0.03),
+    ('https://www.instagram.com/', 0.02),
+)
+PARTNER_REFERRERS = 60
+
+# Относительная посещаемость по часам суток (ночью почти нет визитов, пик вечером)
+HOUR_WEIGHTS = (1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 8, 8, 8, 8, 9, 10, 11, 12, 12, 10, 6, 3)
+
+
+def weighted_slots(values, weights, slots=SLOTS):
+    '''Раскладывает значения по slots ячейкам пропорционально весам: случайная ячейка = выборка по распределению'''
+    total = sum(weights)
+    result = []
+    for value, weight in zip(values, weights):
+        result.extend([value] * max(1, round(weight / total * slots)))
+    return result
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def page_urls(count=PAGE_COUNT):
+    sections = ('', '/services', '/reviews', '/schedule', '/training', '/blog', '/massage', '/healing')
+    urls = ['/'] + [f'{sections[number % len(sections)]}/page-{number}' for number in range(1, count)]
+    return urls
+
+
+def browser_user_agents():
+    with open(USER_AGENTS_PATH, encoding='utf-8') as corpus:
+        return [
+            line.rstrip('\n').split('\t', 1)[1]
+            for line in corpus
+            if line.startswith('human\t')
+        ]
+
+
+def daily_counts(rows, days, rng):
+    '''Распределяет rows по дням: недельная сезонность, рост к концу года и редкие всплески x3-x8'''
+    weights = []
+    for offset, day in enumerate(days):
+        weight = 0.6 + 0.6 * offset / max(len(days) - 1, 1)
+        if day.weekday() >= 5:
+            weight *= 0.7
+        if rng.random() < BURST_DAY_SHARE:
+            weight *= rng.uniform(3, 8)
+        weights.append(weight)
+
+    total = sum(weights)
+    counts = [int(rows * weight / total) for weight in weights]
+    for index in sorted(range(len(days)), key=lambda index: -weights[index])[:rows - sum(counts)]:
+        counts[index] += 1
+    return counts
+
+
+def insert_dimension(cur, table, column_sql, values):
+    ids = {}
+    for value in values:
+        cur.execute(f'INSERT INTO {SCHEMA}.{table} {column_sql} RETURNING id', value)
+        ids[value[0]] = cur.fetchone()[0]
+    return ids
+
+
+def fill(conn, rows, now, seed=20261018, progress=print):
+    '''Заполняет page_visits rows синтетическими визитами за HISTORY_DAYS дней до now (включая текущий день)'''
+    rng = random.Random(seed)
+    today = now.date()
+    days = [today - timedelta(days=offset) for offset in range(HISTORY_DAYS, -1, -1)]
+
+    pages = page_urls()
+    page_slots = weighted_slots(pages, zipf_weights(len(pages)))
+
+    with conn.cursor() as cur:
+        cur.execute('SELECT setseed(%s)', (rng.random() * 2 - 1,))
+
+        partner_share = 1 - sum(share for _, share in REFERRER_MIX)
+        partners = [f'https://partner-{number}.example.ru/articles/{number * 7}' for number in range(PARTNER_REFERRERS)]
+        referrer_values = [referrer for referrer, _ in REFERRER_MIX] + partners
+        referrer_weights = [share for _, share in REFERRER_MIX] + [
+            partner_share * weight / sum(zipf_weights(PARTNER_REFERRERS)) for weight in zipf_weights(PARTNER_REFERRERS)
+        ]
+        referrer_ids = insert_dimension(
+            cur, 'visit_referrers', '(referrer_url, referrer_domain) VALUES (%s, %s) ON CONFLICT (referrer_url) DO UPDATE SET referrer_domain = EXCLUDED.referrer_domain',
+            [(referrer, referrer.split('/')[2].removeprefix('www.') if referrer else '') for referrer in referrer_values]
+        )
+        referrer_slots = weighted_slots([referrer_ids[referrer] for referrer in referrer_values], referrer_weights)
+
+        user_agents = browser_user_agents()
+        user_agent_ids = insert_dimension(cur, 'visit_user_agents', '(user_agent) VALUES (%s)', [(user_agent,) for user_agent in user_agents])
+        user_agent_slots = weighted_slots([user_agent_ids[user_agent] for user_agent in user_agents], zipf_weights(len(user_agents), 0.8))
+
+        visitors = max(rows // 6, 1000)
+        for number, (day, count) in enumerate(zip(days, daily_counts(rows, days, rng))):
+            hours = range(24) if day < today else range(now.hour)
+            if not count or not hours:
+                continue
+            hour_slots = weighted_slots(list(hours), [HOUR_WEIGHTS[hour] for hour in hours], 240)
+            cur.execute(f'''
+                INSERT INTO {SCHEMA}.page_visits (page_url, user_ip, user_agent_id, referrer_id, session_id, visited_at)
+                SELECT
+                    (%(pages)s::text[])[1 + floor(random() * %(page_slots)s)::int],
+                    '10.' || (visitor / 65536 %% 256) || '.' || (visitor / 256 %% 256) || '.' || (visitor %% 256),
+                    (%(user_agents)s::int[])[1 + floor(random() * %(user_agent_slots)s)::int],
+                    (%(referrers)s::int[])[1 + floor(random() * %(referrer_slots)s)::int],
+                    NULL,
+                    %(day)s::timestamp
+                        + make_interval(hours => (%(hours)s::int[])[1 + floor(random() * %(hour_slots)s)::int])
+                        + random() * INTERVAL '1 hour'
+                FROM (
+                    SELECT floor(power(random(), 2) * %(visitors)s)::int AS visitor
+                    FROM generate_series(1, %(count)s)
+                ) AS daily_visitors
+            ''', {
+                'pages': page_slots, 'page_slots': len(page_slots),
+                'user_agents': user_agent_slots, 'user_agent_slots': len(user_agent_slots),
+                'referrers': referrer_slots, 'referrer_slots': len(referrer_slots),
+                'hours': hour_slots, 'hour_slots': len(hour_slots),
+                'day': day, 'visitors': visitors, 'count': count
+            })
+            if number % 60 == 0:
+                conn.commit()
+                progress(f'  {day}: {number + 1}/{len(days)} days')
+
+        cur.execute(f'ANALYZE {SCHEMA}.page_visits')
+    conn.commit()
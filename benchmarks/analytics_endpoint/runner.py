@@ -0,0 +1,118 @@
+'''Invokes the api handler with crafted events and collects latency and query counts'''
+
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'api'))
+
+import index  # noqa: E402
+
+GET_PERIODS = (1, 7, 30, 365)
+POST_BATCH_SIZE = 10
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    '''Курсор, считающий отправленные на сервер запросы (execute_values - один запрос на страницу)'''
+    queries = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.queries += 1
+        return super().execute(query, vars)
+
+
+def instrument_handler(database_url):
+    '''Направляет get_db_connection функции api в тестовую базу с подсчетом запросов'''
+    os.environ['DATABASE_URL'] = database_url
+    index.get_db_connection = lambda: psycopg2.connect(database_url, cursor_factory=CountingCursor)
+
+
+def reset_instance_state(analytics_cache):
+    '''Сбрасывает состояние теплого инстанса: кэши справочников ссылаются на пересозданные таблицы'''
+    index._referrer_ids.clear()
+    index._user_agent_ids.clear()
+    index._analytics_cache.clear()
+    index._partitions_ensured_through = None
+    index.ANALYTICS_CACHE_MAX_ENTRIES = 64 if analytics_cache else 0
+
+
+def catch_up_rollups(conn):
+    '''Доводит дневную свертку до текущего дня, чтобы замеры GET отражали установившийся режим'''
+    cursor = conn.cursor()
+    previous = None
+    while True:
+        rolled_up_through = index.rollup_closed_days(cursor, conn)
+        if rolled_up_through == previous:
+            break
+        previous = rolled_up_through
+    cursor.close()
+
+
+def get_event(days):
+    return {
+        'httpMethod': 'GET',
+        'headers': {},
+        'queryStringParameters': {'endpoint': 'analytics', 'days': str(days)}
+    }
+
+
+def post_event(number, batch_size):
+    headers = {
+        'User-Agent': BROWSER_USER_AGENT,
+        'X-Real-Ip': f'192.0.2.{number % 250}',
+        'Referer': 'https://yandex.ru/'
+    }
+    if batch_size == 1:
+        body = {'page': f'/page-{number % 40}'}
+    else:
+        body = {'visits': [{'page': f'/page-{(number + offset) % 40}', 'referrer': 'https://t.me/'} for offset in range(batch_size)]}
+    return {
+        'httpMethod': 'POST',
+        'headers': headers,
+        'body': json.dumps(body),
+        'queryStringParameters': {'endpoint': 'analytics'}
+    }
+
+
+def summarize(latencies_ms, queries):
+    cuts = statistics.quantiles(latencies_ms, n=100, method='inclusive')
+    return {
+        'calls': len(latencies_ms),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(statistics.fmean(latencies_ms), 3),
+        'queries_per_call': round(statistics.fmean(queries), 2),
+        'queries_max': max(queries)
+    }
+
+
+def measure(make_event, repeat):
+    latencies_ms = []
+    queries = []
+    for number in range(repeat):
+        event = make_event(number)
+        CountingCursor.queries = 0
+        started = time.perf_counter()
+        response = index.handler(event, None)
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+        queries.append(CountingCursor.queries)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f'{event["httpMethod"]} returned {response["statusCode"]}: {response["body"]}')
+    return summarize(latencies_ms, queries)
+
+
+def run_scenarios(repeat, post_repeat):
+    '''Возвращает {сценарий: метрики}; GET замеряются до POST, чтобы не сдвигать текущий день'''
+    results = {}
+    for days in GET_PERIODS:
+        results[f'GET days={days}'] = measure(lambda number, days=days: get_event(days), repeat)
+    results['POST single'] = measure(lambda number: post_event(number, 1), post_repeat)
+    results[f'POST batch={POST_BATCH_SIZE}'] = measure(lambda number: post_event(number, POST_BATCH_SIZE), post_repeat)
+    return results
@@ -0,0 +1,61 @@
+'''Provisions the current page_visits schema in a throwaway database by replaying the migrations'''
+
+import os
+from datetime import date
+
+SCHEMA = 't_p89870318_access_bars_service'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'db_migrations')
+
+# Миграции, которые формируют page_visits и аналитические таблицы в текущем виде
+VISIT_MIGRATIONS = (
+    'V0001__create_page_visits_table.sql',
+    'V0034__create_page_visits_daily_rollups.sql',
+    'V0035__add_visitor_sketch_to_page_visits_daily.sql',
+    'V0036__partition_page_visits_by_month.sql',
+    'V0037__index_page_visits_for_keyset_export.sql',
+    'V0038__create_visit_referrer_and_user_agent_dimensions.sql',
+    'V0039__create_page_visits_bots_daily.sql',
+)
+VISIT_TABLES = (
+    'page_visits', 'visit_referrers', 'visit_user_agents', 'page_visits_daily', 'page_visits_daily_pages',
+    'page_visits_daily_referrers', 'analytics_rollup_state', 'page_visits_bots_daily'
+)
+
+
+def run_migration(conn, filename):
+    with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as migration:
+        sql = migration.read()
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO {SCHEMA}')
+        cur.execute(sql)
+        cur.execute('RESET search_path')
+    conn.commit()
+
+
+def add_months(month, months):
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def provision(conn, first_day):
+    '''Пересоздает таблицы визитов и секции page_visits начиная с месяца first_day'''
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+        for table in VISIT_TABLES:
+            cur.execute(f'DROP TABLE IF EXISTS {SCHEMA}.{table} CASCADE')
+    conn.commit()
+
+    for filename in VISIT_MIGRATIONS:
+        run_migration(conn, filename)
+
+    # V0036 на пустой таблице создает секции только от текущего месяца
+    month = first_day.replace(day=1)
+    with conn.cursor() as cur:
+        while month <= date.today():
+            cur.execute(f'''
+                CREATE TABLE IF NOT EXISTS {SCHEMA}.page_visits_y{month.year:04d}m{month.month:02d}
+                PARTITION OF {SCHEMA}.page_visits
+                FOR VALUES FROM (%s) TO (%s)
+            ''', (month, add_months(month, 1)))
+            month = add_months(month, 1)
+    conn.commit()
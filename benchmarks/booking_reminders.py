@@ -0,0 +1,229 @@
+'''
+Behaviour check and throughput benchmark for the booking reminder job in backend/content (send_booking_reminders)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/booking_reminders.py --bookings 500 --sessions 1 2 4 8
+Runs against a throwaway local database and a local aiosmtpd stand-in (benchmarks/smtp_stand_in.py) - never point it at production
+Exits with status 1 if a client misses a reminder or gets it twice, or the pool opens more sessions than allowed
+'''
+
+import argparse
+import os
+import smtplib
+import sys
+import threading
+import time
+from datetime import date
+
+import psycopg2
+import psycopg2.extensions
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from email_outbox import EMAIL_MIGRATIONS, SCHEMA, build_email_tables, clear_outbox, query, run_migration  # noqa: E402
+import index  # noqa: E402
+from smtp_stand_in import local_smtp  # noqa: E402
+
+DAY = date(2026, 10, 20)
+EMAIL_PASSWORD = 'stand-in-password'
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    statements = []
+
+    def execute(self, query, vars=None):
+        CountingCursor.statements.append(' '.join(query.split()))
+        return super().execute(query, vars)
+
+
+def counting_connection():
+    return psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=CountingCursor)
+
+
+def build_booking_tables(conn, bookings):
+    '''
+    Таблицы записей расписания и дневника (в репозитории они созданы вне db_migrations - здесь только нужные колонки)
+    и по bookings записей в каждой: на DAY подтверждена каждая вторая, у каждой десятой нет email, часть - на соседние дни
+    '''
+    with conn.cursor() as cur:
+        cur.execute(f'''
+            DROP TABLE IF EXISTS {SCHEMA}.booking_reminders, {SCHEMA}.bookings, {SCHEMA}.services,
+                {SCHEMA}.diary_bookings, {SCHEMA}.diary_clients, {SCHEMA}.diary_users, {SCHEMA}.diary_services;
+            CREATE TABLE {SCHEMA}.services (id SERIAL PRIMARY KEY, name VARCHAR(255));
+            CREATE TABLE {SCHEMA}.bookings (
+                id SERIAL PRIMARY KEY, service_id INTEGER, service_name VARCHAR(255), booking_date DATE,
+                start_time TIME, end_time TIME, client_name VARCHAR(255), client_phone VARCHAR(50),
+                client_email VARCHAR(255), notes TEXT, status VARCHAR(20)
+            );
+            CREATE TABLE {SCHEMA}.diary_users (id SERIAL PRIMARY KEY, name VARCHAR(255), phone VARCHAR(50), email VARCHAR(255));
+            CREATE TABLE {SCHEMA}.diary_clients (id SERIAL PRIMARY KEY, user_id INTEGER, owner_id INTEGER);
+            CREATE TABLE {SCHEMA}.diary_services (id SERIAL PRIMARY KEY, name VARCHAR(255));
+            CREATE TABLE {SCHEMA}.diary_bookings (
+                id SERIAL PRIMARY KEY, client_id INTEGER, service_id INTEGER, owner_id INTEGER, booking_date DATE,
+                booking_time TIME, start_time TIME, end_time TIME, status VARCHAR(20)
+            );
+            INSERT INTO {SCHEMA}.services (name) VALUES ('Access Bars'), ('Массаж');
+            INSERT INTO {SCHEMA}.diary_services (name) VALUES ('Консультация'), ('Целительство');
+        ''')
+        cur.execute(f'''
+            INSERT INTO {SCHEMA}.bookings (service_id, service_name, booking_date, start_time, end_time, client_name, client_email, status)
+            SELECT 1 + g %% 2, NULL, %(day)s + (g %% 3 - 1), TIME '09:00' + g %% 10 * INTERVAL '1 hour',
+                   TIME '10:00' + g %% 10 * INTERVAL '1 hour', 'Клиент расписания ' || g,
+                   CASE WHEN g %% 10 = 0 THEN NULL ELSE 'schedule' || g || '@example.test' END,
+                   CASE WHEN g %% 2 = 0 THEN 'confirmed' ELSE 'pending' END
+            FROM generate_series(1, %(rows)s * 3) AS g;
+            INSERT INTO {SCHEMA}.diary_users (name, email)
+            SELECT 'Клиент дневника ' || g, CASE WHEN g %% 10 = 0 THEN '' ELSE 'diary' || g || '@example.test' END
+            FROM generate_series(1, %(rows)s * 3) AS g;
+            INSERT INTO {SCHEMA}.diary_clients (user_id, owner_id) SELECT id, 1 FROM {SCHEMA}.diary_users ORDER BY id;
+            INSERT INTO {SCHEMA}.diary_bookings (client_id, service_id, owner_id, booking_date, start_time, end_time, status)
+            SELECT g, 1 + g %% 2, 1, %(day)s + (g %% 3 - 1), TIME '09:00' + g %% 10 * INTERVAL '1 hour',
+                   TIME '10:00' + g %% 10 * INTERVAL '1 hour', CASE WHEN g %% 2 = 0 THEN 'confirmed' ELSE 'cancelled' END
+            FROM generate_series(1, %(rows)s * 3) AS g;
+        ''', {'day': DAY, 'rows': bookings})
+    conn.commit()
+    run_migration(conn, 'V0047__create_booking_reminders.sql')
+    with conn.cursor() as cur:
+        cur.execute(f'ANALYZE {SCHEMA}.bookings')
+        cur.execute(f'ANALYZE {SCHEMA}.diary_bookings')
+    conn.commit()
+
+
+def expected_recipients(conn):
+    rows = query(conn, f'''
+        SELECT client_email FROM {SCHEMA}.bookings WHERE booking_date = %(day)s AND status = 'confirmed' AND client_email <> ''
+        UNION ALL
+        SELECT u.email FROM {SCHEMA}.diary_bookings b
+        JOIN {SCHEMA}.diary_clients c ON c.id = b.client_id JOIN {SCHEMA}.diary_users u ON u.id = c.user_id
+        WHERE b.booking_date = %(day)s AND b.status = 'confirmed' AND u.email <> ''
+    ''', {'day': DAY})
+    return sorted(row[0] for row in rows)
+
+
+def delivered_recipients(mailbox):
+    with mailbox.lock:
+        return sorted(recipient for _, recipients, _ in mailbox.messages for recipient in recipients)
+
+
+def reset(conn, mailbox):
+    clear_outbox(conn)
+    with conn.cursor() as cur:
+        cur.execute(f'TRUNCATE {SCHEMA}.booking_reminders')
+    conn.commit()
+    with mailbox.lock:
+        mailbox.messages.clear()
+
+
+def check_behaviour(conn, stand_in):
+    mailbox = stand_in.mailbox
+    checks = {}
+    expected = expected_recipients(conn)
+    reset(conn, mailbox)
+
+    CountingCursor.statements.clear()
+    index.get_db_connection = counting_connection
+    report = index.send_booking_reminders(DAY)
+    index.get_db_connection = connect
+    selects = [statement for statement in CountingCursor.statements if 'diary_bookings' in statement or 'FROM t_p89870318_access_bars_service.bookings' in statement]
+    checks['one query finds the day in both schedule and diary'] = len(selects) == 1 and 'UNION ALL' in selects[0]
+    checks['every confirmed client with email gets one reminder'] = (
+        report['due'] == report['queued'] == report['sent'] == len(expected) and delivered_recipients(mailbox) == expected
+    )
+    checks['pool stays within REMINDER_SMTP_SESSIONS and closes its sessions'] = (
+        mailbox.peak_connections <= index.REMINDER_SMTP_SESSIONS and mailbox.open_connections == 0
+    )
+
+    again = index.send_booking_reminders(DAY)
+    checks['rerun for the same day sends nothing'] = again['due'] == again['queued'] == 0 and delivered_recipients(mailbox) == expected
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE {SCHEMA}.bookings SET booking_date = %s, status = 'confirmed'
+            WHERE id = (SELECT min(id) FROM {SCHEMA}.bookings WHERE booking_date <> %s AND client_email IS NOT NULL)
+            RETURNING client_email
+        """, (DAY, DAY))
+        moved = cur.fetchone()[0]
+    conn.commit()
+    later = index.send_booking_reminders(DAY)
+    checks['booking moved to the day later gets its own reminder'] = (
+        later['queued'] == 1 and delivered_recipients(mailbox) == sorted(expected + [moved])
+    )
+
+    reset(conn, mailbox)
+    settings = index.get_email_settings()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.queue_booking_reminders(settings, DAY))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    checks['concurrent job runs queue every reminder once'] = (
+        sum(queued for _, queued in results) == len(expected) + 1
+        and query(conn, f"SELECT count(*), count(DISTINCT recipient) FROM {SCHEMA}.email_outbox WHERE kind = 'reminder'")[0] == (len(expected) + 1, len(expected) + 1)
+    )
+    return checks
+
+
+def connect():
+    return psycopg2.connect(os.environ['DATABASE_URL'])
+
+
+def legacy_reminders(settings, drafts):
+    '''Отправка по образцу send_client_confirmation до очереди: соединение, STARTTLS и вход на каждое письмо'''
+    started = time.perf_counter()
+    for draft in drafts:
+        server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'])
+        server.starttls()
+        server.login(settings['sender_email'], EMAIL_PASSWORD)
+        server.send_message(index.build_email(settings, draft))
+        server.quit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bookings', type=int, default=500, help='записей в расписании и в дневнике на день')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--smtp-delay-ms', type=int, default=20, help='задержка ответа на DATA (сетевая задержка реального сервера)')
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['EMAIL_PASSWORD'] = EMAIL_PASSWORD
+    index.get_db_connection = connect
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with local_smtp() as stand_in:
+            build_email_tables(conn, stand_in, EMAIL_MIGRATIONS)
+            build_booking_tables(conn, args.bookings)
+            checks = check_behaviour(conn, stand_in)
+            for name, passed in checks.items():
+                print(f'{name}: {"ok" if passed else "FAIL"}')
+
+            mailbox = stand_in.mailbox
+            mailbox.data_delay = args.smtp_delay_ms / 1000
+            settings = index.get_email_settings()
+            expected = expected_recipients(conn)
+            drafts = [('reminder', recipient, 'Напоминание о записи на завтра', 'x') for recipient in expected]
+            legacy_seconds = legacy_reminders(settings, drafts)
+            print(f'{"SMTP sessions":>22} {"reminders":>10} {"seconds":>8} {"msg/s":>8} {"peak connections":>17}')
+            print(f'{"connect per message":>22} {len(drafts):>10} {legacy_seconds:>8.2f} {len(drafts) / legacy_seconds:>8.1f} {1:>17}')
+
+            for sessions in args.sessions:
+                reset(conn, mailbox)
+                mailbox.peak_connections = 0
+                index.REMINDER_SMTP_SESSIONS = sessions
+                report = index.send_booking_reminders(DAY)
+                exact = delivered_recipients(mailbox) == expected and mailbox.peak_connections <= sessions
+                checks[f'{sessions} sessions deliver every reminder exactly once'] = exact
+                print(f'{sessions:>22} {report["sent"]:>10} {report["seconds"]:>8.2f} {report["messages_per_second"]:>8.1f} {mailbox.peak_connections:>17}'
+                      + ('' if exact else '  FAIL'))
+    finally:
+        conn.close()
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+'''
+Benchmark and accuracy check for backend/api/bots.py over a corpus of real-world user agents
+Usage: python benchmarks/bot_filter.py [--iterations 200000]
+Exits with status 1 if any corpus entry is misclassified
+'''
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'api'))
+
+import bots  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'user_agents.tsv')
+
+
+def load_corpus():
+    '''Читает пары (метка, user-agent); метка - bot или human'''
+    corpus = []
+    with open(CORPUS_PATH, encoding='utf-8') as corpus_file:
+        for line in corpus_file:
+            if line.startswith('#') or not line.strip():
+                continue
+            label, user_agent = line.rstrip('\n').split('\t', 1)
+            corpus.append((label == 'bot', user_agent))
+    return corpus
+
+
+def check_burst():
+    '''Всплеск срабатывает после BURST_MAX_REQUESTS запросов за окно и сбрасывается после окна; неизвестный IP не считается'''
+    flagged = [bots.register_request('203.0.113.7', now=1000.0) for _ in range(bots.BURST_MAX_REQUESTS + 1)]
+    reset = bots.register_request('203.0.113.7', now=1000.0 + bots.BURST_WINDOW_SECONDS)
+    unknown = [bots.register_request(bots.UNKNOWN_IP, now=1000.0) for _ in range(bots.BURST_MAX_REQUESTS + 1)]
+    return not any(flagged[:-1]) and flagged[-1] and not reset and not any(unknown)
+
+
+def ns_per_call(func, args_list, iterations):
+    started = time.perf_counter()
+    count = 0
+    while count < iterations:
+        for args in args_list:
+            func(*args)
+        count += len(args_list)
+    return (time.perf_counter() - started) / count * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failed = False
+    for is_bot, user_agent in corpus:
+        if bots.is_bot_user_agent(user_agent) != is_bot:
+            print(f'MISCLASSIFIED ({"bot" if is_bot else "human"}): {user_agent}')
+            failed = True
+
+    burst_ok = check_burst()
+    print(f'burst detector: {"ok" if burst_ok else "FAIL"}')
+    failed = failed or not burst_ok
+
+    user_agents = [(user_agent,) for _, user_agent in corpus]
+    uncached = ns_per_call(bots.is_bot_user_agent.__wrapped__, user_agents, args.iterations)
+    cached = ns_per_call(bots.is_bot_user_agent, user_agents, args.iterations)
+    ips = [(user_agent, f'198.51.100.{number % 250}') for number, (_, user_agent) in enumerate(corpus)]
+    classify = ns_per_call(bots.classify_visit, ips, args.iterations)
+
+    bot_count = sum(1 for is_bot, _ in corpus if is_bot)
+    print(f'corpus: {len(corpus)} user agents ({bot_count} bots, {len(corpus) - bot_count} browsers)')
+    print(f'{"first sight of a UA":>22} {uncached:>8.0f} ns/call (no cache)')
+    print(f'{"is_bot_user_agent":>22} {cached:>8.0f} ns/call (lru_cache)')
+    print(f'{"classify_visit":>22} {classify:>8.0f} ns/call (with burst window)')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+'''
+Behaviour check and benchmark for the admin booking digest in backend/content (flush_admin_digest / admin_digest_email)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/email_digest.py --bookings 50
+Runs against a throwaway local database and a local aiosmtpd stand-in (benchmarks/smtp_stand_in.py) - never point it at production
+Exits with status 1 if a booking is missing from the digests or appears twice, or a client confirmation waits for the digest
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from email_outbox import SCHEMA, build_email_tables, clear_outbox, notify, query  # noqa: E402
+import index  # noqa: E402
+from smtp_stand_in import local_smtp  # noqa: E402
+
+ADMIN_TOKEN = 'email-digest-benchmark'
+
+
+def booking(number):
+    return {
+        'client_name': f'Клиент {number}', 'client_phone': f'+7 900 000-{number:04d}', 'client_email': f'client{number}@example.test',
+        'service_name': 'Access Bars', 'appointment_date': '2026-10-20', 'appointment_time': '12:00', 'end_time': '13:00'
+    }
+
+
+def configure(stand_in, digest_enabled, window_minutes=15, max_bookings=5):
+    response = index.handler({
+        'httpMethod': 'POST', 'headers': {'X-Admin-Token': ADMIN_TOKEN},
+        'queryStringParameters': {'endpoint': 'notifications'},
+        'body': json.dumps({'action': 'save_email_settings', 'settings': dict(
+            stand_in.settings(), digest_enabled=digest_enabled,
+            digest_window_minutes=window_minutes, digest_max_bookings=max_bookings
+        )})
+    }, None)
+    assert response['statusCode'] == 200, response
+
+
+def reset(conn, mailbox):
+    clear_outbox(conn)
+    with conn.cursor() as cur:
+        cur.execute(f'TRUNCATE {SCHEMA}.email_digest_items')
+    conn.commit()
+    with mailbox.lock:
+        mailbox.messages.clear()
+
+
+def age_digest(conn, minutes):
+    with conn.cursor() as cur:
+        cur.execute(f"UPDATE {SCHEMA}.email_digest_items SET created_at = created_at - make_interval(mins => %s)", (minutes,))
+    conn.commit()
+
+
+def admin_letters(mailbox):
+    with mailbox.lock:
+        return [message for _, recipients, message in mailbox.messages if recipients == ['admin@example.test']]
+
+
+def client_letters(mailbox):
+    with mailbox.lock:
+        return [message for _, recipients, message in mailbox.messages if recipients != ['admin@example.test']]
+
+
+def covered_clients(letters):
+    '''Номера клиентов, упомянутых в письмах администратору (сводки и одиночные уведомления)'''
+    numbers = []
+    for message in letters:
+        for line in message.get_body(('plain',)).get_content().splitlines():
+            if 'Клиент ' in line:
+                numbers.append(int(line.split('Клиент ')[1].split(',')[0]))
+    return numbers
+
+
+def check_behaviour(conn, stand_in):
+    mailbox = stand_in.mailbox
+    checks = {}
+
+    configure(stand_in, digest_enabled=True)
+    reset(conn, mailbox)
+    responses = [notify('send_booking_emails', booking(number)) for number in range(3)]
+    index.dispatch_email_outbox()
+    checks['client confirmations go out at once, admin notices wait'] = (
+        all(json.loads(response['body'])['digest'] == 1 for response in responses)
+        and len(client_letters(mailbox)) == 3 and admin_letters(mailbox) == []
+        and query(conn, f'SELECT count(*) FROM {SCHEMA}.email_digest_items')[0][0] == 3
+    )
+
+    age_digest(conn, 16)
+    report = index.dispatch_email_outbox()
+    letters = admin_letters(mailbox)
+    checks['expired window sends one digest with every booking'] = (
+        report['digests'] == 1 and len(letters) == 1 and letters[0]['Subject'] == 'Новые записи: 3'
+        and sorted(covered_clients(letters)) == [0, 1, 2]
+        and query(conn, f'SELECT count(*) FROM {SCHEMA}.email_digest_items')[0][0] == 0
+    )
+
+    reset(conn, mailbox)
+    for number in range(5):
+        notify('send_notification', booking(number))
+    checks['full digest is queued by the request that fills it'] = query(
+        conn, f'SELECT kind, count(*) FROM {SCHEMA}.email_outbox GROUP BY kind'
+    ) == [('admin_digest', 1)]
+
+    reset(conn, mailbox)
+    for number in range(12):
+        notify('send_notification', booking(number))
+    age_digest(conn, 16)
+    index.dispatch_email_outbox()
+    letters = admin_letters(mailbox)
+    checks['burst of 12 becomes digests of 5, 5 and 2'] = (
+        sorted(letter['Subject'] for letter in letters) == ['Новые записи: 2', 'Новые записи: 5', 'Новые записи: 5']
+        and sorted(covered_clients(letters)) == list(range(12))
+    )
+
+    reset(conn, mailbox)
+    notify('send_notification', booking(1))
+    age_digest(conn, 16)
+    index.dispatch_email_outbox()
+    letters = admin_letters(mailbox)
+    checks['digest of one is the usual notification'] = len(letters) == 1 and letters[0]['Subject'] == 'Новая запись: Клиент 1'
+
+    reset(conn, mailbox)
+    for number in range(4):
+        notify('send_notification', booking(number))
+    age_digest(conn, 16)
+    first = psycopg2.connect(os.environ['DATABASE_URL'])
+    second = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        settings = index.get_email_settings()
+        with first.cursor() as cur:
+            flushed_first = index.flush_admin_digest(cur, settings)
+            with second.cursor() as other:
+                flushed_second = index.flush_admin_digest(other, settings)
+            second.commit()
+        first.commit()
+    finally:
+        first.close()
+        second.close()
+    checks['concurrent flushes do not share bookings'] = (
+        (flushed_first, flushed_second) == (1, 0)
+        and query(conn, f'SELECT count(*) FROM {SCHEMA}.email_outbox')[0][0] == 1
+    )
+
+    reset(conn, mailbox)
+    for number in range(2):
+        notify('send_notification', booking(number))
+    configure(stand_in, digest_enabled=False)
+    index.dispatch_email_outbox()
+    checks['turning the digest off flushes what was waiting'] = (
+        sorted(covered_clients(admin_letters(mailbox))) == [0, 1]
+        and query(conn, f'SELECT count(*) FROM {SCHEMA}.email_digest_items')[0][0] == 0
+    )
+    return checks
+
+
+def burst(conn, stand_in, bookings, digest_enabled):
+    '''Серия записей подряд и одна отправка очереди; возвращает (писем администратору, секунд на отправку)'''
+    configure(stand_in, digest_enabled=digest_enabled, window_minutes=1, max_bookings=10)
+    reset(conn, stand_in.mailbox)
+    for number in range(bookings):
+        notify('send_booking_emails', booking(number))
+    age_digest(conn, 2)
+    index.close_smtp_session()
+    started = time.perf_counter()
+    index.dispatch_email_outbox()
+    elapsed = time.perf_counter() - started
+    letters = admin_letters(stand_in.mailbox)
+    exact = sorted(covered_clients(letters)) == list(range(bookings)) and len(client_letters(stand_in.mailbox)) == bookings
+    return len(letters), elapsed, exact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bookings', type=int, default=50)
+    parser.add_argument('--smtp-delay-ms', type=int, default=20, help='задержка ответа на DATA (сетевая задержка реального сервера)')
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['EMAIL_PASSWORD'] = 'stand-in-password'
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    os.environ.pop('ADMIN_TOKEN_KEYS', None)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with local_smtp() as stand_in:
+            build_email_tables(conn, stand_in)
+            checks = check_behaviour(conn, stand_in)
+            for name, passed in checks.items():
+                print(f'{name}: {"ok" if passed else "FAIL"}')
+
+            stand_in.mailbox.data_delay = args.smtp_delay_ms / 1000
+            print(f'{"admin notices":>14} {"bookings":>9} {"admin letters":>14} {"dispatch s":>11}')
+            for digest_enabled in (False, True):
+                letters, elapsed, exact = burst(conn, stand_in, args.bookings, digest_enabled)
+                checks[f'every booking reaches the admin exactly once (digest {digest_enabled})'] = exact
+                print(f'{"digest" if digest_enabled else "per booking":>14} {args.bookings:>9} {letters:>14} {elapsed:>11.2f}')
+    finally:
+        conn.close()
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+'''
+Behaviour check and benchmark for the email outbox in backend/content (enqueue_emails / dispatch_email_outbox)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/email_outbox.py --messages 2000 --dispatchers 1 4
+Runs against a throwaway local database and a local aiosmtpd stand-in (benchmarks/smtp_stand_in.py) - never point it at production
+Covers claim (SKIP LOCKED leases), send, retry with backoff, and the optional inline dispatch (EMAIL_INLINE_DISPATCH_BATCH)
+Exits with status 1 if a message is lost or delivered twice, or retries and leases misbehave
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+import index  # noqa: E402
+from smtp_stand_in import local_smtp  # noqa: E402
+
+SCHEMA = 't_p89870318_access_bars_service'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'db_migrations')
+EMAIL_MIGRATIONS = ('V0007__create_email_settings.sql', 'V0045__create_email_outbox.sql', 'V0046__add_email_admin_digest.sql')
+ADMIN_TOKEN = 'email-outbox-benchmark'
+BOOKING = {
+    'client_name': 'Анна', 'client_phone': '+7 900 000-00-00', 'client_email': 'anna@example.test',
+    'service_name': 'Access Bars', 'appointment_date': '2026-10-20', 'appointment_time': '12:00', 'end_time': '13:00'
+}
+
+
+def run_migration(conn, filename):
+    with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as migration:
+        sql = migration.read()
+    with conn.cursor() as cur:
+        cur.execute(f'SET search_path TO {SCHEMA}')
+        cur.execute(sql)
+        cur.execute('RESET search_path')
+    conn.commit()
+
+
+def build_email_tables(conn, stand_in, migrations=EMAIL_MIGRATIONS):
+    '''Пересоздает email_settings, email_outbox и email_digest_items миграциями; настройки указывают на локальный SMTP'''
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+        cur.execute(f'DROP TABLE IF EXISTS {SCHEMA}.email_outbox, {SCHEMA}.email_settings, {SCHEMA}.email_digest_items')
+    conn.commit()
+    for filename in migrations:
+        run_migration(conn, filename)
+    settings = stand_in.settings()
+    with conn.cursor() as cur:
+        cur.execute(
+            f'UPDATE {SCHEMA}.email_settings SET smtp_host = %s, smtp_port = %s, sender_email = %s, admin_email = %s',
+            (settings['smtp_host'], settings['smtp_port'], settings['sender_email'], settings['admin_email'])
+        )
+    conn.commit()
+
+
+def notify(action, booking_data=BOOKING, headers=None):
+    return index.handler({
+        'httpMethod': 'POST', 'headers': headers or {},
+        'queryStringParameters': {'endpoint': 'notifications'},
+        'body': json.dumps({'action': action, 'booking_data': booking_data})
+    }, None)
+
+
+def query(conn, sql, params=None):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+def clear_outbox(conn):
+    with conn.cursor() as cur:
+        cur.execute(f'TRUNCATE {SCHEMA}.email_outbox')
+    conn.commit()
+
+
+def fast_forward(conn):
+    '''Сдвигает очередь так, будто задержка повтора или аренда уже истекла'''
+    with conn.cursor() as cur:
+        cur.execute(f"UPDATE {SCHEMA}.email_outbox SET next_attempt_at = CURRENT_TIMESTAMP - INTERVAL '1 second' WHERE status IN ('pending', 'sending')")
+    conn.commit()
+
+
+def enqueue_numbered(count, start=0):
+    index.enqueue_emails([
+        ('admin_booking', f'client{number}@example.test', f'Письмо {number}', f'Текст письма {number}')
+        for number in range(start, start + count)
+    ])
+
+
+def dispatch_until_empty():
+    '''Цикл одного диспетчера (отдельный процесс со своей SMTP-сессией), пока очередь не опустеет'''
+    index.close_smtp_session()
+    while index.dispatch_email_outbox()['claimed']:
+        pass
+    index.close_smtp_session()
+
+
+def run_dispatchers(count):
+    index.close_smtp_session()
+    context = multiprocessing.get_context('fork')
+    started = time.perf_counter()
+    processes = [context.Process(target=dispatch_until_empty) for _ in range(count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return time.perf_counter() - started
+
+
+def delivered_subjects(mailbox):
+    with mailbox.lock:
+        return [message['Subject'] for _, _, message in mailbox.messages]
+
+
+def counts(report):
+    return {key: report[key] for key in ('claimed', 'sent', 'retried', 'failed')}
+
+
+def check_behaviour(conn, stand_in):
+    mailbox = stand_in.mailbox
+    checks = {}
+    index.close_smtp_session()
+
+    # Развертывание с таймер-триггером (по умолчанию): запрос только ставит письма в очередь
+    mailbox.data_delay = 0.5
+    before = mailbox.snapshot()
+    started = time.perf_counter()
+    response = notify('send_booking_emails')
+    enqueue_ms = (time.perf_counter() - started) * 1000
+    statuses = query(conn, f'SELECT kind, status FROM {SCHEMA}.email_outbox ORDER BY id')
+    checks['booking request only enqueues (slow SMTP does not delay it)'] = (
+        response['statusCode'] == 200 and json.loads(response['body'])['queued'] == 2 and enqueue_ms < 250
+        and statuses == [('admin_booking', 'pending'), ('client_confirmation', 'pending')]
+        and mailbox.snapshot() == before
+    )
+    mailbox.data_delay = 0.0
+
+    report = index.dispatch_email_outbox()
+    after = mailbox.snapshot()
+    checks['dispatcher sends the pair over one session'] = (
+        counts(report) == {'claimed': 2, 'sent': 2, 'retried': 0, 'failed': 0}
+        and after['connections'] - before['connections'] == 1 and after['messages'] - before['messages'] == 2
+        and query(conn, f"SELECT count(*) FROM {SCHEMA}.email_outbox WHERE status = 'sent' AND sent_at IS NOT NULL")[0][0] == 2
+    )
+    checks['dispatch without admin token is refused'] = notify('dispatch_outbox')['statusCode'] == 401
+    checks['dispatch with admin token reports the batch'] = json.loads(
+        notify('dispatch_outbox', headers={'X-Admin-Token': ADMIN_TOKEN})['body']
+    ).get('claimed') == 0
+
+    clear_outbox(conn)
+    index.close_smtp_session()
+    stand_in.stop()
+    enqueue_numbered(3, start=100)
+    first = index.dispatch_email_outbox()
+    delays = query(conn, f'SELECT attempts, EXTRACT(EPOCH FROM next_attempt_at - CURRENT_TIMESTAMP) FROM {SCHEMA}.email_outbox')
+    second = index.dispatch_email_outbox()
+    fast_forward(conn)
+    index.dispatch_email_outbox()
+    doubled = query(conn, f'SELECT attempts, EXTRACT(EPOCH FROM next_attempt_at - CURRENT_TIMESTAMP), last_error FROM {SCHEMA}.email_outbox')
+    backoff = index.EMAIL_OUTBOX_BACKOFF_SECONDS
+    checks['unreachable server backs off the whole batch'] = (
+        counts(first) == {'claimed': 3, 'sent': 0, 'retried': 3, 'failed': 0} and second['claimed'] == 0
+        and all(attempts == 1 and backoff - 5 < delay <= backoff for attempts, delay in delays)
+    )
+    checks['backoff doubles with every attempt'] = all(
+        attempts == 2 and 2 * backoff - 5 < delay <= 2 * backoff and error for attempts, delay, error in doubled
+    )
+
+    stand_in.start()
+    fast_forward(conn)
+    index.dispatch_email_outbox()
+    checks['queued messages go out once the server is back'] = query(
+        conn, f'SELECT status, attempts FROM {SCHEMA}.email_outbox GROUP BY status, attempts'
+    ) == [('sent', 3)]
+
+    clear_outbox(conn)
+    index.close_smtp_session()
+    stand_in.stop()
+    index.EMAIL_OUTBOX_MAX_ATTEMPTS = 1
+    enqueue_numbered(1, start=200)
+    report = index.dispatch_email_outbox()
+    index.EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+    stand_in.start()
+    checks['last attempt ends as failed'] = (
+        report['failed'] == 1 and query(conn, f'SELECT status FROM {SCHEMA}.email_outbox') == [('failed',)]
+    )
+
+    clear_outbox(conn)
+    mailbox.fail_recipients.add('refused@example.test')
+    index.enqueue_emails([
+        ('admin_booking', 'client300@example.test', 'Письмо 300', 'x'),
+        ('admin_booking', 'refused@example.test', 'Письмо 301', 'x'),
+        ('admin_booking', 'client302@example.test', 'Письмо 302', 'x')
+    ])
+    before = mailbox.snapshot()
+    report = index.dispatch_email_outbox()
+    refused = query(conn, f"SELECT recipient, last_error FROM {SCHEMA}.email_outbox WHERE status = 'failed'")
+    checks['refused recipient fails alone, the batch goes on'] = (
+        counts(report) == {'claimed': 3, 'sent': 2, 'retried': 0, 'failed': 1}
+        and len(refused) == 1 and refused[0][0] == 'refused@example.test' and '550' in refused[0][1]
+        and mailbox.snapshot()['connections'] - before['connections'] <= 1
+    )
+
+    clear_outbox(conn)
+    enqueue_numbered(2, start=400)
+    with conn.cursor() as cur:
+        index.claim_outbox_batch(cur, 10)
+    conn.commit()
+    while_leased = index.dispatch_email_outbox()
+    fast_forward(conn)
+    after_lease = index.dispatch_email_outbox()
+    checks['leased messages are skipped, then taken over after a crash'] = (
+        while_leased['claimed'] == 0 and after_lease['sent'] == 2
+        and query(conn, f'SELECT DISTINCT status, attempts FROM {SCHEMA}.email_outbox') == [('sent', 2)]
+    )
+    # Запасной вариант без таймер-триггера: запрос сам отправляет только что поставленные им письма
+    index.EMAIL_INLINE_DISPATCH_BATCH = 10
+    clear_outbox(conn)
+    index.close_smtp_session()
+    before = mailbox.snapshot()
+    response = notify('send_booking_emails')
+    checks['without a timer the booking request delivers its own mail'] = (
+        response['statusCode'] == 200 and json.loads(response['body'])['queued'] == 2
+        and mailbox.snapshot()['messages'] - before['messages'] == 2
+        and query(conn, f'SELECT DISTINCT status, attempts FROM {SCHEMA}.email_outbox') == [('sent', 1)]
+    )
+
+    clear_outbox(conn)
+    index.close_smtp_session()
+    stand_in.stop()
+    response = notify('send_booking_emails')
+    stand_in.start()
+    delays = query(conn, f'SELECT status, attempts, EXTRACT(EPOCH FROM next_attempt_at - CURRENT_TIMESTAMP) FROM {SCHEMA}.email_outbox')
+    checks['inline dispatch failure keeps the request successful and the mail queued'] = (
+        response['statusCode'] == 200 and len(delays) == 2
+        and all(status == 'pending' and attempts == 1 and backoff - 5 < delay <= backoff for status, attempts, delay in delays)
+    )
+
+    clear_outbox(conn)
+    index.close_smtp_session()
+    enqueue_numbered(15, start=500)
+    response = notify('send_client_confirmation')
+    checks["inline dispatch sends only the request's own mail"] = (
+        response['statusCode'] == 200 and query(
+            conn, f'SELECT kind, status, count(*) FROM {SCHEMA}.email_outbox GROUP BY kind, status ORDER BY kind'
+        ) == [('admin_booking', 'pending', 15), ('client_confirmation', 'sent', 1)]
+    )
+    index.EMAIL_INLINE_DISPATCH_BATCH = 0
+    index.close_smtp_session()
+    return checks, enqueue_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--dispatchers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--smtp-delay-ms', type=int, default=20, help='задержка ответа на DATA (сетевая задержка реального сервера)')
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['EMAIL_PASSWORD'] = 'stand-in-password'
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    os.environ.pop('ADMIN_TOKEN_KEYS', None)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with local_smtp() as stand_in:
+            build_email_tables(conn, stand_in)
+            checks, enqueue_ms = check_behaviour(conn, stand_in)
+            for name, passed in checks.items():
+                print(f'{name}: {"ok" if passed else "FAIL"}')
+
+            settings = stand_in.settings()
+            stand_in.mailbox.data_delay = 0.5
+            started = time.perf_counter()
+            index.send_emails(settings, os.environ['EMAIL_PASSWORD'], [
+                index.build_email(settings, index.admin_booking_email(settings, BOOKING)),
+                index.build_email(settings, index.client_confirmation_email(settings, BOOKING))
+            ])
+            inline_ms = (time.perf_counter() - started) * 1000
+            stand_in.mailbox.data_delay = 0.0
+            index.close_smtp_session()
+            print(f'booking request with a 500 ms SMTP server: inline send {inline_ms:.0f} ms, enqueue {enqueue_ms:.1f} ms')
+
+            stand_in.mailbox.data_delay = args.smtp_delay_ms / 1000
+            print(f'{"dispatchers":>11} {"messages":>9} {"seconds":>8} {"msg/s":>8} {"duplicates":>11}')
+            for dispatchers in args.dispatchers:
+                clear_outbox(conn)
+                stand_in.mailbox.messages.clear()
+                enqueue_numbered(args.messages)
+                elapsed = run_dispatchers(dispatchers)
+                subjects = delivered_subjects(stand_in.mailbox)
+                duplicates = len(subjects) - len(set(subjects))
+                exact = (
+                    duplicates == 0 and set(subjects) == {f'Письмо {number}' for number in range(args.messages)}
+                    and query(conn, f'SELECT DISTINCT status, attempts FROM {SCHEMA}.email_outbox') == [('sent', 1)]
+                )
+                checks[f'{dispatchers} concurrent dispatchers deliver every message exactly once'] = exact
+                print(f'{dispatchers:>11} {len(subjects):>9} {elapsed:>8.2f} {len(subjects) / elapsed:>8.0f} {duplicates:>11}')
+                if not exact:
+                    print(f'{dispatchers} concurrent dispatchers deliver every message exactly once: FAIL')
+    finally:
+        conn.close()
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
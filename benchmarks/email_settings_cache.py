@@ -0,0 +1,178 @@
+'''
+Behaviour check and benchmark for the warm-instance email_settings cache in backend/content (get_email_settings)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/email_settings_cache.py --repeat 200
+Runs against a throwaway local database and a local aiosmtpd stand-in (benchmarks/smtp_stand_in.py) - never point it at production
+Exits with status 1 if the send path queries settings on a warm instance or a saved change is missed
+'''
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from email_outbox import SCHEMA, build_email_tables, clear_outbox, notify  # noqa: E402
+import index  # noqa: E402
+from smtp_stand_in import local_smtp  # noqa: E402
+
+ADMIN_TOKEN = 'email-settings-benchmark'
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    statements = []
+
+    def execute(self, query, vars=None):
+        CountingCursor.statements.append(' '.join(query.split()))
+        return super().execute(query, vars)
+
+
+def counting_connection():
+    '''Соединение функции с учетом выполненных запросов (подставляется вместо index.get_db_connection)'''
+    return psycopg2.connect(os.environ['DATABASE_URL'], cursor_factory=CountingCursor)
+
+
+def settings_queries():
+    return [statement for statement in CountingCursor.statements if 'email_settings' in statement]
+
+
+def measured(action):
+    CountingCursor.statements.clear()
+    result = action()
+    return result, settings_queries()
+
+
+def expire(check=False, ttl=False):
+    '''Состаривает кэш настроек, как будто прошло EMAIL_SETTINGS_CHECK_SECONDS или EMAIL_SETTINGS_TTL_SECONDS'''
+    loaded_at, checked_at, version, settings = index._email_settings
+    if check:
+        checked_at -= index.EMAIL_SETTINGS_CHECK_SECONDS
+    if ttl:
+        loaded_at -= index.EMAIL_SETTINGS_TTL_SECONDS
+    index._email_settings = (loaded_at, checked_at, version, settings)
+
+
+def save(settings):
+    return index.handler({
+        'httpMethod': 'POST', 'headers': {'X-Admin-Token': ADMIN_TOKEN},
+        'queryStringParameters': {'endpoint': 'notifications'},
+        'body': json.dumps({'action': 'save_email_settings', 'settings': settings})
+    }, None)
+
+
+def legacy_get_email_settings():
+    '''Прежний путь: новое соединение и чтение строки на каждый вызов'''
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT smtp_host, smtp_port, sender_email, admin_email, notifications_enabled FROM {SCHEMA}.email_settings ORDER BY id LIMIT 1')
+        return cursor.fetchone()
+    finally:
+        conn.close()
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def check_behaviour(conn, stand_in):
+    checks = {}
+    index._email_settings = None
+
+    first, queries = measured(index.get_email_settings)
+    checks['cold instance reads the row once'] = len(queries) == 1 and first['smtp_port'] == stand_in.port
+
+    response, queries = measured(lambda: notify('send_booking_emails'))
+    checks['warm send path makes no settings query'] = response['statusCode'] == 200 and queries == []
+    _, queries = measured(lambda: index.handler({'httpMethod': 'GET', 'queryStringParameters': {'endpoint': 'notifications'}}, None))
+    checks['warm settings GET makes no settings query'] = queries == []
+
+    expire(check=True)
+    _, queries = measured(index.get_email_settings)
+    _, repeated = measured(index.get_email_settings)
+    checks['version check reads only (id, updated_at) and restarts the window'] = (
+        len(queries) == 1 and queries[0].startswith('SELECT id, updated_at FROM') and repeated == []
+    )
+
+    changed = dict(stand_in.settings(), admin_email='new-admin@example.test')
+    response, queries = measured(lambda: save(changed))
+    after_save, reads = measured(index.get_email_settings)
+    checks['save refreshes the saving instance without a re-read'] = (
+        response['statusCode'] == 200 and after_save['admin_email'] == 'new-admin@example.test' and reads == []
+    )
+
+    # Другой инстанс сохранил настройки: этот узнает о них на ближайшей проверке версии
+    with conn.cursor() as cur:
+        cur.execute(f"UPDATE {SCHEMA}.email_settings SET admin_email = 'other-instance@example.test', updated_at = CURRENT_TIMESTAMP")
+    conn.commit()
+    stale = index.get_email_settings()
+    expire(check=True)
+    current, queries = measured(index.get_email_settings)
+    checks['change from another instance is picked up at the next check'] = (
+        stale['admin_email'] == 'new-admin@example.test' and current['admin_email'] == 'other-instance@example.test'
+        and len(queries) == 2
+    )
+
+    expire(ttl=True)
+    _, queries = measured(index.get_email_settings)
+    checks['expired TTL re-reads the whole row'] = len(queries) == 1 and 'smtp_host' in queries[0]
+
+    returned = index.get_email_settings()
+    returned['admin_email'] = 'mutated@example.test'
+    checks['callers get a copy of the cached settings'] = index.get_email_settings()['admin_email'] == 'other-instance@example.test'
+
+    save(stand_in.settings())
+    clear_outbox(conn)
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['EMAIL_PASSWORD'] = 'stand-in-password'
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    os.environ.pop('ADMIN_TOKEN_KEYS', None)
+    index.get_db_connection = counting_connection
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with local_smtp() as stand_in:
+            build_email_tables(conn, stand_in)
+            checks = check_behaviour(conn, stand_in)
+    finally:
+        conn.close()
+
+    for name, passed in checks.items():
+        print(f'{name}: {"ok" if passed else "FAIL"}')
+
+    scenarios = {
+        'legacy (connect + read)': legacy_get_email_settings,
+        'cache, TTL expired': lambda: (expire(ttl=True), index.get_email_settings()),
+        'cache, version check': lambda: (expire(check=True), index.get_email_settings()),
+        'cache, warm': index.get_email_settings,
+    }
+    print(f'{"get_email_settings":>24} {"ms":>8}')
+    for name, scenario in scenarios.items():
+        print(f'{name:>24} {measure(scenario, args.repeat):>8.3f}')
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
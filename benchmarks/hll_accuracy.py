@@ -0,0 +1,100 @@
+'''
+Accuracy check for backend/api/hll.py on synthetic visitor streams
+Usage: python benchmarks/hll_accuracy.py [--runs 5]
+Exits with status 1 if any estimate falls outside the error bound or the mean error shows a bias
+'''
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'api'))
+
+import hll  # noqa: E402
+
+# 5000-20000 - область, где прежняя оценка переключалась с линейного счета на сырую и смещалась на +2-3%
+CARDINALITIES = (10, 100, 1000, 5000, 10000, 20000, 100000, 500000)
+SIGMA_BOUND = 4
+BIAS_SIGMA_BOUND = 3
+
+
+def synthetic_ips(rng, count):
+    '''Генерирует count различных IPv4-адресов'''
+    return ['.'.join(str(octet) for octet in address.to_bytes(4, 'big')) for address in rng.sample(range(1 << 32), count)]
+
+
+def check_roundtrip(rng):
+    '''Сериализация сохраняет регистры в обоих форматах'''
+    for count in (5, 50000):
+        registers = hll.new_sketch()
+        for ip in synthetic_ips(rng, count):
+            hll.add(registers, ip)
+        if hll.deserialize(hll.serialize(registers)) != registers:
+            return False
+    return True
+
+
+def check_merge(rng):
+    '''Объединение дневных скетчей равно скетчу объединенного потока'''
+    days = [synthetic_ips(rng, 2000) + synthetic_ips(rng, 10)[:5] for _ in range(30)]
+    union = hll.new_sketch()
+    merged = hll.new_sketch()
+    for day in days:
+        daily = hll.new_sketch()
+        for ip in day:
+            hll.add(daily, ip)
+            hll.add(union, ip)
+        hll.merge(merged, hll.deserialize(hll.serialize(daily)))
+    return merged == union
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=20261018)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sigma = 1.04 / math.sqrt(1 << hll.PRECISION)
+    failed = False
+
+    print(f'precision={hll.PRECISION} registers={1 << hll.PRECISION} sigma={sigma:.2%} bound={SIGMA_BOUND} sigma')
+    print(f'{"cardinality":>12} {"mean err":>9} {"max err":>9} {"bytes":>6} {"add ns":>7}')
+    for cardinality in CARDINALITIES:
+        errors = []
+        add_seconds = 0.0
+        for _ in range(args.runs):
+            ips = synthetic_ips(rng, cardinality)
+            registers = hll.new_sketch()
+            started = time.perf_counter()
+            for ip in ips:
+                hll.add(registers, ip)
+            add_seconds += time.perf_counter() - started
+            errors.append((hll.estimate(registers) - cardinality) / cardinality)
+        add_ns = add_seconds / (args.runs * cardinality) * 1e9
+        worst = max(errors, key=abs)
+        size = len(hll.serialize(registers))
+        print(f'{cardinality:>12} {sum(errors) / len(errors):>9.2%} {worst:>9.2%} {size:>6} {add_ns:>7.0f}')
+        # На малых кардинальностях ошибку дают только совпадения хешей: одно совпадение - это 1 / cardinality
+        bound = max(SIGMA_BOUND * sigma, 2 / cardinality)
+        if abs(worst) > bound:
+            print(f'  FAIL: error {worst:.2%} exceeds {bound:.2%}')
+            failed = True
+        bias_bound = BIAS_SIGMA_BOUND * sigma / math.sqrt(args.runs)
+        if abs(sum(errors) / len(errors)) > bias_bound:
+            print(f'  FAIL: mean error exceeds {bias_bound:.2%} - the estimate is biased')
+            failed = True
+
+    for name, check in (('serialize roundtrip', check_roundtrip), ('merge equals union', check_merge)):
+        passed = check(rng)
+        print(f'{name}: {"ok" if passed else "FAIL"}')
+        failed = failed or not passed
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
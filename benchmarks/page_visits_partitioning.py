@@ -0,0 +1,92 @@
+'''
+Benchmark: page_visits as one heap table (V0001) vs monthly partitions (V0036, V0037)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/page_visits_partitioning.py --rows 2000000
+Drops and recreates page_visits - run only against a throwaway local database
+Both layouts are built from scratch with the same later migrations (rollups, dimension tables)
+'''
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'api'))
+
+from analytics_aggregation import SCHEMA, build_visits_schema  # noqa: E402
+import index  # noqa: E402
+from index import compute_visit_aggregates, insert_visits  # noqa: E402
+
+
+def index_size_bytes(cursor):
+    cursor.execute(f'''
+        SELECT COALESCE(SUM(pg_relation_size(indexrelid)), 0)
+        FROM pg_index
+        WHERE indrelid = '{SCHEMA}.page_visits'::regclass
+           OR indrelid IN (SELECT relid FROM pg_partition_tree('{SCHEMA}.page_visits'))
+    ''')
+    return cursor.fetchone()[0]
+
+
+def measure(conn, inserts, repeat):
+    # Справочники пересозданы, id из кэша прошлого прогона недействительны
+    index._referrer_ids.clear()
+    index._user_agent_ids.clear()
+    cursor = conn.cursor()
+
+    insert_ms = []
+    for number in range(inserts):
+        started = time.perf_counter()
+        insert_visits(cursor, conn, [(f'/bench-{number % 20}', '10.0.0.1', 'bench', '', None, datetime.utcnow())])
+        conn.commit()
+        insert_ms.append((time.perf_counter() - started) * 1000)
+
+    query_ms = []
+    for _ in range(repeat):
+        end_date = datetime.now()
+        started = time.perf_counter()
+        compute_visit_aggregates(cursor, end_date - timedelta(days=30), end_date, exact_unique=True)
+        query_ms.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        'insert_p50_ms': statistics.median(insert_ms),
+        'insert_p95_ms': statistics.quantiles(insert_ms, n=20)[-1],
+        'index_mb': index_size_bytes(cursor) / 1024 / 1024,
+        'query_30d_ms': statistics.median(query_ms)
+    }
+    cursor.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--inserts', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+
+    conn = psycopg2.connect(database_url)
+    try:
+        build_visits_schema(conn, args.rows, partitioned=False)
+        before = measure(conn, args.inserts, args.repeat)
+
+        print('Rebuilding with V0036 (monthly partitions)...')
+        build_visits_schema(conn, args.rows, partitioned=True)
+        after = measure(conn, args.inserts, args.repeat)
+    finally:
+        conn.close()
+
+    print(f'{"metric":>14} {"heap":>10} {"partitioned":>12}')
+    for metric in before:
+        print(f'{metric:>14} {before[metric]:>10.2f} {after[metric]:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
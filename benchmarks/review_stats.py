@@ -0,0 +1,158 @@
+'''
+Benchmark and consistency check for review_rating_stats (?endpoint=review_stats)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/review_stats.py --rows 10000 100000 --operations 500
+Runs against a throwaway local database - never point it at production
+Applies random POST/PUT/PATCH/DELETE requests through the content handler and exits with status 1
+if the summary table no longer matches a GROUP BY over reviews
+'''
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from reviews_pagination import build_reviews  # noqa: E402
+import index  # noqa: E402
+
+ADMIN_TOKEN = 'review-stats-benchmark'
+SERVICES = ('Access Bars', 'Массаж', 'Целительство', 'Обучение', 'Новая практика')
+STATUSES = ('pending', 'approved', 'rejected')
+
+
+def call(method, params=None, body=None):
+    event = {
+        'httpMethod': method,
+        'headers': {'X-Admin-Token': ADMIN_TOKEN},
+        'queryStringParameters': dict(endpoint='reviews', **(params or {})),
+        'body': json.dumps(body or {})
+    }
+    return index.handler(event, None)
+
+
+def random_operation(rng, review_ids):
+    '''Один случайный запрос на запись; иногда по несуществующему id'''
+    review_id = rng.choice(review_ids) if review_ids and rng.random() < 0.95 else 10 ** 9
+    kind = rng.choice(('post', 'put', 'put', 'patch', 'patch_text', 'delete'))
+    if kind == 'post':
+        response = call('POST', body={'name': 'Клиент', 'service': rng.choice(SERVICES), 'rating': rng.randint(1, 5), 'text': 'Новый отзыв'})
+        if response['statusCode'] == 201:
+            review_ids.append(json.loads(response['body'])['review']['id'])
+    elif kind == 'put':
+        call('PUT', body={'id': review_id, 'status': rng.choice(STATUSES)})
+    elif kind == 'patch':
+        call('PATCH', body={'id': review_id, 'name': 'Клиент', 'service': rng.choice(SERVICES), 'rating': rng.randint(1, 5), 'text': 'Исправленный отзыв'})
+    elif kind == 'patch_text':
+        call('PATCH', body={'id': review_id, 'text': 'Исправленный текст'})
+    else:
+        call('DELETE', params={'id': str(review_id)})
+        if review_id in review_ids:
+            review_ids.remove(review_id)
+
+
+def stats_match(conn):
+    with conn.cursor() as cur:
+        cur.execute('''
+            SELECT service_id, status, rating, review_count FROM review_rating_stats WHERE review_count <> 0
+            EXCEPT
+            SELECT service_id, status, rating, COUNT(*) FROM reviews GROUP BY service_id, status, rating
+        ''')
+        extra = cur.fetchall()
+        cur.execute('''
+            SELECT service_id, status, rating, COUNT(*) FROM reviews GROUP BY service_id, status, rating
+            EXCEPT
+            SELECT service_id, status, rating, review_count FROM review_rating_stats
+        ''')
+        missing = cur.fetchall()
+    conn.commit()
+    return not extra and not missing
+
+
+def service_statuses_match(conn, stats):
+    '''Счетчики статусов по услугам из ответа review_stats совпадают с GROUP BY по reviews'''
+    with conn.cursor() as cur:
+        cur.execute('''
+            SELECT review_services.name, reviews.status, COUNT(*) FROM reviews
+            JOIN review_services ON review_services.id = reviews.service_id
+            GROUP BY review_services.name, reviews.status
+        ''')
+        expected = {(service, status): count for service, status, count in cur.fetchall()}
+    conn.commit()
+    reported = {
+        (item['service'], status): count
+        for item in stats['services'] for status, count in item['statuses'].items() if count
+    }
+    return reported == expected
+
+
+def legacy_summary(conn):
+    '''Прежний способ: скачать все одобренные отзывы и посчитать среднее на клиенте'''
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, name, service, rating, text, status, created_at FROM reviews WHERE status = 'approved' ORDER BY created_at DESC")
+        rows = cur.fetchall()
+    conn.commit()
+    return sum(row[3] for row in rows) / len(rows) if rows else None
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--operations', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=16)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    os.environ.pop('ADMIN_TOKEN_KEYS', None)
+
+    rng = random.Random(args.seed)
+    conn = psycopg2.connect(database_url)
+    consistent = True
+    try:
+        print(f'{"rows":>9} {"legacy ms":>10} {"stats ms":>9} {"consistent":>11}')
+        for rows in args.rows:
+            build_reviews(conn, rows)
+            with conn.cursor() as cur:
+                cur.execute('SELECT id FROM reviews')
+                review_ids = [row[0] for row in cur.fetchall()]
+            conn.commit()
+
+            for _ in range(args.operations):
+                random_operation(rng, review_ids)
+            matched = stats_match(conn)
+
+            stats = json.loads(index.handler({'httpMethod': 'GET', 'queryStringParameters': {'endpoint': 'review_stats'}}, None)['body'])
+            matched = matched and service_statuses_match(conn, stats)
+            legacy_average = legacy_summary(conn)
+            consistent = consistent and matched and abs(stats['approved']['average_rating'] - legacy_average) < 0.005
+
+            legacy_ms = measure(lambda: legacy_summary(conn), args.repeat)
+            stats_ms = measure(lambda: index.handler({'httpMethod': 'GET', 'queryStringParameters': {'endpoint': 'review_stats'}}, None), args.repeat)
+            print(f'{rows:>9} {legacy_ms:>10.1f} {stats_ms:>9.2f} {"ok" if matched else "FAIL":>11}')
+    finally:
+        conn.close()
+
+    sys.exit(0 if consistent else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Benchmark: moderating a backlog with single PUT/DELETE requests vs one bulk request
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/reviews_bulk_moderation.py --rows 50000 --batch 500
+Runs against a throwaway local database - never point it at production
+Exits with status 1 if both ways do not leave the same reviews, statuses and rating stats
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from review_stats import ADMIN_TOKEN, call, stats_match  # noqa: E402
+from reviews_pagination import build_reviews  # noqa: E402
+
+MISSING_IDS = [10 ** 9 + offset for offset in range(5)]
+
+
+def pending_ids(conn, batch):
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM reviews WHERE status = 'pending' ORDER BY id LIMIT %s", (batch,))
+        ids = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return ids
+
+
+def review_state(conn):
+    with conn.cursor() as cur:
+        cur.execute('SELECT id, status FROM reviews ORDER BY id')
+        state = cur.fetchall()
+    conn.commit()
+    return state
+
+
+def run(conn, rows, batch, single, delete):
+    '''Пересоздает таблицу, модерирует batch отзывов на модерации и возвращает (секунды, итоговое состояние, ответ)'''
+    build_reviews(conn, rows)
+    ids = pending_ids(conn, batch)
+    response = None
+
+    started = time.perf_counter()
+    if single:
+        for review_id in ids:
+            if delete:
+                call('DELETE', params={'id': str(review_id)})
+            else:
+                call('PUT', body={'id': review_id, 'status': 'approved'})
+    elif delete:
+        response = call('DELETE', params={'ids': ','.join(str(review_id) for review_id in ids + MISSING_IDS)})
+    else:
+        response = call('PUT', body={'ids': ids + MISSING_IDS, 'status': 'approved'})
+    elapsed = time.perf_counter() - started
+
+    return elapsed, review_state(conn), stats_match(conn), json.loads(response['body']) if response else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    os.environ.pop('ADMIN_TOKEN_KEYS', None)
+
+    conn = psycopg2.connect(database_url)
+    passed = True
+    try:
+        print(f'{"action":>8} {"single ms":>10} {"bulk ms":>8} {"speedup":>8} {"same result":>12}')
+        for delete in (False, True):
+            single_seconds, single_state, single_stats, _ = run(conn, args.rows, args.batch, True, delete)
+            bulk_seconds, bulk_state, bulk_stats, response = run(conn, args.rows, args.batch, False, delete)
+            expected_counts = {'deleted' if delete else 'updated': args.batch, 'not_found': len(MISSING_IDS)}
+            same = single_state == bulk_state and single_stats and bulk_stats and response['counts'] == expected_counts
+            passed = passed and same
+            print(f'{"delete" if delete else "approve":>8} {single_seconds * 1000:>10.1f} {bulk_seconds * 1000:>8.1f} '
+                  f'{single_seconds / bulk_seconds:>7.1f}x {"ok" if same else "FAIL":>12}')
+    finally:
+        conn.close()
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
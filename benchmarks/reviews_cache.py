@@ -0,0 +1,129 @@
+'''
+Benchmark and behaviour check for the versioned approved-reviews cache (ETag / If-None-Match / warm-instance pages)
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/reviews_cache.py --rows 100000
+Runs against a throwaway local database - never point it at production
+Exits with status 1 if a stale page is served after moderation or conditional requests misbehave
+'''
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from reviews_pagination import build_reviews  # noqa: E402
+import index  # noqa: E402
+
+ADMIN_TOKEN = 'reviews-cache-benchmark'
+PAGE = {'endpoint': 'reviews', 'status': 'approved', 'service': 'массаж', 'limit': '20'}
+
+
+def get(params=PAGE, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return index.handler({'httpMethod': 'GET', 'headers': headers, 'queryStringParameters': dict(params)}, None)
+
+
+def reset_instance():
+    index._reviews_cache.clear()
+    index._reviews_version = None
+
+
+def check_behaviour(conn):
+    checks = {}
+    reset_instance()
+
+    first = get()
+    second = get()
+    checks['miss, then hit with identical body'] = (
+        first['headers']['X-Reviews-Cache'] == 'MISS' and second['headers']['X-Reviews-Cache'] == 'HIT'
+        and first['body'] == second['body']
+    )
+    checks['If-None-Match answers 304 without body'] = get(etag=first['headers']['ETag'])['statusCode'] == 304
+    checks['weak and listed validators match'] = get(etag=f'"other", W/{first["headers"]["ETag"]}')['statusCode'] == 304
+    checks['other filters get other validators'] = get(dict(PAGE, service='обучение'))['headers']['ETag'] != first['headers']['ETag']
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM reviews WHERE status = 'pending' AND service = 'Массаж' ORDER BY created_at DESC, id DESC LIMIT 1")
+        pending_id = cur.fetchone()[0]
+    conn.commit()
+    index.handler({
+        'httpMethod': 'PUT', 'headers': {'X-Admin-Token': ADMIN_TOKEN},
+        'queryStringParameters': {'endpoint': 'reviews'}, 'body': json.dumps({'id': pending_id, 'status': 'approved'})
+    }, None)
+    after_put = get(etag=first['headers']['ETag'])
+    checks['moderation in this instance is visible at once'] = (
+        after_put['statusCode'] == 200 and pending_id in [review['id'] for review in json.loads(after_put['body'])['reviews']]
+    )
+
+    # Другой инстанс: версия меняется в базе, этот инстанс замечает ее после REVIEWS_VERSION_CHECK_SECONDS
+    with conn.cursor() as cur:
+        cur.execute('UPDATE reviews_version SET version = version + 1 WHERE id = 1')
+    conn.commit()
+    stale = get(etag=after_put['headers']['ETag'])
+    index._reviews_version = (index._reviews_version[0] - index.REVIEWS_VERSION_CHECK_SECONDS, index._reviews_version[1])
+    fresh = get(etag=after_put['headers']['ETag'])
+    checks['other instances are picked up after the check window'] = stale['statusCode'] == 304 and fresh['statusCode'] == 200
+
+    checks['non-approved listings bypass the cache'] = 'ETag' not in get(dict(PAGE, status='pending'))['headers']
+    return checks
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    os.environ.pop('ADMIN_TOKEN_KEYS', None)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        build_reviews(conn, args.rows)
+        checks = check_behaviour(conn)
+    finally:
+        conn.close()
+
+    for name, passed in checks.items():
+        print(f'{name}: {"ok" if passed else "FAIL"}')
+
+    etag = get()['headers']['ETag']
+
+    def version_expired():
+        index._reviews_version = (index._reviews_version[0] - index.REVIEWS_VERSION_CHECK_SECONDS, index._reviews_version[1])
+
+    scenarios = {
+        'miss (query + serialize)': lambda: (reset_instance(), get()),
+        'hit, version re-read': lambda: (version_expired(), get()),
+        'hit, version fresh': lambda: get(),
+        '304, version re-read': lambda: (version_expired(), get(etag=etag)),
+        '304, version fresh': lambda: get(etag=etag),
+    }
+    print(f'{"scenario":>26} {"ms":>8}')
+    for name, scenario in scenarios.items():
+        get()
+        print(f'{name:>26} {measure(scenario, args.repeat):>8.3f}')
+
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+'''
+EXPLAIN check: the reviews listing filters (status, service, text search, cursor) are served by indexes
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/reviews_index_usage.py --rows 200000
+Runs against a throwaway local database - never point it at production
+Exits with status 1 if a query scans reviews sequentially, reads more than ROWS_READ_PER_PAGE_ROW rows
+per returned row, misses the index expected for a selective filter or returns wrong rows
+'''
+
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+from reviews_pagination import build_reviews  # noqa: E402
+import index  # noqa: E402
+
+LEGACY_SERVICE_QUERY = """
+    SELECT id, name, service, rating, text, status, created_at FROM reviews
+    WHERE status = 'approved' AND LOWER(service) LIKE '%%массаж%%'
+    ORDER BY created_at DESC
+"""
+
+ROWS_READ_PER_PAGE_ROW = 25
+
+# (название, параметры выдачи, индекс для выборочного фильтра или None, условие на строки для сверки).
+# Для частых значений планировщик вправе идти по idx_reviews_created_at с фильтром - страница все равно
+# читает ограниченное число строк; редкие значения должны читаться своим индексом
+CASES = (
+    ('status only', {}, None, "status = 'approved'"),
+    ('common service', {'service': 'массаж'}, None,
+     "status = 'approved' AND LOWER(service) LIKE '%%массаж%%'"),
+    ('common service, cursor', {'service': 'обучение', 'after': 0.8}, None,
+     "status = 'approved' AND LOWER(service) LIKE '%%обучение%%'"),
+    ('rare service', {'service': 'диагност'}, 'idx_reviews_status_service_created_at',
+     "status = 'approved' AND LOWER(service) LIKE '%%диагност%%'"),
+    ('rare service, cursor', {'service': 'диагност', 'after': 0.5}, 'idx_reviews_status_service_created_at',
+     "status = 'approved' AND LOWER(service) LIKE '%%диагност%%'"),
+    ('text search', {'search': 'рекомендую подруге'}, 'idx_reviews_text_search',
+     "status = 'approved' AND text LIKE '%%Рекомендую подругам%%'"),
+)
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def cursor_for(cur, where, depth):
+    cur.execute(f'SELECT count(*) FROM reviews WHERE {where}')
+    offset = int(cur.fetchone()[0] * depth)
+    cur.execute(f'SELECT created_at, id FROM reviews WHERE {where} ORDER BY created_at DESC, id DESC OFFSET %s LIMIT 1', (offset,))
+    return cur.fetchone()
+
+
+def check_case(conn, name, options, expected_index, where, limit):
+    cur = conn.cursor()
+    after = cursor_for(cur, where, options['after']) if 'after' in options else None
+    query, params = index.review_list_query(
+        cur, ['id'], 'approved', options.get('service'), options.get('search', ''), after, limit
+    )
+
+    cur.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + query, params)
+    plan = cur.fetchone()[0][0]
+    nodes = [node for node in plan_nodes(plan['Plan']) if node.get('Relation Name') == 'reviews' or 'Index Name' in node]
+    seq_scan = any(node['Node Type'] == 'Seq Scan' for node in nodes)
+    indexes = {node['Index Name'] for node in nodes if 'Index Name' in node}
+    used_index = expected_index in indexes if expected_index else bool(indexes)
+    rows_read = sum(
+        node['Actual Rows'] * node['Actual Loops'] + node.get('Rows Removed by Filter', 0)
+        for node in nodes if node.get('Relation Name') == 'reviews'
+    )
+
+    started = time.perf_counter()
+    cur.execute(query, params)
+    ids = [row[0] for row in cur.fetchall()][:limit]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    keyset = ' AND (created_at, id) < (%s, %s)' if after else ''
+    cur.execute(f'SELECT id FROM reviews WHERE {where}{keyset} ORDER BY created_at DESC, id DESC LIMIT %s', (*(after or ()), limit))
+    expected_ids = [row[0] for row in cur.fetchall()]
+    conn.commit()
+
+    passed = (
+        used_index and not seq_scan and rows_read <= ROWS_READ_PER_PAGE_ROW * (limit + 1)
+        and ids == expected_ids and bool(ids)
+    )
+    plan_summary = ', '.join(sorted(indexes)) or 'Seq Scan'
+    print(f'{name:>22} {elapsed_ms:>8.2f} {rows_read:>9} {plan_summary:>44} {"ok" if passed else "FAIL"}')
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+
+    conn = psycopg2.connect(database_url)
+    try:
+        build_reviews(conn, args.rows)
+
+        cur = conn.cursor()
+        started = time.perf_counter()
+        cur.execute(LEGACY_SERVICE_QUERY)
+        cur.fetchall()
+        print(f'legacy LOWER(service) LIKE, full listing: {(time.perf_counter() - started) * 1000:.1f} ms')
+        conn.commit()
+
+        print(f'{"case":>22} {"ms":>8} {"rows read":>9} {"indexes":>44} {"check":>6}')
+        results = [check_case(conn, name, options, expected_index, where, args.limit) for name, options, expected_index, where in CASES]
+    finally:
+        conn.close()
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+'''
+Benchmark: keyset pages of the public reviews listing vs the legacy unbounded query
+Usage: BENCH_DATABASE_URL=postgresql://localhost/bench python benchmarks/reviews_pagination.py --rows 10000 100000 1000000
+Runs against a throwaway local database - never point it at production
+Exits with status 1 if walking all pages does not return every approved review exactly once
+'''
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+import index  # noqa: E402
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'db_migrations')
+REVIEW_MIGRATIONS = (
+    'V0010__create_reviews_table.sql',
+    'V0041__add_reviews_keyset_indexes.sql',
+    'V0042__create_review_services_and_text_search.sql',
+    'V0043__create_review_rating_stats.sql',
+    'V0044__create_reviews_version.sql'
+)
+PAGE_DEPTHS = (0.0, 0.5, 0.99)
+LEGACY_QUERY = "SELECT id, name, service, rating, text, status, created_at FROM reviews WHERE status = 'approved' ORDER BY created_at DESC"
+
+
+def build_reviews(conn, rows):
+    '''
+    Пересоздает reviews миграциями; на одну минуту приходится по три отзыва, чтобы проверить равные created_at.
+    Редкие услуга (каждый 101-й отзыв) и фраза (каждый 997-й) нужны для проверки выборочных индексов
+    '''
+    with conn.cursor() as cur:
+        cur.execute('DROP TABLE IF EXISTS review_rating_stats, reviews, review_services, reviews_version')
+        for filename in REVIEW_MIGRATIONS[:1]:
+            with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as migration:
+                cur.execute(migration.read())
+        cur.execute('''
+            INSERT INTO reviews (name, service, rating, text, status, created_at)
+            SELECT 'Клиент ' || g,
+                   CASE WHEN g %% 101 = 0 THEN 'Диагностика'
+                        ELSE (ARRAY['Access Bars', 'Массаж', 'Целительство', 'Обучение'])[1 + g %% 4] END,
+                   1 + g %% 5,
+                   (ARRAY[
+                       'Спокойный сеанс, ушла тревога.', 'Массаж снял напряжение в спине.',
+                       'Обучение помогло понять себя.', 'Удивительная энергия и забота.',
+                       'Прошла головная боль после процедуры.', 'Уютно и очень бережно.', 'Стало легче дышать.'
+                   ])[1 + g %% 7]
+                   || CASE WHEN g %% 997 = 0 THEN ' Рекомендую подругам!' ELSE '' END
+                   || repeat(' Отзыв о сеансе.', g %% 20),
+                   (ARRAY['approved', 'approved', 'approved', 'pending', 'rejected'])[1 + g %% 5],
+                   NOW() - (g / 3) * INTERVAL '1 minute'
+            FROM generate_series(1, %s) AS g
+        ''', (rows,))
+        for filename in REVIEW_MIGRATIONS[1:]:
+            with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as migration:
+                cur.execute(migration.read())
+        cur.execute('ANALYZE reviews')
+    conn.commit()
+
+
+def fetch_page(params):
+    response = index.handler({'httpMethod': 'GET', 'queryStringParameters': dict(endpoint='reviews', **params)}, None)
+    if response['statusCode'] != 200:
+        raise RuntimeError(response['body'])
+    return json.loads(response['body'])
+
+
+def cursor_at_depth(conn, depth):
+    '''Курсор, с которого начинается страница на заданной доле выдачи (0 - первая страница)'''
+    if depth == 0:
+        return None
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM reviews WHERE status = 'approved'")
+        offset = int(cur.fetchone()[0] * depth)
+        cur.execute("""
+            SELECT created_at, id FROM reviews WHERE status = 'approved'
+            ORDER BY created_at DESC, id DESC OFFSET %s LIMIT 1
+        """, (offset,))
+        row = cur.fetchone()
+    conn.commit()
+    return index.encode_review_cursor(*row)
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def walk_all_pages(conn):
+    seen = []
+    params = {'limit': str(index.REVIEWS_PAGE_MAX_LIMIT), 'fields': 'id'}
+    while True:
+        page = fetch_page(params)
+        seen.extend(review['id'] for review in page['reviews'])
+        if not page['next_cursor']:
+            break
+        params['cursor'] = page['next_cursor']
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM reviews WHERE status = 'approved' ORDER BY created_at DESC, id DESC")
+        expected = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return seen == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        sys.exit('BENCH_DATABASE_URL is required (local throwaway database)')
+    os.environ['DATABASE_URL'] = database_url
+
+    conn = psycopg2.connect(database_url)
+    complete = True
+    try:
+        print(f'{"rows":>9} {"legacy ms":>10} ' + ' '.join(f'{"page@" + format(depth, ".0%"):>10}' for depth in PAGE_DEPTHS))
+        for rows in args.rows:
+            build_reviews(conn, rows)
+            if rows == min(args.rows):
+                complete = walk_all_pages(conn)
+
+            cur = conn.cursor()
+            legacy_ms = measure(lambda: (cur.execute(LEGACY_QUERY), cur.fetchall()), max(args.repeat // 4, 1))
+            conn.commit()
+
+            page_ms = []
+            for depth in PAGE_DEPTHS:
+                cursor = cursor_at_depth(conn, depth)
+                params = {'cursor': cursor} if cursor else {}
+                page_ms.append(measure(lambda: fetch_page(params), args.repeat))
+
+            print(f'{rows:>9} {legacy_ms:>10.1f} ' + ' '.join(f'{ms:>10.2f}' for ms in page_ms))
+    finally:
+        conn.close()
+
+    print(f'all pages walked without gaps or duplicates: {"ok" if complete else "FAIL"}')
+    sys.exit(0 if complete else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+Equivalence check and benchmark for the NumPy minute-bitmap engine in backend/schedule/slots.py (available_slots)
+Usage: python benchmarks/slot_bitmap.py [--horizons 200] [--repeat 20]
+Compares the bitmap engine against the pure-Python sweep (calculate_slots per day and duration); requires numpy
+Exits with status 1 on any difference
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as day_time, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'schedule'))
+
+import slots  # noqa: E402
+from slot_engine import clock_time  # noqa: E402
+
+FIRST_DAY = date(2026, 10, 20)
+
+
+def random_day(rng, day, bookings):
+    '''Рабочий день со случайными часами и bookings записями (в том числе пересекающимися и до полуночи)'''
+    start = rng.randrange(0, 12 * 60)
+    end = min(start + rng.randrange(60, 14 * 60), 23 * 60 + 59)
+    records = []
+    for number in range(bookings):
+        booking_start = rng.randrange(start, end)
+        booking_end = min(booking_start + rng.choice((30, 45, 60, 90, 120)), 23 * 60 + 59)
+        records.append({'id': number, 'start_time': clock_time(booking_start), 'end_time': clock_time(max(booking_end, booking_start + 1))})
+    return {'date': day, 'start_time': day_time(start // 60, start % 60), 'end_time': day_time(end // 60, end % 60), 'bookings': records}
+
+
+def random_horizon(rng, days):
+    horizon = [random_day(rng, FIRST_DAY + timedelta(days=offset), rng.choice((0, 2, 5, 10))) for offset in range(days)]
+    durations = rng.sample((15, 30, 45, 60, 90, 120, 180), rng.randrange(1, 5))
+    settings = (rng.choice((0, 10, 15, 30)), rng.choice((5, 10, 15, 30, 60)))
+    now = datetime.combine(FIRST_DAY, day_time()) + timedelta(seconds=rng.randrange(-86400, 86400 * 3), microseconds=rng.randrange(10 ** 6))
+    return horizon, durations, settings, now
+
+
+def check_equivalence(horizons, seed):
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(horizons):
+        days, durations, (break_minutes, step), now = random_horizon(rng, rng.choice((1, 7, 30)))
+        sweep = slots.available_slots(days, durations, break_minutes, step, clock=lambda: now, bitmap=False)
+        bitmap = slots.available_slots(days, durations, break_minutes, step, clock=lambda: now, bitmap=True)
+        mismatches += sweep != bitmap
+    return mismatches
+
+
+def measure(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--horizons', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=25)
+    args = parser.parse_args()
+
+    if slots.numpy is None:
+        sys.exit('numpy is not installed: available_slots falls back to calculate_slots, nothing to compare')
+
+    mismatches = check_equivalence(args.horizons, args.seed)
+    print(f'{args.horizons} random horizons give the same slots: {"ok" if not mismatches else f"FAIL ({mismatches})"}')
+
+    rng = random.Random(args.seed)
+    morning = lambda: datetime.combine(FIRST_DAY, day_time(7))  # noqa: E731
+    print(f'{"days":>5} {"durations":>10} {"sweep ms":>9} {"bitmap ms":>10} {"speedup":>8}')
+    for days in (7, 30, 90):
+        horizon = [random_day(rng, FIRST_DAY + timedelta(days=offset), 8) for offset in range(days)]
+        for durations in ((60,), (60, 90), (30, 45, 60, 90, 120, 180)):
+            sweep = measure(lambda: slots.available_slots(horizon, durations, 30, 15, clock=morning, bitmap=False), args.repeat)
+            bitmap = measure(lambda: slots.available_slots(horizon, durations, 30, 15, clock=morning, bitmap=True), args.repeat)
+            print(f'{days:>5} {len(durations):>10} {sweep:>9.2f} {bitmap:>10.2f} {sweep / bitmap:>7.1f}x')
+
+    sys.exit(0 if not mismatches else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+'''
+Equivalence check and micro-benchmark for the slot engine in backend/schedule/slots.py (calculate_slots)
+Usage: python benchmarks/slot_engine.py [--cases 20000] [--repeat 50]
+Compares against the previous datetime-stepping implementation on random days; exits with status 1 on any difference
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as day_time, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'schedule'))
+
+import slots  # noqa: E402
+
+DAY = date(2026, 10, 20)
+
+
+def legacy_calculate_slots(day_schedule, service_duration_minutes, break_duration_minutes=30, time_slot_interval_minutes=30, clock=datetime.now):
+    '''Прежний calculate_slots из backend/schedule/index.py: datetime.now() заменен на clock(), отладочный вывод убран'''
+    result = []
+    date = day_schedule['date']
+    start_time = datetime.combine(date, day_schedule['start_time'])
+    end_time = datetime.combine(date, day_schedule['end_time'])
+
+    blocked_intervals = []
+    if day_schedule['bookings']:
+        for booking in day_schedule['bookings']:
+            if booking and booking['start_time'] and booking['end_time']:
+                start_time_obj = datetime.strptime(booking['start_time'], '%H:%M:%S').time()
+                end_time_obj = datetime.strptime(booking['end_time'], '%H:%M:%S').time()
+                booking_start = datetime.combine(date, start_time_obj)
+                booking_end = datetime.combine(date, end_time_obj)
+                extended_booking_end = booking_end + timedelta(minutes=break_duration_minutes)
+                blocked_intervals.append((booking_start, extended_booking_end))
+
+    blocked_intervals = slots.merge_overlapping_intervals(blocked_intervals)
+
+    current_time = start_time
+    slot_duration = timedelta(minutes=service_duration_minutes)
+    step = timedelta(minutes=time_slot_interval_minutes)
+    extended_end_time = end_time + timedelta(minutes=30)
+
+    while current_time + slot_duration <= extended_end_time:
+        slot_end = current_time + slot_duration
+        slot_available = True
+        for blocked_start, blocked_end in blocked_intervals:
+            if not (slot_end <= blocked_start or current_time >= blocked_end):
+                slot_available = False
+                break
+        if slot_available:
+            our_session_end_with_break = slot_end + timedelta(minutes=break_duration_minutes)
+            for blocked_start, blocked_end in blocked_intervals:
+                if blocked_start < our_session_end_with_break and blocked_start >= slot_end:
+                    slot_available = False
+                    break
+        now = clock()
+        if current_time < now:
+            slot_available = False
+        if slot_available:
+            result.append(current_time.strftime('%H:%M'))
+        current_time += step
+
+    return result
+
+
+def clock_time(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}:00'
+
+
+def random_case(rng):
+    '''Случайный рабочий день: часы работы, записи (в том числе пересекающиеся и отмененные), настройки и момент запроса'''
+    start = rng.randrange(0, 14 * 60)
+    end = min(start + rng.randrange(30, 14 * 60), 23 * 60 + 59)
+    bookings = []
+    for number in range(rng.choice((0, 1, 3, 8, 20))):
+        booking_start = rng.randrange(max(start - 60, 0), end)
+        booking_end = min(booking_start + rng.choice((15, 30, 45, 60, 90, 120, 240)), 23 * 60 + 59)
+        bookings.append({'id': number, 'start_time': clock_time(booking_start), 'end_time': clock_time(booking_end), 'status': 'confirmed'})
+    if rng.random() < 0.1:
+        bookings.append(None)
+    day = {
+        'date': DAY, 'start_time': day_time(start // 60, start % 60), 'end_time': day_time(end // 60, end % 60),
+        'bookings': bookings
+    }
+    now = datetime.combine(DAY, day_time()) + timedelta(seconds=rng.randrange(-86400, 2 * 86400), microseconds=rng.choice((0, rng.randrange(10 ** 6))))
+    if rng.random() < 0.2:
+        # Ровно на границе шага - слот, начинающийся в этот момент, еще доступен
+        now = datetime.combine(DAY, day_time()) + timedelta(minutes=rng.randrange(start, end + 1))
+    settings = (rng.choice((15, 30, 45, 60, 90, 120)), rng.choice((0, 10, 15, 30)), rng.choice((5, 10, 15, 20, 30, 60)))
+    return day, settings, now
+
+
+def check_equivalence(cases, seed):
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(cases):
+        day, (duration, break_minutes, step), now = random_case(rng)
+        expected = legacy_calculate_slots(day, duration, break_minutes, step, clock=lambda: now)
+        actual = slots.calculate_slots(day, duration, break_minutes, step, clock=lambda: now)
+        if actual != expected:
+            mismatches.append((day, duration, break_minutes, step, now, expected, actual))
+    return mismatches
+
+
+def busy_day(bookings):
+    '''День 08:00-22:00 с bookings записями по 30 минут, равномерно разнесенными по дню'''
+    gap = 14 * 60 // max(bookings, 1)
+    return {
+        'date': DAY, 'start_time': day_time(8), 'end_time': day_time(22),
+        'bookings': [{'start_time': clock_time(8 * 60 + i * gap), 'end_time': clock_time(8 * 60 + i * gap + 30)} for i in range(bookings)]
+    }
+
+
+def measure(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cases', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=24)
+    args = parser.parse_args()
+
+    mismatches = check_equivalence(args.cases, args.seed)
+    print(f'{args.cases} random days give the same slots: {"ok" if not mismatches else "FAIL"}')
+    for day, duration, break_minutes, step, now, expected, actual in mismatches[:5]:
+        print(f'  {day} duration={duration} break={break_minutes} step={step} now={now}\n  expected {expected}\n  actual   {actual}')
+
+    morning = lambda: datetime.combine(DAY, day_time(7))  # noqa: E731
+    print(f'{"bookings":>9} {"step":>5} {"legacy us":>10} {"sweep us":>9} {"speedup":>8}')
+    for bookings in (0, 10, 50, 200):
+        for step in (30, 5):
+            day = busy_day(bookings)
+            legacy = measure(lambda: legacy_calculate_slots(day, 60, 30, step, clock=morning), args.repeat)
+            sweep = measure(lambda: slots.calculate_slots(day, 60, 30, step, clock=morning), args.repeat)
+            print(f'{bookings:>9} {step:>5} {legacy:>10.1f} {sweep:>9.1f} {legacy / sweep:>7.1f}x')
+
+    sys.exit(0 if not mismatches else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+'''
+Benchmark and behaviour check for the warm SMTP session in backend/content (send_emails / smtp_session)
+Usage: python benchmarks/smtp_session.py --messages 200
+Talks to a local aiosmtpd stand-in (benchmarks/smtp_stand_in.py); no database needed
+Exits with status 1 if messages are lost, sessions are not reused or a dropped connection is not recovered
+'''
+
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'content'))
+
+import index  # noqa: E402
+from smtp_stand_in import local_smtp  # noqa: E402
+
+EMAIL_PASSWORD = 'stand-in-password'
+BOOKING = {
+    'client_name': 'Анна', 'client_phone': '+7 900 000-00-00', 'client_email': 'anna@example.test',
+    'service_name': 'Access Bars', 'appointment_date': '2026-10-20', 'appointment_time': '12:00', 'end_time': '13:00'
+}
+
+
+def legacy_send(settings, msg):
+    '''Прежний путь: новое соединение, STARTTLS и вход на каждое письмо'''
+    server = smtplib.SMTP(settings['smtp_host'], settings['smtp_port'])
+    server.starttls()
+    server.login(settings['sender_email'], EMAIL_PASSWORD)
+    server.send_message(msg)
+    server.quit()
+
+
+def timed(func, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1000
+
+
+def check_behaviour(stand_in):
+    settings = stand_in.settings()
+    mailbox = stand_in.mailbox
+    checks = {}
+    index.close_smtp_session()
+
+    before = mailbox.snapshot()
+    index.send_emails(settings, EMAIL_PASSWORD, [
+        index.build_email(settings, index.admin_booking_email(settings, BOOKING)),
+        index.build_email(settings, index.client_confirmation_email(settings, BOOKING))
+    ])
+    index.send_emails(settings, EMAIL_PASSWORD, [index.build_email(settings, index.status_update_email(settings, dict(BOOKING, status='confirmed')))])
+    after = mailbox.snapshot()
+    checks['booking pair and next request share one connection'] = (
+        after['connections'] - before['connections'] == 1 and after['messages'] - before['messages'] == 3
+    )
+
+    index.SMTP_NOOP_AFTER_SECONDS = 0
+    index.send_emails(settings, EMAIL_PASSWORD, [index.build_email(settings, index.test_smtp_email(settings))])
+    checks['idle session is checked with NOOP'] = mailbox.snapshot()['noops'] == after['noops'] + 1
+
+    stand_in.restart()
+    before = mailbox.snapshot()
+    index.send_emails(settings, EMAIL_PASSWORD, [index.build_email(settings, index.test_smtp_email(settings))])
+    checks['dropped connection found by NOOP is reopened'] = mailbox.snapshot()['messages'] == before['messages'] + 1
+
+    index.SMTP_NOOP_AFTER_SECONDS = 3600
+    stand_in.restart()
+    before = mailbox.snapshot()
+    index.send_emails(settings, EMAIL_PASSWORD, [index.build_email(settings, index.test_smtp_email(settings))])
+    checks['connection dropped mid-send is reopened and the message resent'] = mailbox.snapshot()['messages'] == before['messages'] + 1
+
+    mailbox.fail_recipients.add('refused@example.test')
+    try:
+        index.send_emails(settings, EMAIL_PASSWORD, [index.build_email(settings, ('test_smtp', 'refused@example.test', 'x', 'x'))])
+        refused = False
+    except smtplib.SMTPRecipientsRefused:
+        refused = True
+    before = mailbox.snapshot()
+    index.send_emails(settings, EMAIL_PASSWORD, [index.build_email(settings, index.test_smtp_email(settings))])
+    checks['refused recipient is reported and keeps the session'] = refused and mailbox.snapshot()['connections'] == before['connections']
+
+    index.send_emails(stand_in.settings(sender_email='other@example.test'), EMAIL_PASSWORD, [index.build_email(settings, index.test_smtp_email(settings))])
+    checks['changed settings open a new session'] = mailbox.snapshot()['connections'] == before['connections'] + 1
+    index.SMTP_NOOP_AFTER_SECONDS = 5
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200)
+    args = parser.parse_args()
+
+    with local_smtp() as stand_in:
+        checks = check_behaviour(stand_in)
+        for name, passed in checks.items():
+            print(f'{name}: {"ok" if passed else "FAIL"}')
+
+        settings = stand_in.settings()
+        msg = index.build_email(settings, index.admin_booking_email(settings, BOOKING))
+        index.close_smtp_session()
+
+        before = stand_in.mailbox.snapshot()
+        legacy_ms = timed(lambda: legacy_send(settings, msg), args.messages)
+        middle = stand_in.mailbox.snapshot()
+        warm_ms = timed(lambda: index.send_emails(settings, EMAIL_PASSWORD, [msg]), args.messages)
+        index.SMTP_NOOP_AFTER_SECONDS = 0
+        noop_ms = timed(lambda: index.send_emails(settings, EMAIL_PASSWORD, [msg]), args.messages)
+        after = stand_in.mailbox.snapshot()
+        index.close_smtp_session()
+
+    delivered = after['messages'] - before['messages'] == 3 * args.messages
+    print(f'{"path":>28} {"ms/message":>11} {"connections":>12}')
+    print(f'{"connect per message":>28} {legacy_ms:>11.2f} {middle["connections"] - before["connections"]:>12}')
+    print(f'{"warm session":>28} {warm_ms:>11.2f} {"":>12}')
+    print(f'{"warm session + NOOP check":>28} {noop_ms:>11.2f} {after["connections"] - middle["connections"]:>12}')
+    print(f'all messages delivered: {"ok" if delivered else "FAIL"}')
+
+    sys.exit(0 if delivered and all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
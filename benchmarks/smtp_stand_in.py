@@ -0,0 +1,142 @@
+'''
+Local SMTP stand-in for the email benchmarks: aiosmtpd with STARTTLS (throwaway self-signed certificate)
+and AUTH that accepts any login, so backend/content talks to it exactly as to smtp.yandex.ru
+Requires: pip install aiosmtpd, openssl in PATH
+'''
+
+import asyncio
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from email import message_from_bytes, policy
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP, AuthResult
+
+# aiosmtpd предупреждает о login_data на каждом AUTH - в отчете бенчмарка это шум
+logging.getLogger('mail.log').setLevel(logging.ERROR)
+
+
+class Mailbox:
+    '''Принятые письма и счетчики соединений/команд; обработчик aiosmtpd'''
+
+    def __init__(self, data_delay=0.0, fail_recipients=()):
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.open_connections = 0
+        self.peak_connections = 0
+        self.noops = 0
+        self.data_delay = data_delay
+        self.fail_recipients = set(fail_recipients)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.fail_recipients:
+            return '550 mailbox unavailable'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_delay:
+            await asyncio.sleep(self.data_delay)
+        with self.lock:
+            self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), message_from_bytes(envelope.content, policy=policy.default)))
+        return '250 Message accepted for delivery'
+
+    def snapshot(self):
+        with self.lock:
+            return {'connections': self.connections, 'messages': len(self.messages), 'noops': self.noops}
+
+
+class CountingSMTP(SMTP):
+    def connection_made(self, transport):
+        # после STARTTLS aiosmtpd вызывает connection_made повторно для того же клиента
+        if self.transport is None:
+            mailbox = self.event_handler
+            mailbox.connections += 1
+            mailbox.open_connections += 1
+            mailbox.peak_connections = max(mailbox.peak_connections, mailbox.open_connections)
+        super().connection_made(transport)
+
+    def connection_lost(self, error):
+        self.event_handler.open_connections -= 1
+        super().connection_lost(error)
+
+    async def smtp_NOOP(self, arg):
+        self.event_handler.noops += 1
+        await super().smtp_NOOP(arg)
+
+
+class StandInController(Controller):
+    def factory(self):
+        return CountingSMTP(self.handler, **self.SMTP_kwargs)
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def tls_context(directory):
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+        '-keyout', f'{directory}/key.pem', '-out', f'{directory}/cert.pem'
+    ], check=True, capture_output=True)
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(f'{directory}/cert.pem', f'{directory}/key.pem')
+    return context
+
+
+class StandIn:
+    '''Запущенный сервер: host/port для email_settings, mailbox, restart() рвет все открытые соединения'''
+
+    def __init__(self, mailbox, context, port):
+        self.mailbox = mailbox
+        self.context = context
+        self.host = '127.0.0.1'
+        self.port = port
+        self.controller = None
+
+    def start(self):
+        self.controller = StandInController(
+            self.mailbox, hostname=self.host, port=self.port,
+            tls_context=self.context, require_starttls=True, auth_require_tls=True,
+            authenticator=lambda server, session, envelope, mechanism, auth_data: AuthResult(success=True)
+        )
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+    def restart(self):
+        self.stop()
+        time.sleep(0.05)
+        self.start()
+
+    def settings(self, **overrides):
+        settings = {
+            'smtp_host': self.host,
+            'smtp_port': self.port,
+            'sender_email': 'sender@example.test',
+            'admin_email': 'admin@example.test',
+            'notifications_enabled': True
+        }
+        settings.update(overrides)
+        return settings
+
+
+@contextmanager
+def local_smtp(**mailbox_options):
+    with tempfile.TemporaryDirectory() as directory:
+        stand_in = StandIn(Mailbox(**mailbox_options), tls_context(directory), free_port())
+        stand_in.start()
+        try:
+            yield stand_in
+        finally:
+            stand_in.stop()
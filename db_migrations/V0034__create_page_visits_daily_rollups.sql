@@ -0,0 +1,33 @@
+-- Дневные агрегаты посещений: закрытые дни читаются отсюда, а не из page_visits
+
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.page_visits_daily (
+    visit_date DATE PRIMARY KEY,
+    visits BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.page_visits_daily_pages (
+    visit_date DATE NOT NULL,
+    page_url VARCHAR(255) NOT NULL,
+    visits BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (visit_date, page_url)
+);
+
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.page_visits_daily_referrers (
+    visit_date DATE NOT NULL,
+    referrer VARCHAR(255) NOT NULL,
+    visits BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (visit_date, referrer)
+);
+
+-- Водяной знак: все дни строго раньше rolled_up_through уже свернуты
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.analytics_rollup_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    rolled_up_through DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p89870318_access_bars_service.analytics_rollup_state (id, rolled_up_through)
+VALUES (1, NULL)
+ON CONFLICT DO NOTHING;
+
+COMMENT ON TABLE t_p89870318_access_bars_service.analytics_rollup_state IS 'Водяной знак инкрементальной свертки page_visits в дневные агрегаты';
@@ -0,0 +1,5 @@
+-- Уникальные посетители за день хранятся HyperLogLog-скетчем: скетчи дней объединяются по любому окну
+ALTER TABLE t_p89870318_access_bars_service.page_visits_daily 
+ADD COLUMN IF NOT EXISTS visitor_sketch BYTEA;
+
+COMMENT ON COLUMN t_p89870318_access_bars_service.page_visits_daily.visitor_sketch IS 'HyperLogLog-скетч IP посетителей за день (backend/api/hll.py)';
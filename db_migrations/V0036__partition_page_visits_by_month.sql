@@ -0,0 +1,55 @@
+-- Переводим page_visits на помесячное секционирование по visited_at.
+-- Новые секции создает функция api (ensure_visit_partitions), старые отсоединяет drop_expired_visit_partitions
+
+ALTER TABLE t_p89870318_access_bars_service.page_visits RENAME TO page_visits_unpartitioned;
+ALTER SEQUENCE t_p89870318_access_bars_service.page_visits_id_seq RENAME TO page_visits_unpartitioned_id_seq;
+
+CREATE TABLE t_p89870318_access_bars_service.page_visits (
+    id SERIAL,
+    page_url VARCHAR(255) NOT NULL,
+    user_ip VARCHAR(45),
+    user_agent TEXT,
+    referrer VARCHAR(255),
+    visited_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    session_id VARCHAR(255),
+    PRIMARY KEY (id, visited_at)
+) PARTITION BY RANGE (visited_at);
+
+-- Секции от первого месяца с данными до трех месяцев вперед
+DO $$
+DECLARE
+    month_start DATE;
+    last_month DATE := date_trunc('month', CURRENT_DATE + INTERVAL '3 months')::date;
+BEGIN
+    SELECT COALESCE(date_trunc('month', MIN(visited_at))::date, date_trunc('month', CURRENT_DATE)::date)
+    INTO month_start
+    FROM t_p89870318_access_bars_service.page_visits_unpartitioned;
+
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.%I PARTITION OF t_p89870318_access_bars_service.page_visits FOR VALUES FROM (%L) TO (%L)',
+            'page_visits_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
+
+-- Строки без visited_at не попадают ни в одну секцию и не учитывались ни одним отчетом
+INSERT INTO t_p89870318_access_bars_service.page_visits
+(id, page_url, user_ip, user_agent, referrer, visited_at, session_id)
+SELECT id, page_url, user_ip, user_agent, referrer, visited_at, session_id
+FROM t_p89870318_access_bars_service.page_visits_unpartitioned
+WHERE visited_at IS NOT NULL;
+
+SELECT setval(
+    't_p89870318_access_bars_service.page_visits_id_seq',
+    GREATEST((SELECT MAX(id) FROM t_p89870318_access_bars_service.page_visits_unpartitioned), 1)
+);
+
+DROP TABLE t_p89870318_access_bars_service.page_visits_unpartitioned;
+
+-- Индекс по visited_at создает V0037: выгрузке нужен составной ключ (visited_at, id)
+CREATE INDEX IF NOT EXISTS idx_page_visits_url ON t_p89870318_access_bars_service.page_visits(page_url);
+CREATE INDEX IF NOT EXISTS idx_page_visits_session ON t_p89870318_access_bars_service.page_visits(session_id);
@@ -0,0 +1,5 @@
+-- Выгрузка сырых визитов идет страницами по ключу (visited_at, id):
+-- упорядоченный B-tree позволяет читать каждую страницу без сортировки всего диапазона.
+-- Он же обслуживает диапазонные запросы отчетов по visited_at, поэтому отдельного индекса по visited_at нет
+
+CREATE INDEX IF NOT EXISTS idx_page_visits_visited_at_id ON t_p89870318_access_bars_service.page_visits(visited_at, id);
@@ -0,0 +1,80 @@
+-- Справочники рефереров и user-agent: визиты хранят целочисленные ссылки вместо длинных строк.
+-- Пустая строка - тоже значение справочника (прямой заход / нет заголовка), поэтому ссылки всегда NOT NULL
+
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.visit_referrers (
+    id SERIAL PRIMARY KEY,
+    referrer_url VARCHAR(255) NOT NULL UNIQUE,
+    referrer_domain VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.visit_user_agents (
+    id SERIAL PRIMARY KEY,
+    user_agent TEXT NOT NULL
+);
+
+-- Строки user-agent бывают длиннее лимита B-tree, уникальность проверяем по хешу
+CREATE UNIQUE INDEX IF NOT EXISTS idx_visit_user_agents_md5 ON t_p89870318_access_bars_service.visit_user_agents (md5(user_agent));
+
+INSERT INTO t_p89870318_access_bars_service.visit_referrers (referrer_url, referrer_domain)
+SELECT DISTINCT
+    COALESCE(referrer, ''),
+    COALESCE(regexp_replace(lower(substring(referrer FROM '^[A-Za-z][A-Za-z0-9+.-]*://(?:[^@/?#]*@)?([^/:?#]+)')), '^www\.', ''), '')
+FROM t_p89870318_access_bars_service.page_visits
+UNION
+SELECT '', ''
+ON CONFLICT (referrer_url) DO NOTHING;
+
+INSERT INTO t_p89870318_access_bars_service.visit_user_agents (user_agent)
+SELECT DISTINCT COALESCE(user_agent, '')
+FROM t_p89870318_access_bars_service.page_visits
+UNION
+SELECT ''
+ON CONFLICT ((md5(user_agent))) DO NOTHING;
+
+ALTER TABLE t_p89870318_access_bars_service.page_visits
+ADD COLUMN IF NOT EXISTS referrer_id INTEGER,
+ADD COLUMN IF NOT EXISTS user_agent_id INTEGER;
+
+UPDATE t_p89870318_access_bars_service.page_visits AS visits
+SET referrer_id = referrers.id
+FROM t_p89870318_access_bars_service.visit_referrers AS referrers
+WHERE referrers.referrer_url = COALESCE(visits.referrer, '');
+
+UPDATE t_p89870318_access_bars_service.page_visits AS visits
+SET user_agent_id = user_agents.id
+FROM t_p89870318_access_bars_service.visit_user_agents AS user_agents
+WHERE md5(user_agents.user_agent) = md5(COALESCE(visits.user_agent, ''));
+
+ALTER TABLE t_p89870318_access_bars_service.page_visits
+ALTER COLUMN referrer_id SET NOT NULL,
+ALTER COLUMN user_agent_id SET NOT NULL,
+ADD CONSTRAINT page_visits_referrer_id_fkey FOREIGN KEY (referrer_id) REFERENCES t_p89870318_access_bars_service.visit_referrers(id),
+ADD CONSTRAINT page_visits_user_agent_id_fkey FOREIGN KEY (user_agent_id) REFERENCES t_p89870318_access_bars_service.visit_user_agents(id),
+DROP COLUMN referrer,
+DROP COLUMN user_agent;
+
+-- Дневная свертка рефереров тоже группируется по ссылке; 'Direct' соответствует пустому рефереру
+ALTER TABLE t_p89870318_access_bars_service.page_visits_daily_referrers
+ADD COLUMN IF NOT EXISTS referrer_id INTEGER;
+
+INSERT INTO t_p89870318_access_bars_service.visit_referrers (referrer_url, referrer_domain)
+SELECT DISTINCT
+    daily.referrer,
+    COALESCE(regexp_replace(lower(substring(daily.referrer FROM '^[A-Za-z][A-Za-z0-9+.-]*://(?:[^@/?#]*@)?([^/:?#]+)')), '^www\.', ''), '')
+FROM t_p89870318_access_bars_service.page_visits_daily_referrers AS daily
+WHERE daily.referrer <> 'Direct'
+ON CONFLICT (referrer_url) DO NOTHING;
+
+UPDATE t_p89870318_access_bars_service.page_visits_daily_referrers AS daily
+SET referrer_id = referrers.id
+FROM t_p89870318_access_bars_service.visit_referrers AS referrers
+WHERE referrers.referrer_url = CASE WHEN daily.referrer = 'Direct' THEN '' ELSE daily.referrer END;
+
+ALTER TABLE t_p89870318_access_bars_service.page_visits_daily_referrers
+DROP CONSTRAINT page_visits_daily_referrers_pkey,
+DROP COLUMN referrer,
+ALTER COLUMN referrer_id SET NOT NULL,
+ADD PRIMARY KEY (visit_date, referrer_id);
+
+COMMENT ON TABLE t_p89870318_access_bars_service.visit_referrers IS 'Справочник рефереров (полный URL и домен), заполняется при записи визитов функцией api';
+COMMENT ON TABLE t_p89870318_access_bars_service.visit_user_agents IS 'Справочник user-agent, заполняется при записи визитов функцией api';
@@ -0,0 +1,11 @@
+-- Визиты ботов (краулеры, мониторинг, всплески с одного IP) не пишутся в page_visits,
+-- а только считаются по дням и причине классификации (backend/api/bots.py)
+
+CREATE TABLE IF NOT EXISTS t_p89870318_access_bars_service.page_visits_bots_daily (
+    visit_date DATE NOT NULL,
+    reason VARCHAR(32) NOT NULL,
+    visits BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (visit_date, reason)
+);
+
+COMMENT ON TABLE t_p89870318_access_bars_service.page_visits_bots_daily IS 'Счетчик отфильтрованных визитов ботов по дням и причине (empty_user_agent, user_agent, burst)';
@@ -0,0 +1,35 @@
+-- Компактное состояние входа по IP: последние неудачные попытки за час (не больше 5).
+-- Проверка блокировки читает одну строку по первичному ключу вместо диапазона login_attempts;
+-- login_attempts остается журналом и чистится по сроку хранения (LOGIN_ATTEMPTS_RETENTION_DAYS)
+
+CREATE TABLE IF NOT EXISTS login_ip_state (
+    ip_address VARCHAR(45) PRIMARY KEY,
+    recent_failures TIMESTAMP[] NOT NULL DEFAULT '{}',
+    failed_count INTEGER GENERATED ALWAYS AS (cardinality(recent_failures)) STORED,
+    last_failure_at TIMESTAMP GENERATED ALWAYS AS (recent_failures[cardinality(recent_failures)]) STORED,
+    -- 5 попыток за час блокируют IP на час от последней неудачи (как LOGIN_MAX_FAILED_ATTEMPTS в api)
+    locked_until TIMESTAMP GENERATED ALWAYS AS (
+        CASE WHEN cardinality(recent_failures) >= 5 THEN recent_failures[cardinality(recent_failures)] + INTERVAL '1 hour' END
+    ) STORED,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_login_ip_state_updated_at ON login_ip_state(updated_at);
+
+INSERT INTO login_ip_state (ip_address, recent_failures, updated_at)
+SELECT ip_address, array_agg(attempt_time ORDER BY attempt_time), MAX(attempt_time)
+FROM (
+    SELECT ip_address, attempt_time,
+           ROW_NUMBER() OVER (PARTITION BY ip_address ORDER BY attempt_time DESC) AS recency
+    FROM login_attempts
+    WHERE success = FALSE AND attempt_time > CURRENT_TIMESTAMP - INTERVAL '1 hour'
+) AS recent
+WHERE recency <= 5
+GROUP BY ip_address
+ON CONFLICT (ip_address) DO NOTHING;
+
+-- Журнал больше не читается по IP; индекс по времени нужен для пакетной очистки
+DROP INDEX IF EXISTS idx_login_attempts_ip_time;
+CREATE INDEX IF NOT EXISTS idx_login_attempts_time ON login_attempts(attempt_time);
+
+COMMENT ON TABLE login_ip_state IS 'Последние неудачные попытки входа по IP (обновляется одним upsert на попытку из функции api)';
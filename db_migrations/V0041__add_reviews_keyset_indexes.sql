@@ -0,0 +1,14 @@
+-- Постраничная выдача отзывов по ключу (created_at, id): каждая страница - один проход по индексу
+-- от позиции курсора, без OFFSET и без сортировки всей таблицы
+
+-- Сравнение пар (created_at, id) не работает с NULL, поэтому дата создания обязательна
+UPDATE reviews SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE reviews ALTER COLUMN created_at SET NOT NULL;
+
+-- id разрешает равные created_at, индекс отдает строки ровно в порядке ORDER BY created_at DESC, id DESC
+DROP INDEX IF EXISTS idx_reviews_created_at;
+CREATE INDEX IF NOT EXISTS idx_reviews_created_at ON reviews(created_at DESC, id DESC);
+
+-- Публичная выдача всегда фильтрует по статусу; индекс по одному status покрывается этим
+DROP INDEX IF EXISTS idx_reviews_status;
+CREATE INDEX IF NOT EXISTS idx_reviews_status_created_at ON reviews(status, created_at DESC, id DESC);
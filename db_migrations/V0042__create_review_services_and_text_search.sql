@@ -0,0 +1,31 @@
+-- Фильтр отзывов по услуге и поиск по тексту через индексы.
+-- LOWER(service) LIKE '%...%' не может использовать B-tree: подстрока ищется по маленькому справочнику услуг,
+-- а отзывы выбираются по service_id из индекса в порядке выдачи (status, service_id, created_at DESC, id DESC)
+
+CREATE TABLE IF NOT EXISTS review_services (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE
+);
+
+INSERT INTO review_services (name)
+SELECT DISTINCT service FROM reviews
+ON CONFLICT (name) DO NOTHING;
+
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS service_id INTEGER;
+
+UPDATE reviews
+SET service_id = review_services.id
+FROM review_services
+WHERE review_services.name = reviews.service;
+
+-- reviews.service остается названием для выдачи; service_id заполняет функция content при каждой записи
+ALTER TABLE reviews
+ALTER COLUMN service_id SET NOT NULL,
+ADD CONSTRAINT reviews_service_id_fkey FOREIGN KEY (service_id) REFERENCES review_services(id);
+
+CREATE INDEX IF NOT EXISTS idx_reviews_status_service_created_at ON reviews(status, service_id, created_at DESC, id DESC);
+
+-- Полнотекстовый поиск по тексту отзыва (параметр q); выражение совпадает с условием запроса в content
+CREATE INDEX IF NOT EXISTS idx_reviews_text_search ON reviews USING GIN (to_tsvector('russian', text));
+
+COMMENT ON TABLE review_services IS 'Справочник услуг из отзывов, заполняется при записи отзывов функцией content';
@@ -0,0 +1,19 @@
+-- Сводка отзывов: число отзывов на (услуга, статус, оценка). Функция content меняет счетчики
+-- в той же транзакции, что и сами отзывы, поэтому средние и распределения читаются
+-- из десятков строк сводки, а не пересчитываются по всей таблице reviews
+
+CREATE TABLE IF NOT EXISTS review_rating_stats (
+    service_id INTEGER NOT NULL REFERENCES review_services(id),
+    status VARCHAR(50) NOT NULL,
+    rating INTEGER NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (service_id, status, rating)
+);
+
+INSERT INTO review_rating_stats (service_id, status, rating, review_count)
+SELECT service_id, status, rating, COUNT(*)
+FROM reviews
+GROUP BY service_id, status, rating
+ON CONFLICT (service_id, status, rating) DO UPDATE SET review_count = EXCLUDED.review_count;
+
+COMMENT ON TABLE review_rating_stats IS 'Число отзывов по услуге, статусу и оценке; обновляется функцией content вместе с reviews';
@@ -0,0 +1,12 @@
+-- Версия выдачи одобренных отзывов: функция content увеличивает ее в каждой транзакции модерации
+-- (смена статуса, правка, удаление). Версия входит в ETag и ключ кэша страниц в памяти инстанса
+
+CREATE TABLE IF NOT EXISTS reviews_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO reviews_version (id, version)
+VALUES (1, 0)
+ON CONFLICT DO NOTHING;
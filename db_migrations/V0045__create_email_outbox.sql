@@ -0,0 +1,24 @@
+-- Очередь исходящих писем: действия уведомлений функции content только добавляют сюда готовые письма,
+-- а отправляет их диспетчер (таймер-триггер) пакетами по одной SMTP-сессии.
+-- status: pending - ждет отправки, sending - взято диспетчером до next_attempt_at (аренда),
+-- sent - принято SMTP-сервером, failed - постоянная ошибка или исчерпаны попытки
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    recipient VARCHAR(255) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Выборка диспетчера: готовые к отправке письма и письма с истекшей арендой в порядке очереди
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at, id)
+WHERE status IN ('pending', 'sending');
+
+COMMENT ON TABLE email_outbox IS 'Очередь писем функции content (FOR UPDATE SKIP LOCKED, экспоненциальная задержка повторов)';
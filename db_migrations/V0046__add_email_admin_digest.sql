@@ -0,0 +1,18 @@
+-- Режим сводки для администратора: уведомления о новых записях копятся в email_digest_items
+-- и уходят одним письмом, когда набралось digest_max_bookings записей или самая старая ждет digest_window_minutes.
+-- Подтверждения клиентам по-прежнему отправляются по одному
+
+ALTER TABLE email_settings
+    ADD COLUMN IF NOT EXISTS digest_enabled BOOLEAN NOT NULL DEFAULT false,
+    ADD COLUMN IF NOT EXISTS digest_window_minutes INTEGER NOT NULL DEFAULT 15
+        CHECK (digest_window_minutes BETWEEN 1 AND 1440),
+    ADD COLUMN IF NOT EXISTS digest_max_bookings INTEGER NOT NULL DEFAULT 10
+        CHECK (digest_max_bookings BETWEEN 1 AND 100);
+
+CREATE TABLE IF NOT EXISTS email_digest_items (
+    id BIGSERIAL PRIMARY KEY,
+    booking_data JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE email_digest_items IS 'Новые записи, ожидающие сводного письма администратору (функция content)';
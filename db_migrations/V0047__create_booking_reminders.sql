@@ -0,0 +1,17 @@
+-- Отметки о напоминаниях на завтра: задание функции content ставит напоминание в email_outbox
+-- в той же транзакции, что и отметку, поэтому повторный запуск за тот же день ничего не отправляет.
+-- В ключе есть дата записи: перенесенная на другой день запись получит новое напоминание
+
+CREATE TABLE IF NOT EXISTS booking_reminders (
+    source VARCHAR(16) NOT NULL CHECK (source IN ('schedule', 'diary')),
+    booking_id INTEGER NOT NULL,
+    booking_date DATE NOT NULL,
+    reminded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, booking_id, booking_date)
+);
+
+-- Выборка подтвержденных записей на день из расписания и дневника
+CREATE INDEX IF NOT EXISTS idx_bookings_date_status ON bookings(booking_date, status);
+CREATE INDEX IF NOT EXISTS idx_diary_bookings_date_status ON diary_bookings(booking_date, status);
+
+COMMENT ON TABLE booking_reminders IS 'Записи (bookings / diary_bookings), которым уже отправлено напоминание';
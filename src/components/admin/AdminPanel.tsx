@@ -10,7 +10,7 @@ import YandexMetrikaWidget from './YandexMetrikaWidget';
 import DatabaseAnalytics from './DatabaseAnalytics';
 import ReviewModerationPanel from './ReviewModerationPanel';
 import BookingsTab from './BookingsTab';
-import { logout } from '@/utils/auth';
+import { getAdminHeaders, logout } from '@/utils/auth';
 import API_ENDPOINTS from '@/config/api';
 
 const REVIEWS_API_URL = API_ENDPOINTS.reviews;
@@ -98,7 +98,7 @@ export default function AdminPanel() {
     try {
       const response = await fetch(SCHEDULE_API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...getAdminHeaders() },
         body: JSON.stringify({
           action: 'update_booking_status',
           booking_id: bookingId,
@@ -120,7 +120,7 @@ export default function AdminPanel() {
     try {
       const response = await fetch(SCHEDULE_API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...getAdminHeaders() },
         body: JSON.stringify({
           action: 'update_booking_service',
           booking_id: bookingId,
@@ -140,10 +140,10 @@ export default function AdminPanel() {
 
   const loadPendingReviewsCount = async () => {
     try {
-      const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=pending`);
+      const response = await fetch(`${REVIEWS_API_URL}?endpoint=review_stats`);
       const data = await response.json();
       if (data.success) {
-        setPendingReviewsCount(data.reviews?.length || 0);
+        setPendingReviewsCount(data.statuses?.pending || 0);
       }
     } catch (error) {
       console.error('Ошибка загрузки счётчика отзывов:', error);
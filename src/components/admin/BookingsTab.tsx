@@ -9,6 +9,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { SERVICES } from '@/data/services';
 import API_ENDPOINTS from '@/config/api';
+import { getAdminHeaders } from '@/utils/auth';
 
 const SCHEDULE_API_URL = API_ENDPOINTS.schedule;
 
@@ -95,7 +96,7 @@ export default function BookingsTab({
     try {
       const response = await fetch(SCHEDULE_API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...getAdminHeaders() },
         body: JSON.stringify({
           action: 'update_booking',
           ...editData
@@ -10,6 +10,7 @@ import Icon from '@/components/ui/icon';
 import { SMTPSettings, EmailStatus } from '@/types/admin';
 import { getEmailSettings, saveEmailSettings, validateEmailSettings } from '@/utils/emailSettings';
 import API_ENDPOINTS from '@/config/api';
+import { getAdminHeaders } from '@/utils/auth';
 
 const EMAIL_NOTIFICATIONS_API_URL = API_ENDPOINTS.notifications;
 
@@ -68,15 +69,22 @@ export default function EmailSettingsPanel() {
         smtp_port: smtpSettings.port || 587,
         sender_email: smtpSettings.username || '',
         admin_email: smtpSettings.adminEmail || '',
-        notifications_enabled: smtpSettings.enabled
+        notifications_enabled: smtpSettings.enabled,
+        digest_enabled: !!smtpSettings.digestEnabled,
+        digest_window_minutes: smtpSettings.digestWindowMinutes || 15,
+        digest_max_bookings: smtpSettings.digestMaxBookings || 10
       };
       
       const response = await fetch(`${EMAIL_NOTIFICATIONS_API_URL}?endpoint=notifications`, {
-        method: 'PUT',
+        method: 'POST',
         headers: {
-          'Content-Type': 'application/json'
+          'Content-Type': 'application/json',
+          ...getAdminHeaders()
         },
-        body: JSON.stringify(requestData)
+        body: JSON.stringify({
+          action: 'save_email_settings',
+          settings: requestData
+        })
       });
       
       if (response.ok) {
@@ -160,7 +168,10 @@ export default function EmailSettingsPanel() {
             port: data.settings.smtp_port || 587,
             username: data.settings.sender_email || '',
             adminEmail: data.settings.admin_email || '',
-            enabled: data.settings.notifications_enabled !== false
+            enabled: data.settings.notifications_enabled !== false,
+            digestEnabled: !!data.settings.digest_enabled,
+            digestWindowMinutes: data.settings.digest_window_minutes || 15,
+            digestMaxBookings: data.settings.digest_max_bookings || 10
           });
         }
       }
@@ -310,6 +321,48 @@ export default function EmailSettingsPanel() {
             />
           </div>
 
+          <div className="flex items-center justify-between">
+            <div className="space-y-1">
+              <Label htmlFor="digest-enabled">Сводка новых записей</Label>
+              <p className="text-xs text-gray-500">Одно письмо администратору на несколько записей подряд; клиенты получают подтверждения сразу</p>
+            </div>
+            <Switch
+              id="digest-enabled"
+              checked={!!smtpSettings.digestEnabled}
+              onCheckedChange={(checked) => handleSettingChange('digestEnabled', checked)}
+            />
+          </div>
+
+          {smtpSettings.digestEnabled && (
+            <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+              <div className="space-y-2">
+                <Label htmlFor="digest-window">Окно сводки, минут</Label>
+                <Input
+                  id="digest-window"
+                  type="number"
+                  min={1}
+                  max={1440}
+                  value={smtpSettings.digestWindowMinutes || 15}
+                  onChange={(e) => handleSettingChange('digestWindowMinutes', parseInt(e.target.value) || 15)}
+                />
+                <p className="text-xs text-gray-500">Сколько ждет первая запись, прежде чем сводка уйдет</p>
+              </div>
+
+              <div className="space-y-2">
+                <Label htmlFor="digest-max">Записей в сводке</Label>
+                <Input
+                  id="digest-max"
+                  type="number"
+                  min={1}
+                  max={100}
+                  value={smtpSettings.digestMaxBookings || 10}
+                  onChange={(e) => handleSettingChange('digestMaxBookings', parseInt(e.target.value) || 10)}
+                />
+                <p className="text-xs text-gray-500">Набралось столько записей - сводка уходит, не дожидаясь окна</p>
+              </div>
+            </div>
+          )}
+
           <div className="flex gap-3 pt-4">
             <Button 
               onClick={handleSaveSettings} 
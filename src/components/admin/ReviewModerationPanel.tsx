@@ -19,6 +19,7 @@ interface Review {
 }
 
 const REVIEWS_API_URL = API_ENDPOINTS.reviews;
+const REVIEWS_PAGE_SIZE = 100;
 
 const STATUS_COLORS = {
   pending: 'bg-yellow-100 text-yellow-800 border-yellow-300',
@@ -34,7 +35,9 @@ const STATUS_LABELS = {
 
 export default function ReviewModerationPanel() {
   const [reviews, setReviews] = useState<Review[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [currentTab, setCurrentTab] = useState('pending');
   const [editingId, setEditingId] = useState<number | null>(null);
   const [editName, setEditName] = useState('');
@@ -56,11 +59,13 @@ export default function ReviewModerationPanel() {
   const loadReviews = async (status: string) => {
     setLoading(true);
     try {
-      const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=${status}`);
+      // no-cache: одобренные отзывы отдаются с Cache-Control: max-age, а после модерации список должен перепроверяться по ETag
+      const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=${status}&limit=${REVIEWS_PAGE_SIZE}`, { cache: 'no-cache' });
       const data = await response.json();
       
       if (data.success) {
         setReviews(data.reviews || []);
+        setNextCursor(data.next_cursor || null);
       }
     } catch (error) {
       console.error('Ошибка загрузки отзывов:', error);
@@ -69,6 +74,60 @@ export default function ReviewModerationPanel() {
     }
   };
 
+  const loadMoreReviews = async () => {
+    if (!nextCursor) return;
+    
+    setLoadingMore(true);
+    try {
+      const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=${currentTab}&limit=${REVIEWS_PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`, { cache: 'no-cache' });
+      const data = await response.json();
+      
+      if (data.success) {
+        setReviews(prev => [...prev, ...(data.reviews || [])]);
+        setNextCursor(data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Ошибка загрузки отзывов:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const bulkUpdateStatus = async (newStatus: 'approved' | 'rejected') => {
+    if (reviews.length === 0) return;
+    
+    const action = newStatus === 'approved' ? 'одобрить и опубликовать' : 'отклонить';
+    if (!confirm(`Вы уверены, что хотите ${action} все отзывы на модерации (${reviews.length})? Это действие нельзя отменить.`)) {
+      return;
+    }
+    
+    try {
+      const adminToken = localStorage.getItem('admin_token');
+      const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews`, {
+        method: 'PUT',
+        headers: { 
+          'Content-Type': 'application/json',
+          'X-Admin-Token': adminToken || ''
+        },
+        body: JSON.stringify({
+          ids: reviews.map(review => review.id),
+          status: newStatus
+        })
+      });
+
+      const data = await response.json();
+
+      if (data.success) {
+        clearReviewsCache();
+        loadReviews(currentTab);
+      } else {
+        console.error('Ошибка массового обновления статуса:', data.error);
+      }
+    } catch (error) {
+      console.error('Ошибка массового обновления статуса:', error);
+    }
+  };
+
   const updateReviewStatus = async (reviewId: number, newStatus: 'approved' | 'rejected') => {
     try {
       const adminToken = localStorage.getItem('admin_token');
@@ -176,9 +235,9 @@ export default function ReviewModerationPanel() {
 
   const getPendingCount = async () => {
     try {
-      const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=pending`);
+      const response = await fetch(`${REVIEWS_API_URL}?endpoint=review_stats`);
       const data = await response.json();
-      return data.reviews?.length || 0;
+      return data.statuses?.pending || 0;
     } catch {
       return 0;
     }
@@ -188,10 +247,24 @@ export default function ReviewModerationPanel() {
     <div>
       <div className="flex items-center justify-between mb-6">
         <h2 className="text-xl font-semibold text-gray-900">Модерация отзывов</h2>
-        <Button onClick={() => loadReviews(currentTab)} variant="outline" size="sm">
-          <Icon name="RefreshCw" size={16} />
-          Обновить
-        </Button>
+        <div className="flex gap-2">
+          {currentTab === 'pending' && reviews.length > 0 && (
+            <>
+              <Button onClick={() => bulkUpdateStatus('approved')} size="sm" className="bg-green-600 hover:bg-green-700 text-white">
+                <Icon name="CheckCheck" size={16} />
+                Одобрить все ({reviews.length})
+              </Button>
+              <Button onClick={() => bulkUpdateStatus('rejected')} variant="outline" size="sm">
+                <Icon name="X" size={16} />
+                Отклонить все ({reviews.length})
+              </Button>
+            </>
+          )}
+          <Button onClick={() => loadReviews(currentTab)} variant="outline" size="sm">
+            <Icon name="RefreshCw" size={16} />
+            Обновить
+          </Button>
+        </div>
       </div>
 
       <Tabs value={currentTab} onValueChange={setCurrentTab}>
@@ -415,6 +488,13 @@ export default function ReviewModerationPanel() {
                   )}
                 </Card>
               ))}
+              {nextCursor && (
+                <div className="flex justify-center">
+                  <Button onClick={loadMoreReviews} disabled={loadingMore} variant="outline">
+                    {loadingMore ? 'Загрузка...' : 'Загрузить ещё'}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </TabsContent>
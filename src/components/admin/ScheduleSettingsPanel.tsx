@@ -6,6 +6,7 @@ import { Label } from '@/components/ui/label';
 import { Switch } from '@/components/ui/switch';
 import Icon from '@/components/ui/icon';
 import API_ENDPOINTS from '@/config/api';
+import { getAdminHeaders } from '@/utils/auth';
 
 const SCHEDULE_API_URL = API_ENDPOINTS.schedule;
 
@@ -84,7 +85,7 @@ const ScheduleSettingsPanel: React.FC = () => {
     try {
       const response = await fetch(SCHEDULE_API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...getAdminHeaders() },
         body: JSON.stringify({ action: 'save_settings', settings }),
       });
       const data = await response.json();
@@ -106,7 +107,7 @@ const ScheduleSettingsPanel: React.FC = () => {
     try {
       const response = await fetch(SCHEDULE_API_URL, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...getAdminHeaders() },
         body: JSON.stringify({ action: 'save_work_hours', work_hours: workHours }),
       });
       const data = await response.json();
@@ -36,11 +36,11 @@ const ReviewsCarousel = () => {
         }
 
         // Загружаем с сервера
-        const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=approved`);
+        const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=approved&limit=5&fields=id,name,service,rating,text,date`);
         const data = await response.json();
         
         if (data.success && data.reviews) {
-          const reviewsData = data.reviews.slice(0, 5);
+          const reviewsData = data.reviews;
           setReviews(reviewsData);
           
           // Сохраняем в кеш
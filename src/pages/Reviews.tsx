@@ -22,11 +22,35 @@ interface Review {
 }
 
 const REVIEWS_API_URL = API_ENDPOINTS.reviews;
+const REVIEWS_PAGE_SIZE = 20;
+const REVIEW_FIELDS = 'id,name,service,rating,text,date';
+
+// Отзывы отдаются страницами: следующая запрашивается по next_cursor из предыдущего ответа
+const fetchReviewsPage = async (service: string, cursor: string | null) => {
+  const params = new URLSearchParams({
+    endpoint: 'reviews',
+    status: 'approved',
+    limit: String(REVIEWS_PAGE_SIZE),
+    fields: REVIEW_FIELDS
+  });
+  if (service !== "Все") {
+    params.set('service', service);
+  }
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+
+  const response = await fetch(`${REVIEWS_API_URL}?${params.toString()}`);
+  return response.json();
+};
 
 const Reviews = () => {
   const [selectedService, setSelectedService] = useState<string>("Все");
-  const [allReviews, setAllReviews] = useState<Review[]>([]);
+  const [reviews, setReviews] = useState<Review[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [ratingSummary, setRatingSummary] = useState<{ count: number; average_rating: number | null } | null>(null);
   const [showForm, setShowForm] = useState(false);
   const [formData, setFormData] = useState({
     name: '',
@@ -41,49 +65,73 @@ const Reviews = () => {
   const serviceOptions = ["Access Bars", "Массаж", "Целительство", "Обучение"];
 
   useEffect(() => {
-    const fetchReviews = async () => {
+    let cancelled = false;
+
+    const fetchFirstPage = async () => {
+      setLoading(true);
       try {
-        // Проверяем кеш (действителен 24 часа)
-        const cached = localStorage.getItem('all_reviews_cache');
-        const cacheTime = localStorage.getItem('all_reviews_cache_time');
-        const now = Date.now();
+        const data = await fetchReviewsPage(selectedService, null);
+
+        if (!cancelled && data.success && data.reviews) {
+          setReviews(data.reviews);
+          setNextCursor(data.next_cursor);
+        }
+      } catch (error) {
         
-        if (cached && cacheTime && (now - parseInt(cacheTime)) < 24 * 60 * 60 * 1000) {
-          setAllReviews(JSON.parse(cached));
+      } finally {
+        if (!cancelled) {
           setLoading(false);
-          return;
         }
+      }
+    };
+
+    fetchFirstPage();
+
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedService]);
 
-        // Загружаем с сервера
-        const response = await fetch(`${REVIEWS_API_URL}?endpoint=reviews&status=approved`);
+  useEffect(() => {
+    const fetchRatingSummary = async () => {
+      try {
+        const response = await fetch(`${REVIEWS_API_URL}?endpoint=review_stats`);
         const data = await response.json();
-        
-        if (data.success && data.reviews) {
-          setAllReviews(data.reviews);
-          
-          // Сохраняем в кеш
-          localStorage.setItem('all_reviews_cache', JSON.stringify(data.reviews));
-          localStorage.setItem('all_reviews_cache_time', now.toString());
+
+        if (data.success && data.approved) {
+          setRatingSummary(data.approved);
         }
       } catch (error) {
         
-      } finally {
-        setLoading(false);
       }
     };
 
-    fetchReviews();
+    fetchRatingSummary();
   }, []);
-  
-  const filteredReviews = selectedService === "Все" 
-    ? allReviews 
-    : allReviews.filter(review => 
-        review.service.toLowerCase().includes(selectedService.toLowerCase())
-      );
-
-  const averageRating = allReviews.length > 0 
-    ? (allReviews.reduce((sum, r) => sum + r.rating, 0) / allReviews.length).toFixed(1)
+
+  const loadMoreReviews = async () => {
+    if (!nextCursor) return;
+
+    setLoadingMore(true);
+    try {
+      const data = await fetchReviewsPage(selectedService, nextCursor);
+
+      if (data.success && data.reviews) {
+        setReviews(prev => [...prev, ...data.reviews]);
+        setNextCursor(data.next_cursor);
+      }
+    } catch (error) {
+      
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Средняя оценка и число отзывов берутся из сводки, а не из загруженных страниц
+  const averageRating = ratingSummary?.average_rating
+    ? ratingSummary.average_rating.toFixed(1)
     : "5.0";
+  const reviewCount = ratingSummary?.count ?? reviews.length;
 
   const clearReviewsCache = () => {
     localStorage.removeItem('reviews_cache');
@@ -141,11 +189,11 @@ const Reviews = () => {
     "aggregateRating": {
       "@type": "AggregateRating",
       "ratingValue": averageRating,
-      "reviewCount": allReviews.length,
+      "reviewCount": reviewCount,
       "bestRating": "5",
       "worstRating": "1"
     },
-    "review": allReviews.slice(0, 10).map(review => ({
+    "review": reviews.slice(0, 10).map(review => ({
       "@type": "Review",
       "author": {
         "@type": "Person",
@@ -223,7 +271,7 @@ const Reviews = () => {
               </div>
             ) : (
               <div className="grid md:grid-cols-2 gap-6">
-                {filteredReviews.map((review) => (
+                {reviews.map((review) => (
                 <Card 
                   key={review.id} 
                   className="border-2 border-gold-400/30 shadow-xl hover:shadow-2xl transition-shadow duration-300"
@@ -269,7 +317,20 @@ const Reviews = () => {
               </div>
             )}
 
-            {!loading && filteredReviews.length === 0 && (
+            {!loading && nextCursor && (
+              <div className="text-center mt-8">
+                <Button
+                  onClick={loadMoreReviews}
+                  disabled={loadingMore}
+                  variant="outline"
+                  className="border-2 border-gold-400/50 text-gold-400 hover:bg-gold-400/10"
+                >
+                  {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+                </Button>
+              </div>
+            )}
+
+            {!loading && reviews.length === 0 && (
               <div className="text-center py-12">
                 <p className="text-emerald-200 text-lg">
                   Отзывов по выбранной категории пока нет
@@ -4,6 +4,9 @@ export interface SMTPSettings {
   username: string;
   adminEmail: string;
   enabled: boolean;
+  digestEnabled?: boolean;
+  digestWindowMinutes?: number;
+  digestMaxBookings?: number;
 }
 
 export interface EmailStatus {
@@ -1,5 +1,72 @@
 import API_ENDPOINTS from '@/config/api';
 
+const FLUSH_INTERVAL_MS = 10000;
+const MAX_QUEUED_VISITS = 50;
+
+interface QueuedVisit {
+  page: string;
+  referrer: string;
+  session_id: string;
+  timestamp: number;
+}
+
+let visitQueue: QueuedVisit[] = [];
+let flushTimer: ReturnType<typeof setTimeout> | null = null;
+let unloadListenerAttached = false;
+
+// Sends queued visits in one batch request; sendBeacon survives page unload
+const flushVisits = () => {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+
+  if (visitQueue.length === 0) {
+    return;
+  }
+
+  const url = `${API_ENDPOINTS.analytics}?endpoint=analytics`;
+  const body = JSON.stringify({ visits: visitQueue });
+  visitQueue = [];
+
+  try {
+    if (navigator.sendBeacon && navigator.sendBeacon(url, body)) {
+      return;
+    }
+
+    fetch(url, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body,
+      keepalive: true
+    }).catch(() => {
+      // Silent fail for analytics
+    });
+  } catch (error) {
+    // Silent fail for analytics
+  }
+};
+
+const scheduleFlush = () => {
+  if (!unloadListenerAttached) {
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') {
+        flushVisits();
+      }
+    });
+    window.addEventListener('pagehide', flushVisits);
+    unloadListenerAttached = true;
+  }
+
+  if (visitQueue.length >= MAX_QUEUED_VISITS) {
+    flushVisits();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(flushVisits, FLUSH_INTERVAL_MS);
+  }
+};
+
 // Analytics utility for tracking page visits
 export const trackPageVisit = async (pageUrl: string) => {
   try {
@@ -28,22 +95,14 @@ export const trackPageVisit = async (pageUrl: string) => {
     // Get referrer
     const referrer = document.referrer || '';
 
-    // Send analytics data
-    const response = await fetch(`${API_ENDPOINTS.analytics}?endpoint=analytics`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        page: pageUrl,
-        referrer: referrer,
-        session_id: sessionId
-      })
+    // Queue visit; queued visits are sent together by flushVisits
+    visitQueue.push({
+      page: pageUrl,
+      referrer: referrer,
+      session_id: sessionId,
+      timestamp: Date.now()
     });
-
-    if (!response.ok) {
-      // Silent fail for analytics
-    }
+    scheduleFlush();
   } catch (error) {
     // Silent fail for analytics
   }
@@ -56,4 +115,4 @@ export const usePageTracking = () => {
   };
 
   return { trackCurrentPage };
-};
\ No newline at end of file
+};
@@ -22,3 +22,7 @@ export const logout = (): void => {
   localStorage.removeItem('admin_token');
   localStorage.removeItem('admin_token_expires');
 };
+
+export const getAdminHeaders = (): Record<string, string> => ({
+  'X-Admin-Token': localStorage.getItem('admin_token') || ''
+});
@@ -17,7 +17,10 @@ export const getEmailSettings = (): SMTPSettings => {
     port: 587,
     username: '',
     adminEmail: '',
-    enabled: true
+    enabled: true,
+    digestEnabled: false,
+    digestWindowMinutes: 15,
+    digestMaxBookings: 10
   };
 };
 